@@ -12,6 +12,7 @@ from app.models.risk_rule import RiskRule
 from app.models.blacklist import NumberBlacklist
 from app.models.user import User
 from app.models.call_record import CallRecord, DetectionResult
+from app.services.security_service import security_service
 from app.schemas.admin import (
     RiskRuleCreate, RiskRuleUpdate, RiskRuleResponse,
     BlacklistCreate, BlacklistUpdate, BlacklistResponse
@@ -60,22 +61,21 @@ async def get_admin_stats(db: AsyncSession = Depends(get_db)):
 # =======================
 @router.post("/test/text_match", summary="测试文本规则匹配")
 async def test_text_rule_match(text: str, db: AsyncSession = Depends(get_db)):
-    # 获取所有启用规则
-    result = await db.execute(select(RiskRule).where(RiskRule.is_active == True))
-    rules = result.scalars().all()
+    # 使用与实时检测相同的关键词自动机，一次扫描得到全部命中
+    hits = await security_service.find_risk_rules(text, db)
     
-    hits = []
+    hit_keywords = []
     max_risk = 0
     action = "pass"
     
-    for rule in rules:
-        if rule.keyword in text:
-            hits.append(rule.keyword)
-            if rule.risk_level > max_risk:
-                max_risk = rule.risk_level
-                # 如果有 block 规则命中，直接升级为 block
-                if rule.action == "block":
-                    action = "block"
+    for hit in hits:
+        if hit["keyword"] not in hit_keywords:
+            hit_keywords.append(hit["keyword"])
+        if hit["risk_level"] > max_risk:
+            max_risk = hit["risk_level"]
+        # 如果有 block 规则命中，直接升级为 block
+        if hit["action"] == "block":
+            action = "block"
     
     # 如果没被 block 但有风险，设为 alert
     if action != "block" and max_risk > 0:
@@ -83,7 +83,8 @@ async def test_text_rule_match(text: str, db: AsyncSession = Depends(get_db)):
     
     return {
         "text_length": len(text),
-        "hit_keywords": hits,
+        "hit_keywords": hit_keywords,
+        "hits": [{"keyword": h["keyword"], "start": h["start"], "end": h["end"]} for h in hits],
         "risk_level": max_risk,
         "action": action
     }
@@ -109,6 +110,8 @@ async def create_risk_rule(rule: RiskRuleCreate, db: AsyncSession = Depends(get_
     db.add(db_rule)
     await db.commit()
     await db.refresh(db_rule)
+    # 增量更新关键词自动机，并通知其他进程重建
+    security_service.on_rule_created(db_rule)
     return db_rule
 
 @router.delete("/rules/{rule_id}")
@@ -121,6 +124,7 @@ async def delete_risk_rule(rule_id: int, db: AsyncSession = Depends(get_db)):
     
     await db.delete(db_rule)
     await db.commit()
+    security_service.on_rule_deleted(db_rule)
     return {"msg": "Deleted"}
 
 # =======================
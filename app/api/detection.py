@@ -2,10 +2,14 @@
 实时检测API路由
 """
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, UploadFile, File, Depends, HTTPException, status, Query
+from sqlalchemy import select, and_
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Optional
+from typing import Dict, List, Optional
 import asyncio
+import base64
+import binascii
 import json
+import time
 from datetime import datetime
 
 # 导入日志
@@ -14,30 +18,79 @@ from app.core.logger import get_logger
 from app.db.database import get_db
 from app.core.security import get_current_user_id, decode_access_token
 from app.core.storage import upload_to_minio
+from app.core.blob_store import put_blobs
+from app.core.config import settings
 from app.services.websocket_manager import connection_manager
 from app.services.audio_processor import AudioProcessor
 from app.services.video_processor import VideoProcessor
+from app.services.transcript_window import TranscriptWindow, TextWindow
+from app.services.frame_executor import frame_executor
+from app.services.face_detector_pool import face_detector_pool
+from app.services.media_protocol import (
+    MediaCodec, MediaFrameError, decode_media_frame, PROTOCOL_VERSION, HEADER_SIZE
+)
+from app.services.audio_features import (
+    AUDIO_FORMAT_WAV, AUDIO_FORMAT_PCM_S16LE, normalize_audio_format, pack_voice_features
+)
 from app.models.call_record import CallRecord
 from app.schemas import ResponseModel
 
 # [Day 8 新增] 导入 Redis 工具以恢复状态
-from app.core.redis import get_all_user_preferences
+from app.core.redis import get_all_user_preferences, get_redis
 
 # 导入检测任务
-from app.tasks.detection_tasks import detect_video_task, detect_audio_task, detect_text_task
+from app.tasks.detection_tasks import detect_video_task, detect_audio_task, detect_text_task, match_text_rules_task
 
 router = APIRouter(prefix="/api/detection", tags=["实时检测"])
 logger = get_logger(__name__)
 
+SPEECH_STATS_KEY_PREFIX = "call:speech_stats:"
+SPEECH_STATS_TTL = 3600
+SPEECH_STATS_SAVE_INTERVAL = 5.0  # 秒: 通话中按间隔刷新，断开时再写一次最终值
+
+
+async def to_task_media(items: list) -> list:
+    """
+    把媒体数据转换为 Celery 任务参数
+    开启 Claim-Check 时写入 Blob 存储并返回引用，否则 (或存储不可用时) 内联为 Base64
+    """
+    raw_items = [base64.b64decode(x) if isinstance(x, str) else x for x in items]
+    if settings.MEDIA_CLAIM_CHECK_ENABLED:
+        try:
+            return await put_blobs(raw_items)
+        except Exception as e:
+            logger.warning(f"Media blob store unavailable, falling back to inline payload: {e}")
+    return [base64.b64encode(x).decode('utf-8') for x in raw_items]
+
+def schedule_text_window(window: TextWindow, user_id: int, call_id: int):
+    """把一个转写窗口交给文本检测任务 (只做 BERT，规则已逐片段匹配)"""
+    detect_text_task.delay(window.text, user_id, call_id, match_rules=False)
+
+
+async def save_speech_stats(call_id: int, stats: Dict):
+    """把通话的语音占比统计写入 Redis (供 /metrics/voice 查询，通话结束后自动过期)"""
+    try:
+        redis = await get_redis()
+        key = f"{SPEECH_STATS_KEY_PREFIX}{call_id}"
+        await redis.hset(key, mapping={k: json.dumps(v) for k, v in stats.items()})
+        await redis.expire(key, SPEECH_STATS_TTL)
+    except Exception as e:
+        logger.debug(f"Failed to save speech stats: {e}")
+
+
 @router.websocket("/ws/{user_id}/{call_id}")
 async def websocket_endpoint(
     websocket: WebSocket, 
     user_id: int,
     call_id: int,
-    token: str = Query(..., description="JWT认证Token")
+    token: str = Query(..., description="JWT认证Token"),
+    protocol: str = Query("json", description="媒体传输协议: json (Base64) / binary (二进制帧)"),
+    audio_format: str = Query("wav", description="音频格式: wav / pcm_s16le@<采样率> (裸 16 位单声道 PCM)")
 ):
     """
     WebSocket连接端点 - 实时音视频流处理 + 控制指令支持
+    protocol=binary 时音视频可用二进制帧发送 (见 app.services.media_protocol)，JSON 消息仍然可用
+    audio_format 为连接级默认音频格式；二进制帧按 codec 区分 WAV / PCM (PCM 采样率取协商值，默认 16000)
     """
     # --- 1. 鉴权逻辑 ---
     payload = decode_access_token(token)
@@ -51,6 +104,13 @@ async def websocket_endpoint(
         await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="User Identity Mismatch")
         return
 
+    try:
+        audio_format = normalize_audio_format(audio_format)
+    except ValueError as e:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=str(e))
+        return
+    pcm_format = audio_format if audio_format != AUDIO_FORMAT_WAV else normalize_audio_format(AUDIO_FORMAT_PCM_S16LE)
+
     # --- 2. 建立连接 ---
     await connection_manager.connect(websocket, user_id)
     
@@ -66,21 +126,66 @@ async def websocket_endpoint(
     except Exception as e:
         logger.warning(f"Failed to restore user preferences: {e}")
 
-    # [关键] 为每个连接创建独立的处理器实例
+    # 协商媒体协议: 告知客户端二进制帧格式
+    binary_mode = (protocol == "binary")
+    if binary_mode:
+        await websocket.send_json({
+            "type": "protocol",
+            "mode": "binary",
+            "version": PROTOCOL_VERSION,
+            "header_size": HEADER_SIZE,
+            "audio_format": audio_format
+        })
+
+    # [关键] 为每个连接创建独立的处理器实例 (只保存本通话的缓冲状态，人脸检测器由进程内共享池提供)
     # 视频: 设置 sequence_length=10 (积攒10帧才检测)
     local_video_processor = VideoProcessor(sequence_length=10)
     # 音频: 用于简单预处理或校验
     local_audio_processor = AudioProcessor()
+    # 文本: 本通话的转写滚动窗口
+    transcript = TranscriptWindow(
+        window_tokens=settings.TEXT_WINDOW_TOKENS,
+        min_new_tokens=settings.TEXT_WINDOW_MIN_NEW_TOKENS,
+        min_boundary_tokens=settings.TEXT_WINDOW_MIN_BOUNDARY_TOKENS,
+        overlap_chars=settings.TEXT_RULE_OVERLAP_CHARS,
+    )
+    speech_stats_saved_at = 0.0
 
     try:
         while True:
-            # 接收数据
-            data = await websocket.receive_text()
+            # 接收数据 (文本 JSON 或 二进制媒体帧)
+            data = await websocket.receive()
+            if data["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(data.get("code", 1000))
             
             try:
-                message = json.loads(data)
-                msg_type = message.get("type")
-                payload = message.get("data")
+                seq = None
+                chunk_format = audio_format
+                if data.get("bytes") is not None:
+                    if not binary_mode:
+                        raise MediaFrameError("Binary frames require protocol=binary")
+                    frame = decode_media_frame(data["bytes"])
+                    msg_type = frame.msg_type
+                    payload = frame.payload
+                    seq = frame.seq
+                    if msg_type == "audio":
+                        if frame.codec == MediaCodec.WAV:
+                            chunk_format = AUDIO_FORMAT_WAV
+                        elif frame.codec == MediaCodec.PCM_S16LE:
+                            chunk_format = pcm_format
+                        else:
+                            raise MediaFrameError(f"Unsupported audio codec: {frame.codec.name}")
+                    if msg_type == "video" and frame.codec != MediaCodec.JPEG:
+                        raise MediaFrameError(f"Unsupported video codec: {frame.codec.name}")
+                else:
+                    message = json.loads(data["text"])
+                    msg_type = message.get("type")
+                    payload = message.get("data")
+                    if msg_type == "audio" and message.get("format"):
+                        try:
+                            chunk_format = normalize_audio_format(message["format"])
+                        except ValueError as e:
+                            raise MediaFrameError(str(e))
                 
                 # ==========================================
                 # [Day 8 新增] 控制指令处理 (Control Plane)
@@ -95,15 +200,49 @@ async def websocket_endpoint(
                 # --- A. 音频处理 (Scheme B) ---
                 if msg_type == "audio":
                     if payload:
-                        # 异步投递任务到 Celery
-                        detect_audio_task.delay(payload, user_id, call_id)
+                        audio_status = "submitted"
+                        if settings.VOICE_STREAMING_ENABLED:
+                            # 流式: 增量计算特征，滑动窗口就绪且含语音 (VAD) 时只把特征 (而不是音频) 交给 Celery
+                            result = await local_audio_processor.process_stream_chunk(payload, user_id, chunk_format)
+                            audio_status = result["status"]
+                            if audio_status == "ready":
+                                packed, meta = pack_voice_features(result["features"])
+                                features_ref, = await to_task_media([packed])
+                                detect_audio_task.delay(
+                                    {"format": "features", **meta, "data": features_ref}, user_id, call_id, chunk_format
+                                )
+                            elif audio_status == "error":
+                                logger.error(f"Audio process error: {result.get('message')}")
+                        else:
+                            if settings.VOICE_VAD_ENABLED:
+                                # VAD 门控: 静音/噪声块不进入 Celery
+                                gate = await local_audio_processor.check_speech(payload, user_id, chunk_format)
+                                if gate["status"] != "speech":
+                                    audio_status = gate["status"]
+                            if audio_status == "submitted":
+                                # 异步投递任务到 Celery (只传 Blob 引用，音频字节不经过 broker)
+                                try:
+                                    audio_ref, = await to_task_media([payload])
+                                    detect_audio_task.delay(audio_ref, user_id, call_id, chunk_format)
+                                except (binascii.Error, ValueError):
+                                    # 非法 Base64: 回复错误 ACK，不断开连接
+                                    audio_status = "error"
+                                    logger.warning(f"Invalid base64 audio payload from user {user_id}")
+
+                        if settings.VOICE_VAD_ENABLED and time.monotonic() - speech_stats_saved_at >= SPEECH_STATS_SAVE_INTERVAL:
+                            speech_stats_saved_at = time.monotonic()
+                            await save_speech_stats(call_id, local_audio_processor.speech_stats(user_id))
                         
                         # 回复 ACK
-                        await websocket.send_json({
+                        ack = {
                             "type": "ack",
                             "msg_type": "audio",
+                            "status": audio_status,
                             "timestamp": datetime.now().isoformat()
-                        })
+                        }
+                        if seq is not None:
+                            ack["seq"] = seq
+                        await websocket.send_json(ack)
 
                 # --- B. 视频处理 (Scheme A) ---
                 elif msg_type == "video":
@@ -112,24 +251,35 @@ async def websocket_endpoint(
                     
                     # 2. 检查缓冲区状态
                     if result["status"] == "ready":
-                        # 缓冲区已满 (10帧)，发送给 Celery
+                        # 缓冲区已满 (10帧) 且已滑过 stride 帧，发送给 Celery
                         logger.info(f"Video batch ready, sending to Celery. User: {user_id}")
                         
-                        face_batch = result["celery_payload"]
-                        detect_video_task.delay(face_batch, user_id, call_id)
-                        
-                        local_video_processor.clear_buffer(user_id) 
+                        if "face_tensor" in result:
+                            # 原始张量模式: 整块缓冲区作为一个 Blob，附带形状信息
+                            face_tensor = result["face_tensor"]
+                            tensor_ref, = await to_task_media([face_tensor.data.cast("B")])
+                            face_batch = {"format": "raw", "shape": list(face_tensor.shape), "data": tensor_ref}
+                        else:
+                            face_batch = await to_task_media(result["face_batch"])
+                        detect_video_task.delay(face_batch, user_id, call_id, result["frame_ids"])
+                        # 不再清空缓冲区: 处理器按 VIDEO_WINDOW_STRIDE 滑动输出重叠窗口
                         
                     elif result["status"] == "error":
                         logger.error(f"Video process error: {result.get('message')}")
 
+                    elif result["status"] == "dropped":
+                        logger.debug(f"Video frame dropped, pool saturated (depth: {result.get('queue_depth')})")
+
                     # 回复确认
-                    await websocket.send_json({
+                    ack = {
                         "type": "ack",
                         "msg_type": "video",
                         "status": result["status"], 
                         "timestamp": datetime.now().isoformat()
-                    })
+                    }
+                    if seq is not None:
+                        ack["seq"] = seq
+                    await websocket.send_json(ack)
 
                 # --- C. 文本处理 (实时通话转录) ---
                 elif msg_type == "text":
@@ -142,12 +292,23 @@ async def websocket_endpoint(
                     
                     if text_content and len(text_content.strip()) > 1:
                         logger.info(f"Received text (User: {user_id}): {text_content[:20]}...")
-                        detect_text_task.delay(text_content, user_id, call_id)
+                        if settings.TEXT_WINDOW_ENABLED:
+                            # 规则匹配每个片段都做 (带重叠)，BERT 等窗口满足送检条件
+                            update = transcript.append(text_content)
+                            if update.scan is not None:
+                                match_text_rules_task.delay(update.scan.text, user_id, call_id, update.scan.start)
+                            if update.window is not None:
+                                schedule_text_window(update.window, user_id, call_id)
+                            text_status = "scheduled" if update.window is not None else "buffered"
+                        else:
+                            detect_text_task.delay(text_content, user_id, call_id)
+                            text_status = "scheduled"
                         
                         # 回复 ACK
                         await websocket.send_json({
                             "type": "ack",
                             "msg_type": "text",
+                            "status": text_status,
                             "timestamp": datetime.now().isoformat()
                         })
 
@@ -163,17 +324,64 @@ async def websocket_endpoint(
                     "type": "error",
                     "message": "Invalid message format"
                 })
+            except MediaFrameError as e:
+                await websocket.send_json({
+                    "type": "error",
+                    "message": f"Invalid media frame: {e}"
+                })
                 
     except WebSocketDisconnect:
         connection_manager.disconnect(user_id)
         # 清理资源
         local_video_processor.clear_buffer(user_id)
+        speech_stats = local_audio_processor.speech_stats(user_id)
+        logger.info(f"Voice activity for call {call_id}: {speech_stats}")
+        if settings.VOICE_VAD_ENABLED:
+            await save_speech_stats(call_id, speech_stats)
+        local_audio_processor.clear_buffer(user_id)
+        # 通话结束: 剩余未检的转写文本再送检一次
+        window = transcript.flush()
+        if window is not None:
+            schedule_text_window(window, user_id, call_id)
+        logger.info(f"Transcript windows for call {call_id}: {transcript.stats()}")
         logger.info(f"User {user_id} disconnected")
         
     except Exception as e:
         logger.error(f"WebSocket error: {e}", exc_info=True)
         await connection_manager.disconnect(user_id)
 
+@router.get("/metrics/voice/{call_id}", response_model=ResponseModel)
+async def get_voice_activity_metrics(
+    call_id: int,
+    current_user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db)
+):
+    """通话的语音活动统计 (语音占比 / 送检与跳过的音频块或窗口数)，只能查询自己的通话"""
+    result = await db.execute(
+        select(CallRecord.call_id).where(
+            and_(CallRecord.call_id == call_id, CallRecord.user_id == current_user_id)
+        )
+    )
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(status_code=404, detail="记录不存在")
+
+    redis = await get_redis()
+    stats = await redis.hgetall(f"{SPEECH_STATS_KEY_PREFIX}{call_id}")
+    return ResponseModel(
+        code=200,
+        message="查询成功",
+        data={k: json.loads(v) for k, v in stats.items()}
+    )
+
+@router.get("/metrics/video", response_model=ResponseModel)
+async def get_video_pool_metrics(current_user_id: int = Depends(get_current_user_id)):
+    """视频帧处理线程池指标 (队列深度 / 丢帧数 / 共享检测器数量)"""
+    return ResponseModel(
+        code=200,
+        message="查询成功",
+        data={**frame_executor.stats(), "face_detectors": face_detector_pool.size}
+    )
+
 # --- Upload 接口保持不变 ---
 @router.post("/upload/audio", response_model=ResponseModel)
 async def upload_audio(
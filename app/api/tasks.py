@@ -1,21 +1,40 @@
 """
 任务管理API路由
 """
-from fastapi import APIRouter, Depends
+import binascii
+
+from fastapi import APIRouter, Depends, HTTPException
+from app.api.detection import to_task_media
 from app.core.security import get_current_user_id
 from app.tasks.detection_tasks import detect_audio_task, detect_video_task, detect_text_task, get_task_status
 from app.schemas import ResponseModel
 from typing import Dict
 
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, field_validator, model_validator
+from typing import List, Optional
+from app.services.audio_features import normalize_audio_format
 
 
 class AudioDetectionRequest(BaseModel):
-    """音频检测请求"""
-    audio_features: List[List[float]]
+    """音频检测请求 (audio_features 与 audio_data 二选一)"""
+    audio_features: Optional[List[List[float]]] = None
+    # Base64 音频数据，格式由 audio_format 指定
+    audio_data: Optional[str] = None
+    # wav (容器解码) / pcm_s16le@<采样率> (裸 16 位单声道 PCM，Worker 端直接 frombuffer)
+    audio_format: str = "wav"
     call_id: int
 
+    @field_validator("audio_format")
+    @classmethod
+    def check_audio_format(cls, v: str) -> str:
+        return normalize_audio_format(v)
+
+    @model_validator(mode="after")
+    def check_audio_source(self) -> "AudioDetectionRequest":
+        if (self.audio_data is None) == (self.audio_features is None):
+            raise ValueError("Exactly one of audio_data or audio_features is required")
+        return self
+
 
 class VideoDetectionRequest(BaseModel):
     """视频检测请求"""
@@ -43,7 +62,14 @@ async def submit_audio_detection_task(
     Args:
         request: 音频检测请求数据
     """
-    task = detect_audio_task.delay(request.audio_features, current_user_id, request.call_id)
+    audio_data = request.audio_features
+    if request.audio_data is not None:
+        # 与 WebSocket 一致: 音频写入 Blob 存储，任务只携带引用
+        try:
+            audio_data, = await to_task_media([request.audio_data])
+        except (binascii.Error, ValueError):
+            raise HTTPException(status_code=400, detail="音频数据不是合法的 Base64")
+    task = detect_audio_task.delay(audio_data, current_user_id, request.call_id, request.audio_format)
     
     return ResponseModel(
         code=200,
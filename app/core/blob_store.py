@@ -0,0 +1,159 @@
+"""
+媒体短时 Blob 存储 (Claim-Check)
+
+API 把音频/人脸帧字节写入一次，只把引用 (blob://...) 投递给 Celery，
+Worker 凭引用取回原始字节，避免大块 Base64 JSON 经过 broker 序列化。
+
+后端:
+    redis: 独立的二进制 Redis 连接 (decode_responses=False)，写入时设置 TTL，读取后删除
+    shm:   API 与 Worker 同机部署时使用本地共享内存目录 (/dev/shm)，Worker 通过 mmap 读取
+"""
+import mmap
+import os
+import time
+import uuid
+import redis.asyncio as aioredis
+from typing import List, Optional, Union
+from app.core.config import settings
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+BLOB_REF_PREFIX = "blob://"
+REDIS_KEY_PREFIX = "media:blob:"
+
+BlobData = Union[bytes, memoryview]
+
+# 二进制 Redis 连接 (与 app.core.redis 的文本连接分开)
+_redis_client: Optional[aioredis.Redis] = None
+_last_sweep = 0.0
+
+
+class BlobNotFoundError(KeyError):
+    """引用对应的数据不存在或已过期"""
+
+
+def is_blob_ref(value) -> bool:
+    """判断任务参数是引用还是内联的 Base64 数据 (Base64 字符集不含 ':')"""
+    return isinstance(value, str) and value.startswith(BLOB_REF_PREFIX)
+
+
+def _get_redis() -> aioredis.Redis:
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = aioredis.from_url(settings.REDIS_URL, decode_responses=False)
+    return _redis_client
+
+
+async def close_blob_store():
+    """关闭 Redis 连接"""
+    global _redis_client
+    if _redis_client:
+        await _redis_client.close()
+        _redis_client = None
+
+
+# ---------- shm 后端 ----------
+
+def _shm_path(blob_id: str) -> str:
+    return os.path.join(settings.MEDIA_BLOB_SHM_DIR, blob_id)
+
+
+def _shm_put(data: BlobData) -> str:
+    os.makedirs(settings.MEDIA_BLOB_SHM_DIR, exist_ok=True)
+    blob_id = uuid.uuid4().hex
+    tmp_path = _shm_path(blob_id + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    # 原子重命名，读取方不会看到写了一半的文件
+    os.replace(tmp_path, _shm_path(blob_id))
+    _shm_sweep()
+    return blob_id
+
+
+def _shm_get(blob_id: str) -> BlobData:
+    path = _shm_path(blob_id)
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                data: BlobData = b""
+            else:
+                # mmap 映射后即可删除文件，映射在引用释放前保持有效
+                data = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        os.remove(path)
+        return data
+    except FileNotFoundError:
+        raise BlobNotFoundError(blob_id)
+
+
+def _shm_sweep():
+    """清理超过 TTL 仍未被消费的文件 (Worker 宕机等情况)，每个 TTL 周期最多执行一次"""
+    global _last_sweep
+    now = time.time()
+    if now - _last_sweep < settings.MEDIA_BLOB_TTL:
+        return
+    _last_sweep = now
+    try:
+        for entry in os.scandir(settings.MEDIA_BLOB_SHM_DIR):
+            if now - entry.stat().st_mtime > settings.MEDIA_BLOB_TTL:
+                os.remove(entry.path)
+    except OSError as e:
+        logger.warning(f"Media blob sweep failed: {e}")
+
+
+# ---------- 对外接口 ----------
+
+async def put_blobs(items: List[BlobData]) -> List[str]:
+    """批量写入，返回引用列表 (顺序与输入一致)"""
+    backend = settings.MEDIA_BLOB_BACKEND
+    if backend == "shm":
+        return [f"{BLOB_REF_PREFIX}shm/{_shm_put(data)}" for data in items]
+
+    r = _get_redis()
+    ids = [uuid.uuid4().hex for _ in items]
+    async with r.pipeline(transaction=False) as pipe:
+        for blob_id, data in zip(ids, items):
+            pipe.set(REDIS_KEY_PREFIX + blob_id, bytes(data), ex=settings.MEDIA_BLOB_TTL)
+        await pipe.execute()
+    return [f"{BLOB_REF_PREFIX}redis/{blob_id}" for blob_id in ids]
+
+
+async def put_blob(data: BlobData) -> str:
+    """写入一份媒体数据，返回引用"""
+    return (await put_blobs([data]))[0]
+
+
+async def get_blobs(refs: List[str]) -> List[BlobData]:
+    """批量读取 (读取后删除)，任一引用不存在时抛出 BlobNotFoundError"""
+    results: List[Optional[BlobData]] = [None] * len(refs)
+    redis_keys = {}
+
+    for i, ref in enumerate(refs):
+        if not is_blob_ref(ref):
+            raise ValueError(f"Not a blob reference: {ref!r}")
+        backend, _, blob_id = ref[len(BLOB_REF_PREFIX):].partition("/")
+        if backend == "shm":
+            results[i] = _shm_get(blob_id)
+        elif backend == "redis":
+            redis_keys[i] = REDIS_KEY_PREFIX + blob_id
+        else:
+            raise ValueError(f"Unknown blob backend: {backend}")
+
+    if redis_keys:
+        keys = list(redis_keys.values())
+        r = _get_redis()
+        async with r.pipeline(transaction=False) as pipe:
+            pipe.mget(keys)
+            pipe.delete(*keys)
+            values, _ = await pipe.execute()
+        for i, value in zip(redis_keys, values):
+            if value is None:
+                raise BlobNotFoundError(refs[i])
+            results[i] = value
+
+    return results
+
+
+async def get_blob(ref: str) -> BlobData:
+    """读取一份媒体数据 (读取后删除)"""
+    return (await get_blobs([ref]))[0]
@@ -1,27 +1,25 @@
 """
-数据库连接配置 - 修复版
-解决 Celery 异步任务中 "Event loop is closed" 问题
+数据库连接配置
+Celery Worker 通过常驻事件循环 (app.tasks.worker_loop) 执行所有任务，
+连接池中的连接始终绑定同一个 loop，因此 API 和 Worker 都可以使用连接池。
 """
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
-from sqlalchemy.pool import NullPool  # [新增] 导入 NullPool
 from app.core.config import settings
 from app.core.logger import get_logger
 
 # 初始化模块级 logger
 logger = get_logger(__name__)
 
-# [修改] 创建异步引擎
-# 关键修改：使用 poolclass=NullPool 禁用连接池
-# 原因：Celery 每个任务会创建独立的 asyncio loop，连接池中的连接如果绑定了旧 loop 会导致 "Event loop is closed" 错误。
+# 创建异步引擎 (带连接池)
 engine = create_async_engine(
     settings.DATABASE_URL,
     echo=settings.DEBUG,
     future=True,
-    poolclass=NullPool,  # [核心修复] 禁用连接池，每次请求创建新连接
-    # pool_pre_ping=True, # NullPool 不需要预检测
-    # pool_size=10,       # NullPool 不使用这些参数
-    # max_overflow=20
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_recycle=settings.DB_POOL_RECYCLE,  # MySQL 默认 8 小时断开空闲连接，提前回收
+    pool_pre_ping=True,
 )
 
 # 创建异步会话工厂
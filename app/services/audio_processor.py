@@ -2,12 +2,14 @@
 音频流处理器
 """
 import base64
-import io
 import numpy as np
-import librosa  # [新增] 引入音频处理库
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Union
 import asyncio
+from app.core.config import settings
 from app.core.logger import get_logger
+from app.services.audio_features import StreamingVoiceFeatures, audio_front_end
+from app.services.frame_executor import audio_executor
+from app.services.voice_activity import VoiceActivityDetector
 
 # 初始化模块级 logger
 logger = get_logger(__name__)
@@ -24,6 +26,12 @@ class AudioProcessor:
         """
         self.chunk_duration = chunk_duration
         self.buffer = {}  # 存储每个用户的音频缓冲
+        # 流式检测: 每个用户的增量特征状态 (PCM 尾部 + mel 列环形缓冲)
+        self.streams: Dict[int, StreamingVoiceFeatures] = {}
+        # 每个用户的 VAD (噪声底自适应 + 语音占比统计) 及送检/跳过计数
+        self.vads: Dict[int, VoiceActivityDetector] = {}
+        self.submitted: Dict[int, int] = {}
+        self.skipped: Dict[int, int] = {}
     
     async def process_chunk(self, audio_data: str, user_id: Optional[int] = None) -> Dict:
         """
@@ -33,18 +41,16 @@ class AudioProcessor:
             # 解码base64数据
             audio_bytes = base64.b64decode(audio_data)
             
-            # [修改] 尝试提取特征以验证音频有效性
-            # 注意：实际的检测逻辑通常在 Celery 任务中通过 model_service 完成
-            # 这里主要是确保上传的音频格式正确且不为空
-            features = await self.extract_features(audio_bytes)
-            
-            if features is None:
+            # 只解码校验音频有效性 (格式正确且不为空)，不在 API 端提取特征
+            # 实际的特征提取与检测在 Celery 任务中通过 model_service 完成 (共享特征前端)
+            # 流式检测见 process_stream_chunk
+            if not self.validate_audio(audio_bytes):
                 return {
                     "status": "warning",
                     "message": "Audio extract failed or silent"
                 }
             
-            # 返回基本信息，特征提取在检测任务中会再次调用(或者你可以选择在这里提取完传给Celery)
+            # 返回基本信息，检测结果由 Celery 异步推送
             return {
                 "status": "success",
                 "chunk_size": len(audio_bytes),
@@ -61,23 +67,138 @@ class AudioProcessor:
                 "message": str(e)
             }
     
+    async def process_stream_chunk(
+        self,
+        audio_data: Union[str, bytes, memoryview],
+        user_id: int,
+        audio_format: Optional[str] = None
+    ) -> Dict:
+        """
+        流式检测: 解码 -> VAD 打分 -> 追加到该用户的增量特征流 -> 窗口就绪且含语音时返回特征
+        audio_data: JSON 协议为 Base64 字符串，二进制协议为原始字节
+        CPU 部分在音频专用线程池中执行，繁忙时排队而不丢块: 特征流要求相邻块连续，丢块会让窗口跨过空缺
+        Returns: status 为 ready (需送检) / silence (窗口语音过少，跳过) / buffering / error
+        """
+        return await audio_executor.run(self._process_stream_chunk_sync, audio_data, user_id, audio_format)
+
+    def _process_stream_chunk_sync(
+        self, audio_data: Union[str, bytes, memoryview], user_id: int, audio_format: Optional[str]
+    ) -> Dict:
+        """process_stream_chunk 的同步实现 (在线程池中执行)"""
+        try:
+            audio_bytes = base64.b64decode(audio_data) if isinstance(audio_data, str) else audio_data
+            timings: Dict[str, float] = {}
+            y = audio_front_end.decode(audio_bytes, timings, audio_format)
+
+            stream = self.streams.get(user_id)
+            if stream is None:
+                stream = StreamingVoiceFeatures(
+                    audio_front_end, settings.VOICE_WINDOW_SECONDS, settings.VOICE_HOP_SECONDS
+                )
+                self.streams[user_id] = stream
+
+            # 静音块同样要进入特征流 (保持 STFT 列连续)，是否送检由窗口内的语音占比决定
+            vad = self._get_vad(user_id) if settings.VOICE_VAD_ENABLED else None
+            if vad is not None:
+                vad.score(y)
+
+            features = stream.push(y)
+            position = stream.total_samples / audio_front_end.sr
+            if features is None:
+                return {"status": "buffering", "position": position}
+
+            if vad is not None:
+                window_samples = int(settings.VOICE_WINDOW_SECONDS * audio_front_end.sr)
+                speech_ratio = vad.window_speech_ratio(window_samples)
+                if speech_ratio < vad.min_speech_ratio:
+                    self.skipped[user_id] = self.skipped.get(user_id, 0) + 1
+                    return {"status": "silence", "speech_ratio": round(speech_ratio, 3), "position": position}
+
+            self.submitted[user_id] = self.submitted.get(user_id, 0) + 1
+            features.timings.update(timings)
+            return {"status": "ready", "features": features, "position": position}
+
+        except Exception as e:
+            logger.error(f"Process audio stream chunk failed: {e}", exc_info=True)
+            return {
+                "status": "error",
+                "message": str(e)
+            }
+
+    async def check_speech(
+        self,
+        audio_data: Union[str, bytes, memoryview],
+        user_id: int,
+        audio_format: Optional[str] = None
+    ) -> Dict:
+        """
+        整块检测模式的 VAD 门控: 解码整块并打分 (在音频专用线程池中执行)
+        Returns: status 为 speech (需送检) / silence (跳过) / error
+        """
+        return await audio_executor.run(self._check_speech_sync, audio_data, user_id, audio_format)
+
+    def _check_speech_sync(
+        self, audio_data: Union[str, bytes, memoryview], user_id: int, audio_format: Optional[str]
+    ) -> Dict:
+        """check_speech 的同步实现 (在线程池中执行)"""
+        try:
+            audio_bytes = base64.b64decode(audio_data) if isinstance(audio_data, str) else audio_data
+            result = self._get_vad(user_id).score(audio_front_end.decode(audio_bytes, audio_format=audio_format))
+        except Exception as e:
+            logger.error(f"Audio VAD failed: {e}", exc_info=True)
+            return {"status": "error", "message": str(e)}
+
+        if result.is_speech:
+            self.submitted[user_id] = self.submitted.get(user_id, 0) + 1
+            return {"status": "speech", "speech_ratio": round(result.speech_ratio, 3)}
+        self.skipped[user_id] = self.skipped.get(user_id, 0) + 1
+        return {"status": "silence", "speech_ratio": round(result.speech_ratio, 3)}
+
+    def _get_vad(self, user_id: int) -> VoiceActivityDetector:
+        vad = self.vads.get(user_id)
+        if vad is None:
+            vad = VoiceActivityDetector(
+                sr=audio_front_end.sr,
+                energy_threshold_db=settings.VOICE_VAD_ENERGY_DB,
+                margin_db=settings.VOICE_VAD_MARGIN_DB,
+                max_flatness=settings.VOICE_VAD_MAX_FLATNESS,
+                min_speech_ratio=settings.VOICE_VAD_MIN_SPEECH_RATIO,
+            )
+            self.vads[user_id] = vad
+        return vad
+
+    def speech_stats(self, user_id: int) -> Dict:
+        """该用户本通话的语音占比统计与送检/跳过计数"""
+        vad = self.vads.get(user_id)
+        return {
+            **(vad.stats() if vad else {}),
+            "submitted": self.submitted.get(user_id, 0),
+            "skipped": self.skipped.get(user_id, 0),
+        }
+
+    def validate_audio(self, audio_bytes: bytes) -> bool:
+        """解码音频并检查长度 (过短或无法解码返回 False)"""
+        try:
+            return len(audio_front_end.decode(audio_bytes)) >= 100
+        except Exception as e:
+            logger.error(f"Audio decode failed: {e}")
+            return False
+
     async def extract_features(self, audio_bytes: bytes) -> Optional[np.ndarray]:
         """
         提取音频特征 (MFCC) - 对接 GNB/NMF 统计流模型
         """
         try:
-            # 1. 加载音频
-            # io.BytesIO 将内存中的 bytes 转为文件对象供 librosa 读取
-            # sr=16000: 统一重采样到 16k，这是语音处理的标准采样率
-            y, sr = librosa.load(io.BytesIO(audio_bytes), sr=16000)
+            # 1. 加载音频 (统一重采样到 16k，这是语音处理的标准采样率)
+            y = audio_front_end.decode(audio_bytes)
             
             # 过滤过短或静音音频
             if len(y) < 100: 
                 return None
 
-            # 2. 提取 MFCC
+            # 2. 提取 MFCC (与 model_service 共用特征前端和 mel 滤波器组)
             # n_mfcc=20: 论文中常用的参数，用于捕捉精细的频谱包络
-            mfcc = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=20)
+            mfcc = audio_front_end.mfcc_frames(y)
             
             # 3. 转置特征矩阵 (关键步骤!)
             # librosa 输出形状是 (n_mfcc, n_frames) -> (20, Time)
@@ -105,4 +226,8 @@ class AudioProcessor:
     def clear_buffer(self, user_id: int):
         """清空指定用户的缓冲区"""
         if user_id in self.buffer:
-            del self.buffer[user_id]
\ No newline at end of file
+            del self.buffer[user_id]
+        self.streams.pop(user_id, None)
+        self.vads.pop(user_id, None)
+        self.submitted.pop(user_id, None)
+        self.skipped.pop(user_id, None)
\ No newline at end of file
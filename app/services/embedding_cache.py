@@ -0,0 +1,80 @@
+"""
+逐帧视频特征缓存 (流式视频推理)
+
+滑动窗口相邻两次检测共享大部分帧，这些帧的 CNN 特征没有必要重复计算。
+这里按通话把每帧的骨干网络输出 (float32 向量) 存进 Redis Hash:
+    video:emb:{call_id} -> { frame_id: float32 bytes }
+Celery prefork 的多个子进程都能命中，整个 Hash 随 VIDEO_EMBEDDING_TTL 过期。
+每次写入时删除已滑出当前窗口的帧，Hash 大小不超过一个窗口，不随通话时长增长。
+"""
+import numpy as np
+import redis.asyncio as aioredis
+from typing import List, Optional, Sequence
+from app.core.config import settings
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+KEY_PREFIX = "video:emb:"
+
+
+class FrameEmbeddingCache:
+    """按通话缓存逐帧特征，Redis 不可用时视为全部未命中 (回退为重新计算)"""
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        # 二进制 Redis 连接 (与 app.core.redis 的文本连接分开)
+        self._redis: Optional[aioredis.Redis] = None
+
+    def _get_redis(self) -> aioredis.Redis:
+        if self._redis is None:
+            self._redis = aioredis.from_url(settings.REDIS_URL, decode_responses=False)
+        return self._redis
+
+    async def get_many(self, call_id: int, frame_ids: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """按 frame_ids 顺序返回特征向量，未命中的位置为 None"""
+        try:
+            values = await self._get_redis().hmget(f"{KEY_PREFIX}{call_id}", list(frame_ids))
+        except Exception as e:
+            logger.warning(f"Embedding cache read failed: {e}")
+            return [None] * len(frame_ids)
+        return [None if v is None else np.frombuffer(v, dtype=np.float32) for v in values]
+
+    async def put_many(
+        self, call_id: int, frame_ids: Sequence[str], embeddings: np.ndarray, keep: Optional[Sequence[str]] = None
+    ):
+        """
+        写入一组帧的特征 (embeddings 第一维与 frame_ids 对齐) 并刷新过期时间
+        keep: 当前窗口的全部帧编号，不在其中的帧已滑出窗口，不会再被用到，一并删除
+        (多个子进程乱序处理同一通话的窗口时，最多导致个别帧重新计算)
+        """
+        if len(frame_ids) == 0:
+            return
+        key = f"{KEY_PREFIX}{call_id}"
+        mapping = {
+            frame_id: np.ascontiguousarray(emb, dtype=np.float32).tobytes()
+            for frame_id, emb in zip(frame_ids, embeddings)
+        }
+        try:
+            async with self._get_redis().pipeline(transaction=False) as pipe:
+                pipe.hset(key, mapping=mapping)
+                pipe.expire(key, self.ttl)
+                if keep is not None:
+                    pipe.hkeys(key)
+                results = await pipe.execute()
+            if keep is not None:
+                window = {frame_id.encode() for frame_id in keep}
+                stale = [field for field in results[-1] if field not in window]
+                if stale:
+                    await self._get_redis().hdel(key, *stale)
+        except Exception as e:
+            logger.warning(f"Embedding cache write failed: {e}")
+
+    async def close(self):
+        if self._redis:
+            await self._redis.close()
+            self._redis = None
+
+
+# 全局实例 (每个 Worker 进程一个)
+frame_embedding_cache = FrameEmbeddingCache(settings.VIDEO_EMBEDDING_TTL)
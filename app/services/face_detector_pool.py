@@ -0,0 +1,74 @@
+"""
+共享 MediaPipe 人脸检测器池
+
+FaceMesh 实例初始化慢、占用内存大，按连接创建会让连接延迟和内存随并发通话数线性增长。
+这里每个进程维护一个有上限的检测器池，所有连接按帧借用、用完归还。
+检测器以 static_image_mode=True 运行 (不依赖上一帧)，因此可以安全地在不同通话之间复用；
+逐通话的跟踪状态由 VideoProcessor 自己保存。
+"""
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
+import mediapipe as mp
+from app.core.config import settings
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class FaceDetectorPool:
+    """FaceMesh 检测器池 (惰性创建，最多 max_size 个)"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._idle: "queue.LifoQueue" = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        """已创建的检测器数量"""
+        return self._created
+
+    def _create(self):
+        detector = mp.solutions.face_mesh.FaceMesh(
+            static_image_mode=True,
+            max_num_faces=1,
+            refine_landmarks=True,
+            min_detection_confidence=0.5
+        )
+        logger.info(f"FaceMesh detector created ({self._created}/{self.max_size})")
+        return detector
+
+    @contextmanager
+    def acquire(self, timeout: Optional[float] = None) -> Iterator:
+        """借用一个检测器，空闲池为空且未达上限时新建，否则等待归还"""
+        detector = None
+        try:
+            detector = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                if self._created < self.max_size:
+                    self._created += 1
+                    create = True
+                else:
+                    create = False
+            if create:
+                try:
+                    detector = self._create()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                detector = self._idle.get(timeout=timeout)
+
+        try:
+            yield detector
+        finally:
+            self._idle.put(detector)
+
+
+# 全局实例: 上限与帧处理线程数一致，保证每个线程都能拿到检测器
+face_detector_pool = FaceDetectorPool(settings.VIDEO_FRAME_WORKERS)
@@ -0,0 +1,70 @@
+"""
+视频帧 CPU 任务执行池
+
+cv2 解码、MediaPipe 人脸检测、resize/imencode 都是阻塞的 CPU 操作，
+直接在 WebSocket 协程里执行会卡住同一 uvicorn worker 上的所有连接。
+这里把它们放进有界线程池 (OpenCV/MediaPipe 计算期间会释放 GIL)，
+池子饱和时直接丢帧，保证实时性而不是无限排队。
+音频块不能丢 (增量特征流要求相邻块连续)，使用单独的不丢弃实例 audio_executor，满时排队等待。
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from app.core.config import settings
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class FramePoolSaturated(Exception):
+    """执行池已满，本帧被丢弃"""
+
+
+class FrameExecutor:
+    """有界视频帧执行池 (计数只在事件循环线程中修改，无需加锁)"""
+
+    def __init__(self, max_workers: int, max_pending: Optional[int], name: str = "video-frame"):
+        """
+        Args:
+            max_workers: 线程数
+            max_pending: 排队 + 执行中的帧数上限，超过即丢帧；None 表示不丢弃，排队等待
+            name: 线程名前缀
+        """
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self.pending = 0
+        self.processed = 0
+        self.dropped = 0
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """
+        在线程池中执行 fn(*args) 并等待结果
+        调用方 await 完成后才会提交下一帧，因此同一连接内的帧顺序保持不变
+        """
+        if self.max_pending is not None and self.pending >= self.max_pending:
+            self.dropped += 1
+            raise FramePoolSaturated()
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            self.pending -= 1
+            self.processed += 1
+
+    def stats(self) -> Dict:
+        """队列深度等运行指标"""
+        return {
+            "queue_depth": self.pending,
+            "max_pending": self.max_pending,
+            "workers": self.max_workers,
+            "processed": self.processed,
+            "dropped": self.dropped
+        }
+
+
+# 全局实例 (每个 API 进程一个)
+frame_executor = FrameExecutor(settings.VIDEO_FRAME_WORKERS, settings.VIDEO_FRAME_MAX_PENDING)
+audio_executor = FrameExecutor(settings.VOICE_CHUNK_WORKERS, None, name="audio-chunk")
@@ -0,0 +1,126 @@
+"""
+多模式关键词匹配 (Aho-Corasick 自动机)
+"""
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick 多模式匹配自动机
+
+    一次扫描即可找出文本中出现的全部关键词，耗时只与文本长度 (和命中数) 有关，
+    与关键词数量无关。关键词可以增量添加/删除，失配指针在下次查询前按需重建。
+    """
+
+    def __init__(self):
+        # 节点以下标表示: goto 转移表 / 失配指针 / 本节点结束的关键词 / 输出链接
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[List[Tuple[str, Any]]] = [[]]
+        self._dict_link: List[int] = [-1]
+        self._dirty = False
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(self, keyword: str, payload: Any = None):
+        """添加关键词 (payload 随命中结果一并返回，如规则信息)"""
+        if not keyword:
+            return
+        node = 0
+        for ch in keyword:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+                self._dict_link.append(-1)
+            node = nxt
+        self._outputs[node].append((keyword, payload))
+        self._count += 1
+        self._dirty = True
+
+    def remove(self, keyword: str, where: Optional[Callable[[Any], bool]] = None) -> bool:
+        """
+        删除关键词 (保留 trie 节点，仅移除输出)，返回是否有输出被删除
+        where: 只删除 payload 满足条件的输出 (多条规则共用同一关键词时按规则删除)，不传则全部删除
+        """
+        node = self._find(keyword)
+        if node is None or not self._outputs[node]:
+            return False
+        kept = [(kw, payload) for kw, payload in self._outputs[node] if where is not None and not where(payload)]
+        removed = len(self._outputs[node]) - len(kept)
+        if not removed:
+            return False
+        self._count -= removed
+        self._outputs[node] = kept
+        self._dirty = True
+        return True
+
+    def _find(self, keyword: str) -> Optional[int]:
+        node = 0
+        for ch in keyword:
+            node = self._goto[node].get(ch)
+            if node is None:
+                return None
+        return node
+
+    def build(self):
+        """BFS 计算失配指针与输出链接"""
+        self._fail[0] = 0
+        self._dict_link[0] = -1
+        bfs = deque()
+        for nxt in self._goto[0].values():
+            self._fail[nxt] = 0
+            self._dict_link[nxt] = -1
+            bfs.append(nxt)
+
+        while bfs:
+            node = bfs.popleft()
+            for ch, nxt in self._goto[node].items():
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                fail = self._goto[f].get(ch, 0)
+                if fail == nxt:
+                    fail = 0
+                self._fail[nxt] = fail
+                # 输出链接: 沿失配链最近的一个有输出的节点
+                self._dict_link[nxt] = fail if self._outputs[fail] else self._dict_link[fail]
+                bfs.append(nxt)
+
+        self._dirty = False
+
+    def search(self, text: str) -> List[Dict[str, Any]]:
+        """
+        返回全部命中 (允许重叠)，按结束位置排序
+        每条结果: {"keyword", "start", "end", "payload"}，end 为开区间
+        """
+        if not text or not self._count:
+            return []
+        if self._dirty:
+            self.build()
+
+        hits = []
+        goto, fail, outputs, dict_link = self._goto, self._fail, self._outputs, self._dict_link
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+
+            out = node if outputs[node] else dict_link[node]
+            while out > 0:
+                for keyword, payload in outputs[out]:
+                    hits.append({
+                        "keyword": keyword,
+                        "start": i - len(keyword) + 1,
+                        "end": i + 1,
+                        "payload": payload,
+                    })
+                out = dict_link[out]
+        return hits
@@ -0,0 +1,85 @@
+"""
+WebSocket 二进制媒体帧协议
+
+连接时通过 ?protocol=binary 协商。协商后客户端可直接发送二进制帧 (receive_bytes)，
+省去 base64 (+33% 带宽) 与逐帧 json.loads/b64decode；控制/文本/心跳仍走原有 JSON 消息。
+
+帧格式 (网络字节序，头部固定 16 字节):
+    version   uint8   协议版本，当前为 1
+    type      uint8   MediaType (1=audio, 2=video)
+    codec     uint8   MediaCodec (1=jpeg, 2=wav, 3=pcm_s16le)
+    flags     uint8   保留，填 0
+    seq       uint32  客户端自增序号 (用于 ACK 对账)
+    timestamp uint64  客户端采集时间戳 (毫秒)
+    payload   bytes   原始 JPEG / 音频字节
+"""
+import enum
+import struct
+from typing import NamedTuple
+
+PROTOCOL_VERSION = 1
+HEADER_FORMAT = ">BBBBIQ"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+
+class MediaType(enum.IntEnum):
+    """媒体类型 (与 JSON 消息的 type 字段对应)"""
+    AUDIO = 1
+    VIDEO = 2
+
+
+class MediaCodec(enum.IntEnum):
+    """负载编码"""
+    JPEG = 1
+    WAV = 2
+    PCM_S16LE = 3
+
+
+class MediaFrameError(ValueError):
+    """二进制帧格式错误"""
+
+
+class MediaFrame(NamedTuple):
+    """解析后的二进制媒体帧"""
+    media_type: MediaType
+    codec: MediaCodec
+    seq: int
+    timestamp: int
+    payload: memoryview
+
+    @property
+    def msg_type(self) -> str:
+        """对应 JSON 协议中的消息类型 ("audio" / "video")"""
+        return self.media_type.name.lower()
+
+
+def encode_media_frame(
+    media_type: MediaType,
+    codec: MediaCodec,
+    seq: int,
+    timestamp: int,
+    payload: bytes
+) -> bytes:
+    """打包二进制帧 (客户端/测试使用)"""
+    header = struct.pack(HEADER_FORMAT, PROTOCOL_VERSION, media_type, codec, 0, seq, timestamp)
+    return header + payload
+
+
+def decode_media_frame(data: bytes) -> MediaFrame:
+    """解析二进制帧，负载以 memoryview 切片方式返回，不复制数据"""
+    if len(data) < HEADER_SIZE:
+        raise MediaFrameError(f"Frame too short: {len(data)} bytes")
+
+    version, media_type, codec, _flags, seq, timestamp = struct.unpack_from(HEADER_FORMAT, data)
+    if version != PROTOCOL_VERSION:
+        raise MediaFrameError(f"Unsupported protocol version: {version}")
+    try:
+        media_type = MediaType(media_type)
+        codec = MediaCodec(codec)
+    except ValueError as e:
+        raise MediaFrameError(str(e))
+
+    payload = memoryview(data)[HEADER_SIZE:]
+    if not payload:
+        raise MediaFrameError("Empty payload")
+    return MediaFrame(media_type, codec, seq, timestamp, payload)
@@ -0,0 +1,96 @@
+"""
+模型注册表 (热更新 + 版本分流)
+
+原来换模型要替换 VOICE_MODEL_PATH 等位置的文件再重启 Celery，重启后每个子进程都要冷启动。
+现在由注册表文件 (MODEL_REGISTRY_PATH，JSON) 描述每个模态的版本:
+
+    {
+      "voice": {
+        "active": "v1.1",                 # 当前版本
+        "candidate": "v1.2",              # 候选版本 (可选)
+        "candidate_share": 0.1,           # 分给候选版本的流量比例，按通话固定分桶
+        "previous": "v1.0",               # promote 时记录，用于 rollback
+        "versions": {
+          "v1.1": {"VOICE_MODEL_PATH": "./models/voice/v1.1/voice_detection.onnx"},
+          "v1.2": {"VOICE_MODEL_PATH": "./models/voice/v1.2/voice_detection.onnx",
+                   "VOICE_ML_MODEL_DIR": "./models/voice/v1.2/ml"}
+        }
+      }
+    }
+
+版本的文件路径以配置项名称覆盖默认值，未覆盖的沿用配置；{模态}_MODEL_VERSION 指向默认文件，不需要登记。
+Worker 每隔 MODEL_REGISTRY_POLL_SECONDS 检查文件修改时间，变化后在后台线程加载并预热新版本，
+完成后才原子地切换路由，切换过程中请求继续由旧版本处理，旧版本在 MODEL_REGISTRY_DRAIN_SECONDS 后释放。
+"""
+import hashlib
+import json
+import os
+from typing import Any, Dict, NamedTuple, Optional
+
+from app.core.config import settings
+
+# 各模态可以按版本覆盖的路径配置项，以及加载该版本前必须存在的文件
+VERSION_PATH_KEYS = {
+    "voice": ("VOICE_MODEL_PATH", "VOICE_ML_MODEL_DIR"),
+    "video": ("VIDEO_MODEL_PATH", "VIDEO_BACKBONE_MODEL_PATH", "VIDEO_TEMPORAL_MODEL_PATH"),
+    "text": ("TEXT_MODEL_PATH", "TEXT_VOCAB_PATH"),
+}
+REQUIRED_PATH_KEYS = {
+    "voice": ("VOICE_MODEL_PATH",),
+    "video": ("VIDEO_MODEL_PATH",),
+    "text": ("TEXT_MODEL_PATH", "TEXT_VOCAB_PATH"),
+}
+
+
+class ModelRoute(NamedTuple):
+    """一个模态的路由: active / candidate 为对应版本的 ModelService"""
+    active: Any
+    candidate: Any = None
+    share: float = 0.0
+
+
+def default_version(modality: str) -> str:
+    return getattr(settings, f"{modality.upper()}_MODEL_VERSION")
+
+
+def version_paths(modality: str, paths: Dict[str, str]) -> Dict[str, str]:
+    """
+    校验版本的路径覆盖: 只允许本模态的配置项，必需的文件必须存在
+    Raises: ValueError
+    """
+    unknown = set(paths) - set(VERSION_PATH_KEYS[modality])
+    if unknown:
+        raise ValueError(f"Unknown path keys for {modality}: {sorted(unknown)}")
+    for key in REQUIRED_PATH_KEYS[modality]:
+        path = paths.get(key) or getattr(settings, key)
+        if not os.path.exists(path):
+            raise ValueError(f"{key} not found: {path}")
+    return dict(paths)
+
+
+def route_bucket(modality: str, key) -> float:
+    """把路由 key (通话 ID) 稳定地映射到 [0, 1)，同一通话始终落在同一版本"""
+    digest = hashlib.blake2b(f"{modality}:{key}".encode(), digest_size=4).digest()
+    return int.from_bytes(digest, "big") / 2 ** 32
+
+
+def load_manifest(path: Optional[str] = None) -> Dict[str, dict]:
+    """读取注册表，文件不存在时返回空表 (全部使用默认版本)"""
+    path = path or settings.MODEL_REGISTRY_PATH
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if not isinstance(manifest, dict):
+        raise ValueError(f"Invalid model registry: {path}")
+    return manifest
+
+
+def save_manifest(manifest: Dict[str, dict], path: Optional[str] = None):
+    """写入临时文件后原子替换，Worker 不会读到写了一半的注册表"""
+    path = path or settings.MODEL_REGISTRY_PATH
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
@@ -1,18 +1,26 @@
 """
 AI模型服务层
 """
+import gc
 import os
-import onnxruntime as ort
-import joblib
+import hashlib
 import numpy as np
-import librosa  # [新增]
-import io       # [新增]
 import random
-from typing import Dict, Optional
+import time
+import queue
+import threading
+import asyncio
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
 from pathlib import Path
-from transformers import BertTokenizer
 from app.core.config import settings
 from app.core.logger import get_logger
+from app.services.embedding_cache import frame_embedding_cache
+from app.services.audio_features import VoiceFeatures, audio_front_end
+from app.services.text_features import TextEncoder, build_text_encoder
+from app.services.result_cache import result_cache
+from app.services.ort_session import create_session, ort_config, prepare_optimized_model, resolve_model_path
+from app.services.model_registry import ModelRoute, default_version, load_manifest, route_bucket, version_paths
 
 # 初始化模块级 logger
 logger = get_logger(__name__)
@@ -25,13 +33,182 @@ class MockOnnxSession:
         class Node: pass
         n = Node(); n.name = "input"; return [n]
     def run(self, output_names, input_feed):
-        # 模拟返回
-        return [np.array([[0.1, 0.9]], dtype=np.float32)]
+        # 模拟返回 (按 batch 维度复制，兼容微批推理)
+        batch_size = next(iter(input_feed.values())).shape[0] if input_feed else 1
+        return [np.tile(np.array([[0.1, 0.9]], dtype=np.float32), (batch_size, 1))]
+
+
+class _BatchRequest:
+    """单条待推理请求: 输入张量 + 结果回传用的 Future"""
+    __slots__ = ("feed", "future")
+
+    def __init__(self, feed: Dict[str, np.ndarray]):
+        self.feed = feed
+        self.future: Future = Future()
+
+
+class MicroBatcher:
+    """
+    动态微批处理器 (每个模态一个实例)
+
+    取出队列中已排队的请求 (最多 max_batch_size 条)，沿 batch 维度拼接成一个张量执行一次推理，
+    再按行拆分结果回传给各调用方。只有一条请求时立即推理: Celery solo / prefork 每个进程同时只有一个任务，
+    等待窗口只会增加延迟；队列中有其他请求 (有并发) 时才在 max_wait_ms 内继续收集。
+    使用后台线程 + concurrent Future 实现，与调用方所在的 event loop 无关，
+    Celery 每个任务新建的 loop 也可以安全等待结果。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        run_fn: Callable[[Dict[str, np.ndarray]], List[np.ndarray]],
+        max_batch_size: int = 8,
+        max_wait_ms: float = 10.0,
+    ):
+        """
+        Args:
+            name: 模态名称 (仅用于日志)
+            run_fn: 批量推理函数，输入 feed 字典，返回 session.run 的输出列表
+            max_batch_size: 单批最大请求数，<= 1 时关闭批处理
+            max_wait_ms: 有并发请求时，首条请求到达后最多等待的毫秒数
+        """
+        self.name = name
+        self.run_fn = run_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue: "queue.Queue[_BatchRequest]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._closed = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_batch_size > 1
+
+    def submit(self, feed: Dict[str, np.ndarray]) -> Future:
+        """提交一条请求，返回该请求对应的 logits (batch 维度为 1) 的 Future"""
+        request = _BatchRequest(feed)
+        if self.enabled and not self._closed:
+            self._ensure_worker()
+            with self._lock:
+                # 与 close() 互斥: 请求要么排在结束标记之前，要么在下面同步执行
+                if not self._closed:
+                    self._queue.put(request)
+                    return request.future
+
+        self._run_batch([request])
+        return request.future
+
+    def close(self):
+        """停止后台线程 (模型版本下线时调用)，已排队的请求照常处理，之后提交的请求同步执行"""
+        with self._lock:
+            self._closed = True
+            if self._thread is not None and self._thread.is_alive():
+                self._queue.put(None)
+
+    async def infer(self, feed: Dict[str, np.ndarray]) -> np.ndarray:
+        """异步等待推理结果"""
+        return await asyncio.wrap_future(self.submit(feed))
+
+    def _ensure_worker(self):
+        # Celery prefork 子进程不会继承父进程的线程，按 pid 判断是否需要重新拉起
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == pid and self._thread.is_alive():
+                return
+            if self._pid != pid:
+                self._queue = queue.Queue()
+            self._pid = pid
+            self._thread = threading.Thread(
+                target=self._worker_loop, name=f"batcher-{self.name}", daemon=True
+            )
+            self._thread.start()
+
+    def _worker_loop(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = time.monotonic() + self.max_wait
+            # 先取出已排队的请求，没有其他请求时不等待
+            while len(batch) < self.max_batch_size:
+                try:
+                    request = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if request is None:
+                    self._run_batch(batch)
+                    return
+                batch.append(request)
+            while 1 < len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if request is None:
+                    self._run_batch(batch)
+                    return
+                batch.append(request)
+            self._run_batch(batch)
+
+    def _run_batch(self, batch: List[_BatchRequest]):
+        # 只有除 batch 维度外形状一致的输入才能拼接，按形状签名分组
+        groups: Dict[tuple, List[_BatchRequest]] = {}
+        for request in batch:
+            key = tuple(
+                (name, arr.shape[1:], arr.dtype.str) for name, arr in sorted(request.feed.items())
+            )
+            groups.setdefault(key, []).append(request)
+
+        for requests in groups.values():
+            try:
+                if len(requests) == 1:
+                    feed = requests[0].feed
+                else:
+                    feed = {
+                        name: np.concatenate([r.feed[name] for r in requests], axis=0)
+                        for name in requests[0].feed
+                    }
+                logits = self.run_fn(feed)[0]
+
+                first_input = next(iter(requests[0].feed))
+                sizes = [r.feed[first_input].shape[0] for r in requests]
+                for request, rows in zip(requests, np.split(logits, np.cumsum(sizes)[:-1])):
+                    request.future.set_result(rows)
+
+                if len(requests) > 1:
+                    logger.debug(f"[Batcher:{self.name}] Ran batch of {len(requests)} requests")
+            except Exception as e:
+                for request in requests:
+                    if not request.future.done():
+                        request.future.set_exception(e)
 
 class ModelService:
-    """AI模型加载与推理服务"""
+    """
+    AI模型加载与推理服务
+
+    模型按模态惰性加载: 只有 worker 角色的进程会在首次推理时加载对应模态的模型，
+    API 进程 (uvicorn) 虽然会间接 import 本模块，但不会加载任何 ONNX/Tokenizer/PKL。
+    """
     
-    def __init__(self):
+    MODALITIES = ("voice", "video", "text")
+
+    def __init__(self, role: Optional[str] = None, version: Optional[str] = None, paths: Optional[Dict[str, str]] = None):
+        # 进程角色: "api" 只做网关不加载模型，"worker" 按需加载
+        self.role = role or settings.PROCESS_ROLE
+        # 模型版本: None 表示根实例 (默认模型文件，版本号为 {模态}_MODEL_VERSION)；
+        # 注册表加载的其他版本各自是一个只服务单个模态的实例，paths 按配置项名称覆盖模型路径
+        self.version = version
+        self.paths: Dict[str, str] = dict(paths or {})
+
         # --- 音频模型组件 ---
         self.voice_session = None
         self.gnb_model = None
@@ -40,78 +217,529 @@ class ModelService:
         
         # --- 其他模型 ---
         self.video_session = None
+        # 流式视频推理: 逐帧 CNN 骨干 + LSTM 时序头 (两个都加载成功才启用)
+        self.video_backbone_session = None
+        self.video_temporal_session = None
         self.text_session = None
         self.tokenizer = None
-        
-        self._load_models()
-    
-    def _load_models(self):
-        """加载模型文件"""
+        self.text_encoder: Optional[TextEncoder] = None
+
+        # 已加载的模态 (加载过程加锁，避免并发请求重复加载)
+        self._loaded = set()
+        # 各模态的模型版本指纹 (参与结果缓存 key，换模型后旧缓存自然失效)
+        self.model_versions: Dict[str, str] = {}
+        # 按 {模态}_MODEL_VARIANT 解析出的实际模型文件 (fp32 / int8)
+        self._model_paths: Dict[str, str] = {}
+
+        # 预热状态: Worker 启动时对服务的模态跑一遍线上形状的合成输入，完成前不接收任务 (见 celery_app)
+        self.warmup_report: Dict[str, float] = {}
+        self._warmed = set()
+        self._load_lock = threading.Lock()
+
+        # 模型注册表 (仅根实例使用): 各模态的路由 (当前/候选版本) 与已加载的版本实例
+        self._routes: Dict[str, ModelRoute] = {}
+        self._version_services: Dict[tuple, "ModelService"] = {}
+        self._registry_mtime: Optional[int] = None
+        self._registry_checked_at = 0.0
+        self._registry_lock = threading.Lock()
+
+        # --- 微批处理器 (按模态聚合推理请求) ---
+        self.voice_batcher = MicroBatcher(
+            "voice",
+            lambda feed: self.voice_session.run(None, feed),
+            settings.VOICE_BATCH_MAX_SIZE,
+            settings.VOICE_BATCH_MAX_WAIT_MS,
+        )
+        self.video_batcher = MicroBatcher(
+            "video",
+            lambda feed: self.video_session.run(None, feed),
+            settings.VIDEO_BATCH_MAX_SIZE,
+            settings.VIDEO_BATCH_MAX_WAIT_MS,
+        )
+        # 骨干输入为 (1, 新帧数, 3, H, W)，新帧数相同的请求才会合批
+        self.video_backbone_batcher = MicroBatcher(
+            "video_backbone",
+            lambda feed: self.video_backbone_session.run(None, feed),
+            settings.VIDEO_BATCH_MAX_SIZE,
+            settings.VIDEO_BATCH_MAX_WAIT_MS,
+        )
+        self.video_temporal_batcher = MicroBatcher(
+            "video_temporal",
+            lambda feed: self.video_temporal_session.run(None, feed),
+            settings.VIDEO_BATCH_MAX_SIZE,
+            settings.VIDEO_BATCH_MAX_WAIT_MS,
+        )
+        self.text_batcher = MicroBatcher(
+            "text",
+            lambda feed: self.text_session.run(None, feed),
+            settings.TEXT_BATCH_MAX_SIZE,
+            settings.TEXT_BATCH_MAX_WAIT_MS,
+        )
+
+    def set_role(self, role: str):
+        """设置进程角色 (Celery Worker 启动时设置为 "worker")"""
+        if role != self.role:
+            logger.info(f"ModelService role: {self.role} -> {role}")
+        self.role = role
+
+    def is_loaded(self, modality: str) -> bool:
+        return modality in self._loaded
+
+    def ensure_loaded(self, modality: str) -> bool:
+        """
+        确保指定模态的模型已加载 (首次调用时加载)
+        Returns: 是否可以推理 (api 角色始终返回 False)
+        """
+        if modality in self._loaded:
+            return True
+        if self.role != "worker":
+            logger.warning(f"Model loading for '{modality}' is disabled in '{self.role}' process")
+            return False
+
+        with self._load_lock:
+            if modality not in self._loaded:
+                loader = getattr(self, f"_load_{modality}")
+                start = time.perf_counter()
+                loader()
+                self.model_versions[modality] = self._fingerprint(modality)
+                self._loaded.add(modality)
+                logger.info(f"Model '{modality}' ready in {time.perf_counter() - start:.2f}s")
+        return True
+
+    def _path(self, key: str) -> str:
+        """模型路径配置项 (本版本覆盖的优先)"""
+        return self.paths.get(key) or getattr(settings, key)
+
+    def version_name(self, modality: str) -> str:
+        """模型版本号 (写入检测结果与 AIDetectionLog.model_version)"""
+        return self.version or default_version(modality)
+
+    def _model_path(self, path: str, modality: str) -> str:
+        """配置中的 FP32 模型路径 -> 按模型变体选择的实际文件"""
+        if path not in self._model_paths:
+            self._model_paths[path] = resolve_model_path(path, modality)
+        return self._model_paths[path]
+
+    def _model_files(self, modality: str) -> List[str]:
+        if modality == "voice":
+            return [self._model_path(self._path("VOICE_MODEL_PATH"), "voice")] + [
+                os.path.join(self._path("VOICE_ML_MODEL_DIR"), f"{name}.pkl") for name in ("gnb", "nmf", "svm")
+            ]
+        if modality == "video":
+            return [
+                self._model_path(self._path("VIDEO_MODEL_PATH"), "video"),
+                self._model_path(self._path("VIDEO_BACKBONE_MODEL_PATH"), "video"),
+                self._model_path(self._path("VIDEO_TEMPORAL_MODEL_PATH"), "video"),
+            ]
+        return [self._model_path(self._path("TEXT_MODEL_PATH"), "text"), self._path("TEXT_VOCAB_PATH")]
+
+    def _fingerprint(self, modality: str) -> str:
+        """模型文件 (大小 + 修改时间)、判定阈值与版本号的短哈希"""
+        h = hashlib.blake2b(digest_size=6)
+        for path in self._model_files(modality):
+            try:
+                st = os.stat(path)
+                h.update(f"{path}:{st.st_size}:{st.st_mtime_ns};".encode())
+            except OSError:
+                h.update(f"{path}:missing;".encode())
+        threshold = getattr(settings, f"{modality.upper()}_DETECTION_THRESHOLD")
+        h.update(f"threshold:{threshold};version:{self.version_name(modality)}".encode())
+        return h.hexdigest()
+
+    def model_version(self, modality: str) -> str:
+        version = self.model_versions.get(modality)
+        if version is None:
+            version = self.model_versions[modality] = self._fingerprint(modality)
+        return version
+
+    async def _cached(self, modality: str, parts: tuple, compute: Callable[[], Awaitable[Dict]]) -> Dict:
+        """按 (模态, 模型版本, 输入内容) 查询结果缓存，未命中时计算并写回"""
+        key = result_cache.make_key(modality, self.model_version(modality), *parts)
+        cached = await result_cache.get(key)
+        if cached is not None:
+            return cached
+        result = await compute()
+        result.setdefault("model_version", self.version_name(modality))
+        await result_cache.put(key, result)
+        return result
+
+    # ---------------- 模型注册表: 热更新与版本分流 ----------------
+
+    def _route(self, modality: str, route_key=None) -> "ModelService":
+        """
+        选择处理本次请求的版本实例
+        route_key (通话 ID) 按哈希分桶，同一通话始终落在同一版本；没有 key 时随机分流
+        """
+        self._poll_registry()
+        route = self._routes.get(modality)
+        if route is None:
+            return self
+        if route.candidate is not None and route.share > 0:
+            bucket = random.random() if route_key is None else route_bucket(modality, route_key)
+            if bucket < route.share:
+                return route.candidate
+        return route.active
+
+    def _route_targets(self, modality: str) -> List["ModelService"]:
+        route = self._routes.get(modality)
+        if route is None:
+            return [self]
+        return [route.active] + ([route.candidate] if route.candidate is not None else [])
+
+    def _poll_registry(self):
+        """注册表文件变化后在后台线程重新加载 (每 MODEL_REGISTRY_POLL_SECONDS 最多检查一次)"""
+        if self.version is not None or self.role != "worker" or not settings.MODEL_REGISTRY_ENABLED:
+            return
+        now = time.monotonic()
+        if now - self._registry_checked_at < settings.MODEL_REGISTRY_POLL_SECONDS:
+            return
+        self._registry_checked_at = now
         try:
-            # 1. 加载深度流 (ONNX)
-            if Path(settings.VOICE_MODEL_PATH).exists():
-                self.voice_session = ort.InferenceSession(
-                    settings.VOICE_MODEL_PATH,
-                    providers=['CPUExecutionProvider']
+            mtime = os.stat(settings.MODEL_REGISTRY_PATH).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime != self._registry_mtime:
+            self._registry_mtime = mtime
+            threading.Thread(target=self.apply_registry, name="model-registry", daemon=True).start()
+
+    def apply_registry(self, manifest: Optional[Dict[str, dict]] = None) -> Dict[str, ModelRoute]:
+        """
+        按注册表更新各模态的路由 (Worker 启动时同步调用，运行中由 _poll_registry 在后台线程调用)
+        新版本先加载并预热，全部就绪后才替换路由，切换是一次引用赋值；
+        加载失败的版本记录错误并保留原路由。被替换下来的版本在 MODEL_REGISTRY_DRAIN_SECONDS 后释放。
+        """
+        with self._registry_lock:
+            if manifest is None:
+                try:
+                    manifest = load_manifest()
+                except (OSError, ValueError) as e:
+                    logger.error(f"Model registry not applied: {e}")
+                    return dict(self._routes)
+
+            for modality in self.MODALITIES:
+                spec = manifest.get(modality) or {}
+                old_targets = self._route_targets(modality)
+                active = self._version_service(modality, spec.get("active") or default_version(modality), spec)
+                if active is None:
+                    continue
+                candidate, share = None, float(spec.get("candidate_share", 0.0))
+                if spec.get("candidate") and share > 0:
+                    candidate = self._version_service(modality, spec["candidate"], spec)
+                route = ModelRoute(active, candidate, share if candidate is not None else 0.0)
+                if route == self._routes.get(modality, ModelRoute(self)):
+                    continue
+
+                self._routes[modality] = route
+                logger.info(
+                    f"Model route '{modality}': active={active.version_name(modality)}"
+                    + (f", candidate={candidate.version_name(modality)} ({route.share:.0%})" if candidate else "")
                 )
-                logger.info(f"✓ Voice Deep Model loaded: {settings.VOICE_MODEL_PATH}")
-            else:
-                logger.warning(f"⚠ Voice model not found at {settings.VOICE_MODEL_PATH}, using Mock.")
-                self.voice_session = MockOnnxSession("voice")
+                retired = [svc for svc in old_targets if svc not in self._route_targets(modality)]
+                if retired:
+                    timer = threading.Timer(settings.MODEL_REGISTRY_DRAIN_SECONDS, self._retire, (modality, retired))
+                    timer.daemon = True
+                    timer.start()
+            return dict(self._routes)
 
-            # 2. 加载统计流 (PKL)
-            ml_path = Path("./models/ml") # 确保路径对应
+    def _version_service(self, modality: str, name: str, spec: dict) -> Optional["ModelService"]:
+        """取得 (必要时加载并预热) 指定版本的实例；默认版本即根实例本身"""
+        versions = spec.get("versions") or {}
+        if name not in versions:
+            if name != default_version(modality):
+                logger.error(f"Model version '{modality}:{name}' is not registered")
+                return None
+            service, key = self, None
+        else:
             try:
-                if (ml_path / "gnb.pkl").exists():
-                    self.gnb_model = joblib.load(ml_path / "gnb.pkl")
-                    self.nmf_model = joblib.load(ml_path / "nmf.pkl")
-                    self.svm_model = joblib.load(ml_path / "svm.pkl")
-                    logger.info("✓ Voice Statistical Models loaded")
+                paths = version_paths(modality, versions[name])
+            except ValueError as e:
+                logger.error(f"Model version '{modality}:{name}' rejected: {e}")
+                return None
+            key = (modality, name, tuple(sorted(paths.items())))
+            service = self._version_services.get(key) or ModelService(role=self.role, version=name, paths=paths)
+
+        # 正在服务的版本不重复预热；新加入路由的版本 (包括切回的默认版本) 预热完成后才参与路由
+        if self.role == "worker" and service not in self._route_targets(modality) and modality not in service._warmed:
+            service._warm(modality)
+            if not self._real_session(service._primary_session(modality)):
+                logger.error(f"Model version '{modality}:{name}' failed to load")
+                return None
+        if key is not None:
+            self._version_services[key] = service
+        return service
+
+    def _primary_session(self, modality: str):
+        return getattr(self, f"{modality}_session")
+
+    def _retire(self, modality: str, services: List["ModelService"]):
+        """释放已下线的版本 (仍被路由引用的跳过: 排空期间可能又切回来了)"""
+        with self._registry_lock:
+            for service in services:
+                if service in self._route_targets(modality):
+                    continue
+                if service is self:
+                    self._unload(modality)
                 else:
-                    logger.warning("⚠ ML models not found in models/ml/")
+                    self._version_services = {k: v for k, v in self._version_services.items() if v is not service}
+                    service.close()
+                logger.info(f"Model version '{modality}:{service.version_name(modality)}' released")
+
+    def _unload(self, modality: str):
+        """释放根实例的某个模态 (其他版本接管后)，之后切回默认版本时重新加载"""
+        with self._load_lock:
+            if modality == "voice":
+                self.voice_session = self.gnb_model = self.nmf_model = self.svm_model = None
+            elif modality == "video":
+                self.video_session = self.video_backbone_session = self.video_temporal_session = None
+            else:
+                self.text_session = self.tokenizer = self.text_encoder = None
+            self._loaded.discard(modality)
+            self._warmed.discard(modality)
+            self.model_versions.pop(modality, None)
+
+    def close(self):
+        """停止全部微批处理线程 (版本实例下线时调用，进行中的请求仍持有会话引用，完成后随实例回收)"""
+        for batcher in (
+            self.voice_batcher, self.video_batcher, self.video_backbone_batcher,
+            self.video_temporal_batcher, self.text_batcher,
+        ):
+            batcher.close()
+
+    def load_all(self):
+        """加载全部模态 (用于需要预加载的场景)"""
+        for modality in self.MODALITIES:
+            self.ensure_loaded(modality)
+
+    def warmup(self, modalities: Optional[List[str]] = None) -> Dict[str, float]:
+        """
+        加载并预热指定模态 (None 为全部)，返回各模态预热耗时 (ms)
+
+        每个 ONNX 会话的第一次推理要分配内存池、选择算子实现，
+        这里用线上实际出现的输入形状各跑一次，避免部署或子进程回收后的第一批任务变慢。
+        直接调用 session.run，不经过微批处理器与结果缓存。
+        已预热的模态跳过；注册表加载的版本在加入路由前已经预热过。
+        """
+        report = {}
+        total_start = time.perf_counter()
+        for modality in self.MODALITIES if modalities is None else modalities:
+            targets = self._route_targets(modality)
+            if self not in targets:
+                report[modality] = sum(t.warmup_report.get(modality, 0.0) for t in targets)
+                continue
+            if self._warm(modality):
+                report[modality] = self.warmup_report[modality]
+
+        logger.info(f"Warm-up finished in {(time.perf_counter() - total_start) * 1000:.1f} ms: {report}")
+        return report
+
+    def _warm(self, modality: str) -> bool:
+        """加载并预热本实例的一个模态 (已预热的跳过)，Returns: 是否可以推理"""
+        if modality in self._warmed:
+            return True
+        if not self.ensure_loaded(modality):
+            return False
+        start = time.perf_counter()
+        runs = 0
+        try:
+            for run in self._warmup_runs(modality):
+                run()
+                runs += 1
+        except Exception as e:
+            logger.error(f"Warm-up failed for '{modality}': {e}", exc_info=True)
+        self.warmup_report[modality] = round((time.perf_counter() - start) * 1000, 1)
+        self._warmed.add(modality)
+        logger.info(f"Model '{modality}' warmed up: {runs} runs in {self.warmup_report[modality]} ms")
+        return True
+
+    def preload_shared(self, modalities: Optional[List[str]] = None) -> Dict[str, List[str]]:
+        """
+        Celery prefork 主进程在 fork 前调用: 准备子进程可以共享的模型产物，返回各模态准备好的文件
+
+            ONNX       生成外部权重格式的优化模型 (一次性会话用完即释放)，子进程创建会话时 mmap 同一份权重文件。
+                       主进程不保留任何 ORT 会话: 会话的线程池在 fork 后不可用，仍由各子进程自己创建
+            PKL        joblib mmap_mode="r" 加载，fork 后子进程直接继承
+            Tokenizer  在主进程构建，关闭 tokenizers 的并行 (其 Rust 线程池同样不能跨 fork)
+
+        最后 gc.freeze() 把已有对象移出 GC 追踪，子进程的垃圾回收不再写这些对象所在的页，减少写时复制。
+        """
+        os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+        report = {}
+        for modality in self.MODALITIES if modalities is None else modalities:
+            prepared = []
+            for path in self._model_files(modality):
+                if not path.endswith(".onnx") or not Path(path).exists():
+                    continue
+                try:
+                    cached = prepare_optimized_model(path, ort_config(modality))
+                except Exception as e:
+                    logger.error(f"Failed to prepare shared model {path}: {e}")
+                    continue
+                if cached:
+                    prepared.append(cached)
+            if modality == "voice" and self._load_voice_ml():
+                prepared.append(self._path("VOICE_ML_MODEL_DIR"))
+            try:
+                if modality == "text" and self._load_text_encoder():
+                    prepared.append(self._path("TEXT_VOCAB_PATH"))
             except Exception as e:
-                logger.error(f"Failed to load ML models: {e}")
+                logger.error(f"Failed to preload text tokenizer: {e}")
+            report[modality] = prepared
+        gc.freeze()
+        logger.info(f"Shared model artifacts prepared before fork: {report}")
+        return report
 
-            # === 3. 加载视频模型 (ONNX) ===
-            if Path(settings.VIDEO_MODEL_PATH).exists():
-                self.video_session = ort.InferenceSession(
-                    settings.VIDEO_MODEL_PATH, 
-                    providers=['CPUExecutionProvider']
-                )
-                logger.info(f"✅ Video Model loaded: {settings.VIDEO_MODEL_PATH}")
+    @staticmethod
+    def _real_session(session) -> bool:
+        return session is not None and not isinstance(session, MockOnnxSession)
+
+    def _warmup_runs(self, modality: str):
+        """生成预热调用 (每个元素是一个无参函数)，输入形状与线上一致"""
+        rng = np.random.default_rng(0)
+
+        def run(session, feed):
+            return lambda: session.run(None, feed)
+
+        if modality == "voice":
+            # 特征前端 (滤波器组缓存) + 3s 窗口的 log-mel，批大小 1 与微批上限各一次
+            y = rng.standard_normal(int(settings.VOICE_SAMPLE_RATE * settings.VOICE_WINDOW_SECONDS)).astype(np.float32) * 0.1
+            features = audio_front_end.extract(y, log_mel=True, mfcc=self._has_voice_ml)
+            if self._real_session(self.voice_session):
+                name = self.voice_session.get_inputs()[0].name
+                log_mel = features.log_mel[np.newaxis, np.newaxis].astype(np.float32)
+                for batch in sorted({1, max(1, settings.VOICE_BATCH_MAX_SIZE)}):
+                    yield run(self.voice_session, {name: np.repeat(log_mel, batch, axis=0)})
+            if self._has_voice_ml:
+                ml_input = features.mfcc_stats.reshape(1, -1)
+                yield lambda: self.svm_model.predict_proba(self.nmf_model.transform(self.gnb_model.predict_proba(ml_input)))
+
+        elif modality == "video":
+            width, height = settings.VIDEO_INPUT_SIZE
+            seq_len = 10
+            frames = rng.standard_normal((1, seq_len, 3, height, width)).astype(np.float32)
+            if self._real_session(self.video_session):
+                yield run(self.video_session, {self.video_session.get_inputs()[0].name: frames})
+            if self.video_streaming:
+                # 流式推理: 骨干处理 stride 个新帧 (首个窗口为整段)，时序头处理整段特征序列
+                backbone_name = self.video_backbone_session.get_inputs()[0].name
+                for k in sorted({min(settings.VIDEO_WINDOW_STRIDE, seq_len), seq_len}):
+                    yield run(self.video_backbone_session, {backbone_name: np.ascontiguousarray(frames[:, :k])})
+                embeddings = self.video_backbone_session.run(None, {backbone_name: frames})[0]
+                yield run(self.video_temporal_session, {self.video_temporal_session.get_inputs()[0].name: embeddings})
+
+        elif modality == "text":
+            if self._real_session(self.text_session) and self.text_encoder is not None:
+                buckets = self.text_encoder.buckets
+                for length in buckets:
+                    ids = rng.integers(1000, 5000, size=(1, length), dtype=np.int64)
+                    yield run(self.text_session, {"input_ids": ids, "attention_mask": np.ones_like(ids)})
+                # 最短的桶最常见，也最容易凑满微批
+                batch = max(1, settings.TEXT_BATCH_MAX_SIZE)
+                ids = rng.integers(1000, 5000, size=(batch, buckets[0]), dtype=np.int64)
+                yield run(self.text_session, {"input_ids": ids, "attention_mask": np.ones_like(ids)})
+
+    def _load_voice(self):
+        """加载声音检测模型 (深度流 ONNX + 统计流 PKL)"""
+        try:
+            # 1. 加载深度流 (ONNX)
+            model_path = self._model_path(self._path("VOICE_MODEL_PATH"), "voice")
+            if Path(model_path).exists():
+                self.voice_session = create_session(model_path, "voice")
+                logger.info(f"✓ Voice Deep Model loaded: {model_path}")
+            else:
+                logger.warning(f"⚠ Voice model not found at {model_path}, using Mock.")
+                self.voice_session = MockOnnxSession("voice")
+        except Exception as e:
+            logger.error(f"Error loading voice model: {e}")
+
+        # 2. 加载统计流 (PKL)
+        if self.gnb_model is None:
+            self._load_voice_ml()
+
+    def _load_voice_ml(self) -> bool:
+        """加载统计流 PKL (只读 mmap，prefork 主进程预加载后子进程直接继承)"""
+        import joblib
+
+        if self.gnb_model is not None:
+            return True
+        ml_path = Path(self._path("VOICE_ML_MODEL_DIR"))
+        try:
+            if (ml_path / "gnb.pkl").exists():
+                self.gnb_model = joblib.load(ml_path / "gnb.pkl", mmap_mode="r")
+                self.nmf_model = joblib.load(ml_path / "nmf.pkl", mmap_mode="r")
+                self.svm_model = joblib.load(ml_path / "svm.pkl", mmap_mode="r")
+                logger.info("✓ Voice Statistical Models loaded")
+                return True
+            logger.warning(f"⚠ ML models not found in {ml_path}")
+        except Exception as e:
+            logger.error(f"Failed to load ML models: {e}")
+        return False
+
+    def _load_video(self):
+        """加载视频模型 (ONNX)"""
+        try:
+            model_path = self._model_path(self._path("VIDEO_MODEL_PATH"), "video")
+            if Path(model_path).exists():
+                self.video_session = create_session(model_path, "video")
+                logger.info(f"✅ Video Model loaded: {model_path}")
             else:
                 logger.warning(f"⚠️ Video model not found, using Mock.")
                 self.video_session = MockOnnxSession("video")
-                
-            # === 4. 加载文本模型 (BERT ONNX + Tokenizer) ===
-            # [新增调试代码] 打印绝对路径，看看 Celery 到底在读哪里
-            abs_path = os.path.abspath(settings.TEXT_MODEL_PATH)
-            logger.info(f"[DEBUG] Loading Text Model from: {abs_path}")
-            
-            if Path(settings.TEXT_MODEL_PATH).exists() and Path(settings.TEXT_VOCAB_PATH).exists():
-                try:
-                    # [新增调试代码] 打印文件大小
-                    size = os.path.getsize(settings.TEXT_MODEL_PATH) / (1024 * 1024)
-                    logger.info(f"[DEBUG] File Size: {size:.2f} MB")
-
-                    self.tokenizer = BertTokenizer.from_pretrained(settings.TEXT_VOCAB_PATH)
-                    
-                    self.text_session = ort.InferenceSession(
-                        settings.TEXT_MODEL_PATH, 
-                        providers=['CPUExecutionProvider']
-                    )
-                    
-                    # [新增调试代码] 让 Celery 亲口告诉我们它看到的入口是什么
-                    input_names = [i.name for i in self.text_session.get_inputs()]
-                    logger.info(f"[DEBUG] Actual Input Names in Memory: {input_names}")
-                    
-                    logger.info(f"✅ Text Fraud Model loaded")
-                except Exception as e:
-                    logger.error(f"❌ Error loading Text model details: {e}")
-                    self.text_session = MockOnnxSession("text")
+        except Exception as e:
+            logger.error(f"Error loading video model: {e}")
 
+        # 拆分后的骨干 + 时序头 (可选)
+        if not settings.VIDEO_STREAMING_ENABLED:
+            return
+        if not (Path(self._path("VIDEO_BACKBONE_MODEL_PATH")).exists() and Path(self._path("VIDEO_TEMPORAL_MODEL_PATH")).exists()):
+            logger.info("Split video models not found, streaming video inference disabled")
+            return
+        try:
+            backbone = create_session(self._model_path(self._path("VIDEO_BACKBONE_MODEL_PATH"), "video"), "video")
+            temporal = create_session(self._model_path(self._path("VIDEO_TEMPORAL_MODEL_PATH"), "video"), "video")
+            self.video_backbone_session, self.video_temporal_session = backbone, temporal
+            logger.info("✅ Video streaming models loaded (backbone + temporal head)")
         except Exception as e:
-            logger.error(f"Error loading models: {e}")
+            logger.error(f"Error loading split video models: {e}")
+
+    @property
+    def video_streaming(self) -> bool:
+        """是否可以使用逐帧特征缓存的流式视频推理"""
+        return self.video_backbone_session is not None and self.video_temporal_session is not None
+
+    def _load_text(self):
+        """加载文本模型 (BERT ONNX + Tokenizer)"""
+        model_path = self._model_path(self._path("TEXT_MODEL_PATH"), "text")
+        abs_path = os.path.abspath(model_path)
+        logger.info(f"Loading Text Model from: {abs_path}")
+        
+        if Path(model_path).exists() and Path(self._path("TEXT_VOCAB_PATH")).exists():
+            try:
+                size = os.path.getsize(model_path) / (1024 * 1024)
+                logger.info(f"Text model file size: {size:.2f} MB")
+
+                if self.text_encoder is None:
+                    self._load_text_encoder()
+                
+                self.text_session = create_session(model_path, "text")
+                
+                input_names = [i.name for i in self.text_session.get_inputs()]
+                logger.info(f"Text model input names: {input_names}")
+                
+                logger.info(f"✅ Text Fraud Model loaded")
+            except Exception as e:
+                logger.error(f"❌ Error loading Text model details: {e}")
+                self.text_session = MockOnnxSession("text")
+
+    def _load_text_encoder(self) -> bool:
+        """构建 Tokenizer + 长度分桶编码器 (prefork 主进程预加载后子进程直接继承)"""
+        if self.text_encoder is not None:
+            return True
+        if not Path(self._path("TEXT_VOCAB_PATH")).exists():
+            return False
+        self.text_encoder = build_text_encoder(self._path("TEXT_VOCAB_PATH"))
+        self.tokenizer = self.text_encoder.tokenizer
+        logger.info(f"Text tokenizer: {type(self.tokenizer).__name__}, buckets={self.text_encoder.buckets}")
+        return True
 
     def _calculate_risk_level(self, probability: float, threshold: float) -> str:
         if probability >= 0.9: return "critical"
@@ -119,62 +747,98 @@ class ModelService:
         elif probability >= (threshold / 2): return "medium"
         else: return "low"
 
-    async def predict_voice(self, audio_bytes: bytes) -> Dict:
+    async def predict_voice(
+        self, audio_bytes: bytes, audio_format: Optional[str] = None, call_id: Optional[int] = None
+    ) -> Dict:
         """
         声音伪造检测 (接收原始音频 bytes -> 内部提取双流特征 -> 融合)
+        audio_format: "wav" (默认，容器解码) 或 "pcm_s16le@<rate>" (裸 PCM，跳过 librosa.load)
+        call_id: 版本分流的路由 key，同一通话固定使用同一模型版本
         """
-        score_dl = 0.5
-        score_ml = 0.5
-        has_dl = False
-        has_ml = False
+        model = self._route("voice", call_id)
+        if not model.ensure_loaded("voice"):
+            return {"confidence": 0.0, "is_fake": False, "error": "Voice model not available in this process"}
+
+        return await model._cached(
+            "voice", ("audio", audio_format or "wav", audio_bytes),
+            lambda: model._predict_voice(audio_bytes, audio_format)
+        )
 
+    async def _predict_voice(self, audio_bytes: bytes, audio_format: Optional[str]) -> Dict:
         try:
             # === 0. 统一预处理 ===
-            # 使用 librosa 加载 (重采样到 16k)
-            y, sr = librosa.load(io.BytesIO(audio_bytes), sr=16000)
+            # 解码 (重采样到 16k；16k 裸 PCM 直接 frombuffer)
+            timings: Dict[str, float] = {}
+            y = audio_front_end.decode(audio_bytes, timings, audio_format)
             if len(y) < 100:
                 return {"confidence": 0.0, "is_fake": False, "error": "Audio too short"}
 
+            # 双流特征一次算完: 共享功率谱与缓存的 mel 滤波器组 (参数见 settings.VOICE_*)
+            features = audio_front_end.extract(
+                y, log_mel=bool(self.voice_session), mfcc=self._has_voice_ml, timings=timings
+            )
+        except Exception as e:
+            logger.error(f"Prediction failed: {e}", exc_info=True)
+            return {"confidence": 0.0, "is_fake": False, "error": str(e)}
+
+        return await self._score_voice_features(features)
+
+    @property
+    def _has_voice_ml(self) -> bool:
+        return bool(self.gnb_model and self.nmf_model and self.svm_model)
+
+    async def predict_voice_features(self, features: VoiceFeatures, call_id: Optional[int] = None) -> Dict:
+        """
+        双流打分 + 融合 (输入为已提取好的特征)
+        流式语音检测时特征由 API 端的增量特征前端算好 (见 AudioProcessor)，Worker 只做推理
+        """
+        model = self._route("voice", call_id)
+        if not model.ensure_loaded("voice"):
+            return {"confidence": 0.0, "is_fake": False, "error": "Voice model not available in this process"}
+
+        return await model._cached(
+            "voice", ("features", features.log_mel, features.mfcc_stats),
+            lambda: model._score_voice_features(features)
+        )
+
+    async def _score_voice_features(self, features: VoiceFeatures) -> Dict:
+        score_dl = 0.5
+        score_ml = 0.5
+        has_dl = False
+        has_ml = False
+        timings = dict(features.timings)
+
+        try:
             # === Stream A: 深度流 (ResNet) ===
             # 需求: Log-Mel Spectrogram (1, 1, 64, Time)
-            if self.voice_session:
-                # 1. 提取 Mel 谱图 (参数需与训练时 dataset_loader.py 一致)
-                mel_spec = librosa.feature.melspectrogram(
-                    y=y, sr=16000, n_mels=64, n_fft=1024, hop_length=512
-                )
-                # 2. 转 Log 刻度 (AmplitudeToDB)
-                log_mel = librosa.power_to_db(mel_spec, ref=np.max)
-                
-                # 3. 构造输入 Tensor (Batch=1, Channel=1, Freq=64, Time=...)
+            if self.voice_session and features.log_mel is not None:
+                # 1. 构造输入 Tensor (Batch=1, Channel=1, Freq=64, Time=...)
                 # 注意: ONNX 输入是 float32
-                dl_input = log_mel[np.newaxis, np.newaxis, :, :].astype(np.float32)
+                dl_input = features.log_mel[np.newaxis, np.newaxis, :, :].astype(np.float32)
                 
-                # 4. 推理
+                # 2. 推理 (经微批处理器与其他请求合批)
+                start = time.perf_counter()
                 input_name = self.voice_session.get_inputs()[0].name
-                output = self.voice_session.run(None, {input_name: dl_input})
+                logits = await self.voice_batcher.infer({input_name: dl_input})
+                timings["dl_infer"] = (time.perf_counter() - start) * 1000
                 
-                # 5. Softmax
-                logits = output[0]
+                # 3. Softmax
                 probs = np.exp(logits) / np.sum(np.exp(logits), axis=1, keepdims=True)
                 score_dl = float(probs[0][1]) # Index 1 是 Fake
                 has_dl = True
 
             # === Stream B: 统计流 (GNB -> NMF -> SVM) ===
             # 需求: MFCC (Time, 20) -> Mean/Std 统计量
-            if self.gnb_model and self.nmf_model and self.svm_model:
-                # 1. 提取 MFCC
-                mfcc = librosa.feature.mfcc(y=y, sr=16000, n_mfcc=20)
-                
-                # 2. 计算统计特征 (Mean + Std) -> 40维向量
-                # 注意: 这里必须与 train_ml_stream.py 里的 extract_features 逻辑完全一致
-                mfcc_mean = np.mean(mfcc, axis=1)
-                mfcc_std = np.std(mfcc, axis=1)
-                ml_input = np.concatenate([mfcc_mean, mfcc_std]).reshape(1, -1)
+            if self._has_voice_ml and features.mfcc_stats is not None:
+                # 1. 统计特征 (MFCC Mean + Std) -> 40维向量 (已由特征前端算好)
+                ml_input = features.mfcc_stats.reshape(1, -1)
                 
-                # 3. 流水线推理
+                # 2. 流水线推理
+                start = time.perf_counter()
                 prob_feats = self.gnb_model.predict_proba(ml_input) # GNB
                 nmf_feats = self.nmf_model.transform(prob_feats)    # NMF
                 score_ml = float(self.svm_model.predict_proba(nmf_feats)[0][1]) # SVM
+                timings["ml_infer"] = (time.perf_counter() - start) * 1000
                 has_ml = True
 
             # === Fusion: 决策融合 ===
@@ -199,30 +863,55 @@ class ModelService:
                 "is_fake": final_score > threshold,
                 "risk_level": self._calculate_risk_level(final_score, threshold),
                 "method": method,
-                "details": {"dl_score": score_dl, "ml_score": score_ml}
+                "details": {"dl_score": score_dl, "ml_score": score_ml},
+                "timings": {stage: round(ms, 2) for stage, ms in timings.items()} # 各阶段耗时 (ms)
             }
 
         except Exception as e:
             logger.error(f"Prediction failed: {e}", exc_info=True)
             return {"confidence": 0.0, "is_fake": False, "error": str(e)}
 
-    async def predict_video(self, video_tensor: np.ndarray) -> Dict:
+    async def predict_video(
+        self,
+        video_tensor: np.ndarray,
+        call_id: Optional[int] = None,
+        frame_ids: Optional[List[str]] = None
+    ) -> Dict:
         """
         视频Deepfake检测 (ResNet+LSTM 时序检测)
+
+        传入 call_id 与逐帧编号 frame_ids (与 video_tensor 的 T 维对齐) 且拆分模型可用时走流式推理:
+        只有缓存中没有的帧经过 CNN 骨干，时序头在缓存的特征序列上运行
         """
-        if self.video_session is None:
+        model = self._route("video", call_id)
+        if not model.ensure_loaded("video") or model.video_session is None:
             return {"confidence": 0.0, "is_deepfake": False, "message": "Video model not loaded"}
-        
+
+        # 强制转 float32
+        video_tensor = video_tensor.astype(np.float32, copy=False)
+        return await model._cached(
+            "video", (video_tensor,),
+            lambda: model._predict_video(video_tensor, call_id, frame_ids)
+        )
+
+    async def _predict_video(
+        self, video_tensor: np.ndarray, call_id: Optional[int], frame_ids: Optional[List[str]]
+    ) -> Dict:
         try:
-            # 1. 准备输入
-            input_name = self.video_session.get_inputs()[0].name
-            
-            # 强制转 float32
-            video_tensor = video_tensor.astype(np.float32)
-            
-            # 2. 执行推理
-            outputs = self.video_session.run(None, {input_name: video_tensor})
-            logits = outputs[0]
+
+            streaming = (
+                self.video_streaming and call_id is not None
+                and frame_ids is not None and len(frame_ids) == video_tensor.shape[1]
+            )
+            if streaming:
+                logits, backbone_frames = await self._predict_video_streaming(video_tensor, call_id, frame_ids)
+            else:
+                # 1. 准备输入
+                input_name = self.video_session.get_inputs()[0].name
+
+                # 2. 执行推理 (经微批处理器与其他请求合批)
+                logits = await self.video_batcher.infer({input_name: video_tensor})
+                backbone_frames = video_tensor.shape[1]
             
             # ================= [Debug 日志] =================
             # 看看原始输出到底是多少。如果是 [-120, 50]，那 Softmax 肯定就是 0.0
@@ -247,7 +936,9 @@ class ModelService:
                 "is_deepfake": is_deepfake,
                 "risk_level": risk_level,
                 "threshold": threshold,
-                "model_version": "v2.0-lstm",
+                "model_version": self.version_name("video"),
+                "streaming": streaming,
+                "backbone_frames": backbone_frames, # 本次实际经过 CNN 骨干的帧数
                 "raw_logits": logits.tolist() # 把原始分也返回回去
             }
             
@@ -255,52 +946,98 @@ class ModelService:
             logger.error(f"Video prediction failed: {e}", exc_info=True)
             return {"confidence": 0.0, "is_deepfake": False, "error": str(e)}
 
-    def predict_text(self, text: str) -> dict:
+    async def _predict_video_streaming(
+        self, video_tensor: np.ndarray, call_id: int, frame_ids: List[str]
+    ) -> Tuple[np.ndarray, int]:
+        """
+        流式视频推理: 骨干只处理未缓存的帧，时序头处理整段特征序列 (1, T, D)
+        Returns: (logits, 本次经过骨干的帧数)
+        """
+        # 缓存的特征只对产生它的骨干有效: 帧编号带上模型版本，切换版本后不会混用
+        version = self.model_version("video")
+        frame_ids = [f"{version}:{frame_id}" for frame_id in frame_ids]
+        embeddings = await frame_embedding_cache.get_many(call_id, frame_ids)
+        missing = [i for i, emb in enumerate(embeddings) if emb is None]
+
+        if missing:
+            backbone_input = self.video_backbone_session.get_inputs()[0].name
+            new_frames = np.ascontiguousarray(video_tensor[:, missing])
+            new_embeddings = (await self.video_backbone_batcher.infer({backbone_input: new_frames}))[0]  # (k, D)
+            for j, i in enumerate(missing):
+                embeddings[i] = new_embeddings[j]
+            await frame_embedding_cache.put_many(
+                call_id, [frame_ids[i] for i in missing], new_embeddings, keep=frame_ids
+            )
+
+        temporal_input = self.video_temporal_session.get_inputs()[0].name
+        sequence = np.stack(embeddings).astype(np.float32, copy=False)[np.newaxis]
+        logits = await self.video_temporal_batcher.infer({temporal_input: sequence})
+        return logits, len(missing)
+
+    async def predict_text(self, text: str, call_id: Optional[int] = None) -> dict:
         """文本诈骗检测"""
-        # 1. 检查模型是否加载
-        if not self.text_session or not self.tokenizer or isinstance(self.text_session, MockOnnxSession):
-            return {"risk_level": "unknown", "confidence": 0.0, "error": "Text Model not loaded"}
+        return (await self.predict_texts([text], call_id))[0]
+
+    async def predict_texts(self, texts: List[str], call_id: Optional[int] = None) -> List[dict]:
+        """
+        批量文本诈骗检测
+        一次分词得到 (N, bucket) 的输入，整批提交给微批处理器，结果按输入顺序返回
+        """
+        # 1. 检查模型是否加载 (整批使用同一版本)
+        model = self._route("text", call_id)
+        if not model.ensure_loaded("text") or not model.text_session or not model.text_encoder or isinstance(model.text_session, MockOnnxSession):
+            return [{"risk_level": "unknown", "confidence": 0.0, "error": "Text Model not loaded"} for _ in texts]
+        if not texts:
+            return []
 
+        # 命中缓存的直接返回，其余一次批量推理 (文本按空白规范化后计算哈希)
+        version = model.model_version("text")
+        keys = [result_cache.make_key("text", version, " ".join(t.split())) for t in texts]
+        results: List[Optional[dict]] = [await result_cache.get(key) for key in keys]
+        misses = [i for i, r in enumerate(results) if r is None]
+        if misses:
+            computed = await model._predict_texts([texts[i] for i in misses])
+            for i, result in zip(misses, computed):
+                result["model_version"] = model.version_name("text")
+                results[i] = result
+                await result_cache.put(keys[i], result)
+        return results
+
+    async def _predict_texts(self, texts: List[str]) -> List[dict]:
         try:
-            # 2. 预处理 (Tokenization)
-            inputs = self.tokenizer(
-                text,
-                return_tensors="np",
-                padding="max_length",
-                truncation=True,
-                max_length=256
-            )
-            
-            ort_inputs = {
-                "input_ids": inputs["input_ids"].astype(np.int64),
-                "attention_mask": inputs["attention_mask"].astype(np.int64)
-            }
+            # 2. 预处理 (Tokenization: 动态 padding + 长度分桶)
+            timings: Dict[str, float] = {}
+            ort_inputs = self.text_encoder.encode(list(texts), timings)
 
-            # 3. 推理
-            logits = self.text_session.run(None, ort_inputs)[0]
-            
-            # 4. Softmax
-            def softmax(x):
-                e_x = np.exp(x - np.max(x))
-                return e_x / e_x.sum()
+            # 3. 推理 (经微批处理器与同一长度桶的其他请求合批)
+            start = time.perf_counter()
+            logits = await self.text_batcher.infer(ort_inputs)
+            timings["inference"] = (time.perf_counter() - start) * 1000
 
-            probs = softmax(logits[0])
-            fraud_prob = float(probs[1]) # Label 1 是诈骗
+            # 4. Softmax
+            e_x = np.exp(logits - np.max(logits, axis=1, keepdims=True))
+            probs = e_x / e_x.sum(axis=1, keepdims=True)
 
             # 5. 结果判定 (使用配置文件中的阈值)
             threshold = settings.TEXT_DETECTION_THRESHOLD
-            is_fraud = fraud_prob > threshold
-            
-            return {
-                "risk_level": self._calculate_risk_level(fraud_prob, threshold),
-                "label": "fraud" if is_fraud else "normal",
-                "confidence": round(fraud_prob, 4),
-                "threshold": threshold,
-                "keywords": ["高风险语义"] if is_fraud else []
-            }
+            seq_len = int(ort_inputs["input_ids"].shape[1])
+            results = []
+            for row in probs:
+                fraud_prob = float(row[1]) # Label 1 是诈骗
+                is_fraud = fraud_prob > threshold
+                results.append({
+                    "risk_level": self._calculate_risk_level(fraud_prob, threshold),
+                    "label": "fraud" if is_fraud else "normal",
+                    "confidence": round(fraud_prob, 4),
+                    "threshold": threshold,
+                    "keywords": ["高风险语义"] if is_fraud else [],
+                    "seq_len": seq_len,
+                    "timings": {k: round(v, 2) for k, v in timings.items()},
+                })
+            return results
 
         except Exception as e:
             logger.error(f"Text prediction error: {e}")
-            return {"risk_level": "error", "details": str(e)}
+            return [{"risk_level": "error", "error": str(e), "details": str(e)} for _ in texts]
 
 model_service = ModelService()
\ No newline at end of file
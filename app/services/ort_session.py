@@ -0,0 +1,281 @@
+"""
+ONNX Runtime 会话工厂
+
+原来各模态直接 ort.InferenceSession(path, providers=['CPUExecutionProvider'])，全部使用默认 SessionOptions:
+每个 Celery prefork 子进程的 intra-op 线程池都按物理核数开满，多个子进程叠加后严重超订。
+这里统一由配置生成 SessionOptions:
+    线程数       intra-op 按模态配置，0 表示自动 = CPU 核数 / Worker 进程数；inter-op 只在并行执行模式下生效
+    图优化       ORT_GRAPH_OPTIMIZATION (disable/basic/extended/all)，优化后的模型缓存到 ORT_OPTIMIZED_MODEL_DIR，
+                 之后的进程直接加载优化结果 (关闭在线优化)，省去每次启动的图变换
+    执行模式     sequential / parallel
+    内存         CPU 内存池 (arena) 与内存复用规划 (mem pattern)
+    IO Binding   输入直接绑定 numpy 内存，输出写入按输入形状预分配的缓冲区 (ORT_IO_BINDING)
+    共享权重     ORT_SHARED_WEIGHTS: 优化模型的权重另存为外部数据文件，加载时关闭预打包 (prepacking)，
+                 权重直接 mmap 自该文件 —— prefork 的所有子进程 (包括按 max_tasks_per_child 回收重建的) 共享同一份页缓存
+模型变体: {模态}_MODEL_VARIANT=int8 时加载 scripts.quantize_models 生成的量化模型 (x.onnx -> x.int8.onnx)
+"""
+import hashlib
+import os
+import platform
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+from app.core.config import settings
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+PROVIDERS = ["CPUExecutionProvider"]
+
+# 大于该字节数的权重写入外部数据文件 (小张量留在模型文件内)
+SHARED_WEIGHTS_MIN_BYTES = 1024
+
+# Worker 进程数 (Celery 主进程启动时设置，prefork 子进程 fork 后继承)
+_worker_processes = 1
+
+
+def set_worker_processes(n: int):
+    global _worker_processes
+    _worker_processes = max(1, int(n or 1))
+
+
+def auto_intra_op_threads() -> int:
+    """CPU 核数在各 Worker 进程间平分，避免 intra-op 线程池超订"""
+    return max(1, (os.cpu_count() or 1) // _worker_processes)
+
+
+MODEL_VARIANTS = ("fp32", "int8")
+
+
+def variant_path(model_path: str, variant: str) -> str:
+    """模型变体的文件路径: models/x.onnx -> models/x.int8.onnx (fp32 即原文件)"""
+    if variant == "fp32":
+        return model_path
+    if variant not in MODEL_VARIANTS:
+        raise ValueError(f"Unknown model variant: {variant}")
+    path = Path(model_path)
+    return str(path.with_name(f"{path.stem}.{variant}{path.suffix}"))
+
+
+def resolve_model_path(model_path: str, modality: str) -> str:
+    """按 {模态}_MODEL_VARIANT 选择模型文件，量化模型不存在时回退到 FP32"""
+    variant = getattr(settings, f"{modality.upper()}_MODEL_VARIANT", "fp32")
+    path = variant_path(model_path, variant)
+    if path != model_path and not os.path.exists(path):
+        logger.warning(f"{variant} variant of {model_path} not found, falling back to fp32 (run scripts.quantize_models)")
+        return model_path
+    return path
+
+
+class OrtConfig(NamedTuple):
+    intra_op_threads: int
+    inter_op_threads: int
+    graph_optimization: str
+    execution_mode: str
+    mem_arena: bool
+    optimized_model_dir: Optional[str]
+    io_binding: bool
+    shared_weights: bool
+
+
+def ort_config(modality: Optional[str] = None, **overrides) -> OrtConfig:
+    """读取配置 (模态级线程数优先于全局值，0 表示自动)，overrides 用于基准测试覆盖单项"""
+    threads = getattr(settings, f"{modality.upper()}_ORT_INTRA_OP_THREADS", 0) if modality else 0
+    config = OrtConfig(
+        intra_op_threads=threads or settings.ORT_INTRA_OP_THREADS or auto_intra_op_threads(),
+        inter_op_threads=settings.ORT_INTER_OP_THREADS,
+        graph_optimization=settings.ORT_GRAPH_OPTIMIZATION,
+        execution_mode=settings.ORT_EXECUTION_MODE,
+        mem_arena=settings.ORT_ENABLE_MEM_ARENA,
+        optimized_model_dir=settings.ORT_OPTIMIZED_MODEL_DIR or None,
+        io_binding=settings.ORT_IO_BINDING,
+        shared_weights=settings.ORT_SHARED_WEIGHTS,
+    )
+    return config._replace(**overrides)
+
+
+def _optimization_level(name: str):
+    import onnxruntime as ort
+
+    levels = {
+        "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+        "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+        "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+        "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+    }
+    if name not in levels:
+        raise ValueError(f"Unknown ORT graph optimization level: {name}")
+    return levels[name]
+
+
+def build_session_options(config: OrtConfig):
+    import onnxruntime as ort
+
+    opts = ort.SessionOptions()
+    opts.intra_op_num_threads = config.intra_op_threads
+    opts.inter_op_num_threads = config.inter_op_threads
+    opts.graph_optimization_level = _optimization_level(config.graph_optimization)
+    if config.execution_mode == "parallel":
+        opts.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+    elif config.execution_mode == "sequential":
+        opts.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    else:
+        raise ValueError(f"Unknown ORT execution mode: {config.execution_mode}")
+    opts.enable_cpu_mem_arena = config.mem_arena
+    opts.enable_mem_pattern = config.mem_arena
+    return opts
+
+
+# 影响 ORT 内核选择与 NCHWc 分块大小的指令集 (x86 /proc/cpuinfo flags, ARM Features)
+_SIMD_FLAG_PREFIXES = ("sse", "avx", "fma", "f16c", "amx", "asimd", "sve", "i8mm", "bf16")
+
+
+@lru_cache(maxsize=None)
+def cpu_features() -> str:
+    """当前 CPU 支持的 SIMD 指令集 (读不到 /proc/cpuinfo 时用 platform.processor())"""
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key.strip() in ("flags", "Features"):
+                    return " ".join(sorted(flag for flag in value.split() if flag.startswith(_SIMD_FLAG_PREFIXES)))
+    except OSError:
+        pass
+    return platform.processor()
+
+
+def optimized_model_path(model_path: str, config: OrtConfig) -> Optional[str]:
+    """
+    优化后模型的缓存路径
+    key 包含源模型 (路径/大小/修改时间)、优化级别、ORT 版本、CPU 架构与 SIMD 指令集:
+    level=all 的结果含硬件相关的算子布局 (例如 AVX2 与 AVX-512 的 NCHWc 分块大小不同)，共享缓存目录的机器不能混用；
+    共享权重模式的文件布局不同 (权重在外部数据文件中)，使用单独的 key
+    """
+    if not config.optimized_model_dir or config.graph_optimization == "disable":
+        return None
+    import onnxruntime as ort
+
+    st = os.stat(model_path)
+    h = hashlib.blake2b(digest_size=8)
+    h.update(f"{os.path.abspath(model_path)}:{st.st_size}:{st.st_mtime_ns}:".encode())
+    h.update(f"{config.graph_optimization}:{ort.__version__}:{platform.machine()}:{cpu_features()}".encode())
+    if config.shared_weights:
+        h.update(b":shared")
+    return str(Path(config.optimized_model_dir) / f"{Path(model_path).stem}.{h.hexdigest()}.onnx")
+
+
+def prepare_optimized_model(model_path: str, config: OrtConfig) -> Optional[str]:
+    """
+    生成优化模型缓存 (已存在时直接返回路径)，失败或未开启缓存时返回 None
+    使用单线程的一次性会话完成图优化后立即释放: Celery 主进程在 fork 前调用时不会留下 ORT 线程池。
+    共享权重模式下权重写入 {缓存名}.{pid}.data，模型文件内只保留引用；
+    写完后用 os.link 发布 (目标已存在则失败)，并发启动的进程中只有一个的结果生效，其余清理自己的临时文件。
+    """
+    import onnxruntime as ort
+
+    cached = optimized_model_path(model_path, config)
+    if not cached or os.path.exists(cached):
+        return cached
+
+    tmp = f"{cached}.{os.getpid()}.tmp"
+    data = Path(f"{Path(cached).with_suffix('')}.{os.getpid()}.data")
+    opts = build_session_options(config._replace(intra_op_threads=1, inter_op_threads=1, execution_mode="sequential"))
+    opts.optimized_model_filepath = tmp
+    if config.shared_weights:
+        # 外部数据文件名相对于模型文件所在目录
+        opts.add_session_config_entry("session.optimized_model_external_initializers_file_name", data.name)
+        opts.add_session_config_entry(
+            "session.optimized_model_external_initializers_min_size_in_bytes", str(SHARED_WEIGHTS_MIN_BYTES)
+        )
+    try:
+        os.makedirs(os.path.dirname(cached), exist_ok=True)
+        session = ort.InferenceSession(model_path, sess_options=opts, providers=PROVIDERS)
+        del session
+        try:
+            os.link(tmp, cached)
+            logger.info(f"Saved optimized ONNX model: {cached}")
+        except FileExistsError:
+            data.unlink(missing_ok=True)
+        return cached
+    except Exception as e:
+        logger.warning(f"Failed to cache optimized model for {model_path}: {e}")
+        data.unlink(missing_ok=True)
+        return None
+    finally:
+        Path(tmp).unlink(missing_ok=True)
+
+
+def create_session(model_path: str, modality: Optional[str] = None, config: Optional[OrtConfig] = None):
+    """按配置创建推理会话 (开启 IO Binding 时返回 IOBoundSession，接口与 InferenceSession.run 一致)"""
+    import onnxruntime as ort
+
+    config = config or ort_config(modality)
+    opts = build_session_options(config)
+    cached = prepare_optimized_model(model_path, config)
+
+    if cached:
+        # 已经离线优化过: 直接加载，关闭在线优化
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+        if config.shared_weights:
+            # 预打包会把权重重排到进程私有内存，关闭后才直接使用 mmap 的外部数据
+            opts.add_session_config_entry("session.disable_prepacking", "1")
+        session = ort.InferenceSession(cached, sess_options=opts, providers=PROVIDERS)
+        logger.info(f"Loaded optimized ONNX model from cache: {cached}")
+    else:
+        session = ort.InferenceSession(model_path, sess_options=opts, providers=PROVIDERS)
+
+    logger.info(
+        f"ORT session {Path(model_path).name}: intra_op={config.intra_op_threads}, "
+        f"opt={config.graph_optimization}, mode={config.execution_mode}, io_binding={config.io_binding}, "
+        f"shared_weights={bool(cached) and config.shared_weights}"
+    )
+    return IOBoundSession(session) if config.io_binding else session
+
+
+class IOBoundSession:
+    """
+    使用 IO Binding 的会话包装
+    同一输入形状签名第一次运行时由 ORT 分配输出并记录形状，之后输出直接写入预分配的缓冲区。
+    返回的是缓冲区副本: 微批处理器会把结果按行切片交给其他协程，不能与下一次推理共享内存。
+    """
+
+    MAX_SIGNATURES = 32
+
+    def __init__(self, session):
+        self.session = session
+        self.output_names: List[str] = [o.name for o in session.get_outputs()]
+        self._buffers: Dict[tuple, List[np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
+
+    def run(self, output_names, input_feed: Dict[str, np.ndarray]) -> List[np.ndarray]:
+        feed = {name: np.ascontiguousarray(arr) for name, arr in input_feed.items()}
+        signature = tuple((name, arr.shape, arr.dtype.str) for name, arr in sorted(feed.items()))
+
+        with self._lock:
+            binding = self.session.io_binding()
+            for name, arr in feed.items():
+                binding.bind_cpu_input(name, arr)
+
+            buffers = self._buffers.get(signature)
+            if buffers is None:
+                for name in self.output_names:
+                    binding.bind_output(name, "cpu")
+                self.session.run_with_iobinding(binding)
+                outputs = binding.copy_outputs_to_cpu()
+                if len(self._buffers) < self.MAX_SIGNATURES:
+                    self._buffers[signature] = [np.empty_like(out) for out in outputs]
+            else:
+                for name, buf in zip(self.output_names, buffers):
+                    binding.bind_output(name, "cpu", 0, buf.dtype, buf.shape, buf.ctypes.data)
+                self.session.run_with_iobinding(binding)
+                outputs = [buf.copy() for buf in buffers]
+
+        if output_names:
+            return [outputs[self.output_names.index(name)] for name in output_names]
+        return outputs
@@ -0,0 +1,168 @@
+"""
+推理结果缓存 (按内容哈希)
+
+客户端重试、重连和回放会重复发送相同的音视频数据，常见的寒暄文本也会反复出现，
+这些重复输入仍然要完整地做一次预处理和 ONNX 推理。这里在 ModelService 前面加一层结果缓存:
+    key = infer:{modality}:{模型版本}:{blake2b(规范化后的输入字节)}
+    L1  进程内 LRU (带过期时间)，命中时不访问 Redis
+    L2  Redis 字符串 (JSON)，TTL 过期淘汰，Celery prefork 的多个子进程和多台 Worker 共享
+模型版本参与 key 计算，换模型后旧结果自然失效。Redis 不可用时只使用进程内缓存。
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Union
+
+import numpy as np
+import redis.asyncio as aioredis
+from app.core.config import settings
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+KEY_PREFIX = "infer:"
+STATS_LOG_INTERVAL = 500  # 每多少次查询输出一次命中统计
+
+Hashable = Union[bytes, bytearray, memoryview, str, np.ndarray, None]
+
+
+def content_hash(*parts: Hashable) -> str:
+    """对若干输入片段计算内容哈希 (数组计入 dtype 与形状，None 与空字节区分)"""
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if part is None:
+            h.update(b"\x00none")
+        elif isinstance(part, str):
+            h.update(b"\x01")
+            h.update(part.encode("utf-8"))
+        elif isinstance(part, np.ndarray):
+            h.update(f"\x02{part.dtype.str}{part.shape}".encode())
+            h.update(np.ascontiguousarray(part).data)
+        else:
+            h.update(b"\x03")
+            h.update(part)
+        h.update(b"\xff")
+    return h.hexdigest()
+
+
+class ResultCache:
+    """两级推理结果缓存 (进程内 LRU + Redis)"""
+
+    def __init__(self, lru_size: int, ttl: int, use_redis: bool = True, enabled: bool = True):
+        self.lru_size = lru_size
+        self.ttl = ttl
+        self.use_redis = use_redis
+        self.enabled = enabled
+
+        self._lru: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (过期时间, 结果)
+        self._lock = threading.Lock()
+        self._redis: Optional[aioredis.Redis] = None
+
+        # 命中统计 (按模态): local / redis / miss
+        self.counters: Dict[str, Dict[str, int]] = {}
+        self._lookups = 0
+
+    def _get_redis(self) -> aioredis.Redis:
+        if self._redis is None:
+            self._redis = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+        return self._redis
+
+    @staticmethod
+    def make_key(modality: str, version: str, *parts: Hashable) -> str:
+        return f"{KEY_PREFIX}{modality}:{version}:{content_hash(*parts)}"
+
+    def _count(self, key: str, outcome: str):
+        modality = key[len(KEY_PREFIX):].split(":", 1)[0]
+        counters = self.counters.setdefault(modality, {"local": 0, "redis": 0, "miss": 0})
+        counters[outcome] += 1
+        self._lookups += 1
+        if self._lookups % STATS_LOG_INTERVAL == 0:
+            logger.info(f"Result cache stats: {self.stats()}")
+
+    def _get_local(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._lru[key]
+                return None
+            self._lru.move_to_end(key)
+            return entry[1]
+
+    def _put_local(self, key: str, result: dict):
+        with self._lock:
+            self._lru[key] = (time.monotonic() + self.ttl, result)
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[dict]:
+        """查询缓存，命中时返回结果副本 (带 "cached" 字段标明命中层级)"""
+        if not self.enabled:
+            return None
+
+        result = self._get_local(key)
+        if result is not None:
+            self._count(key, "local")
+            return {**result, "cached": "local"}
+
+        if self.use_redis:
+            try:
+                raw = await self._get_redis().get(key)
+            except Exception as e:
+                logger.debug(f"Result cache read failed: {e}")
+                raw = None
+            if raw is not None:
+                result = json.loads(raw)
+                self._put_local(key, result)
+                self._count(key, "redis")
+                return {**result, "cached": "redis"}
+
+        self._count(key, "miss")
+        return None
+
+    async def put(self, key: str, result: dict):
+        """写入缓存 (带 error 的结果不缓存)"""
+        if not self.enabled or "error" in result:
+            return
+        try:
+            payload = json.dumps(result)
+        except TypeError as e:
+            logger.debug(f"Result not cacheable: {e}")
+            return
+        # 存 JSON 往返后的副本，调用方后续修改结果不会影响缓存
+        self._put_local(key, json.loads(payload))
+        if self.use_redis:
+            try:
+                await self._get_redis().set(key, payload, ex=self.ttl)
+            except Exception as e:
+                logger.debug(f"Result cache write failed: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._lru.clear()
+
+    def stats(self) -> Dict[str, Dict]:
+        """按模态的命中统计与命中率"""
+        stats = {}
+        for modality, c in self.counters.items():
+            total = c["local"] + c["redis"] + c["miss"]
+            stats[modality] = {**c, "hit_rate": round((c["local"] + c["redis"]) / total, 3) if total else 0.0}
+        return stats
+
+    async def close(self):
+        if self._redis:
+            await self._redis.close()
+            self._redis = None
+
+
+# 全局实例 (每个 Worker 进程一个)
+result_cache = ResultCache(
+    lru_size=settings.RESULT_CACHE_LRU_SIZE,
+    ttl=settings.RESULT_CACHE_TTL,
+    use_redis=settings.RESULT_CACHE_REDIS_ENABLED,
+    enabled=settings.RESULT_CACHE_ENABLED,
+)
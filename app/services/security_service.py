@@ -1,46 +1,143 @@
 """
 安全服务：负责风险规则匹配 (RiskRule)
 """
+import time
+import redis
+from typing import List, Optional
 from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 # [修正] 这里原来写成了 async_session_maker，改为正确的 AsyncSessionLocal
-from app.db.database import AsyncSessionLocal 
+from app.db.database import AsyncSessionLocal
 from app.models.risk_rule import RiskRule
+from app.services.keyword_matcher import KeywordAutomaton
+from app.core.config import settings
 from app.core.logger import get_logger
 
 logger = get_logger(__name__)
 
+# 规则版本号: 每次增删规则 INCR，其他进程发现版本变化后从数据库重建自动机
+RULES_VERSION_KEY = "risk_rules:version"
+
+
+def _rule_payload(rule: RiskRule) -> dict:
+    return {
+        "rule_id": rule.rule_id,
+        "keyword": rule.keyword,
+        "risk_level": rule.risk_level,
+        "action": rule.action,
+        "description": rule.description
+    }
+
+
 class SecurityService:
-    
-    async def match_risk_rules(self, text: str) -> dict | None:
+
+    def __init__(self):
+        self.redis = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+        # 进程内常驻的关键词自动机 (首次匹配时从数据库加载)
+        self._automaton: Optional[KeywordAutomaton] = None
+        self._version: Optional[str] = None
+        self._last_version_check = 0.0
+
+    def _get_remote_version(self) -> Optional[str]:
+        try:
+            return self.redis.get(RULES_VERSION_KEY) or "0"
+        except Exception as e:
+            # Redis 不可用时沿用本地自动机，不影响匹配
+            logger.warning(f"Failed to read risk rule version: {e}")
+            return self._version
+
+    def _bump_version(self):
+        """通知其他进程规则已变更；若期间有其他进程也改过规则，则本地下次强制重建"""
+        try:
+            new_version = str(self.redis.incr(RULES_VERSION_KEY))
+            if self._version is not None and int(new_version) == int(self._version) + 1:
+                self._version = new_version
+            else:
+                self._version = None
+        except Exception as e:
+            logger.warning(f"Failed to bump risk rule version: {e}")
+
+    async def _reload(self, db: AsyncSession, version: Optional[str]):
+        stmt = select(RiskRule).where(RiskRule.is_active == True)
+        result = await db.execute(stmt)
+
+        automaton = KeywordAutomaton()
+        for rule in result.scalars().all():
+            automaton.add(rule.keyword, _rule_payload(rule))
+        automaton.build()
+
+        self._automaton = automaton
+        self._version = version
+        logger.info(f"Risk rule automaton rebuilt: {len(automaton)} keywords (version {version})")
+
+    async def get_automaton(self, db: Optional[AsyncSession] = None) -> KeywordAutomaton:
+        """获取当前规则自动机，按间隔检查 Redis 版本号，过期则重建"""
+        now = time.monotonic()
+        if (
+            self._automaton is not None
+            and now - self._last_version_check < settings.RISK_RULE_VERSION_CHECK_INTERVAL
+        ):
+            return self._automaton
+
+        self._last_version_check = now
+        remote_version = self._get_remote_version()
+        if self._automaton is None or self._version is None or remote_version != self._version:
+            if db is not None:
+                await self._reload(db, remote_version)
+            else:
+                async with AsyncSessionLocal() as session:
+                    await self._reload(session, remote_version)
+        return self._automaton
+
+    async def find_risk_rules(self, text: str, db: Optional[AsyncSession] = None, min_end: int = 0) -> List[dict]:
+        """
+        返回文本中命中的全部规则 (含位置)，按出现位置排序
+        每条: 规则信息 + start/end (end 为开区间)
+        min_end: 只保留 end > min_end 的命中 (增量扫描时跳过完全落在已扫描重叠部分的关键词)
+        """
+        if not text:
+            return []
+        automaton = await self.get_automaton(db)
+        hits = []
+        for hit in automaton.search(text):
+            if hit["end"] <= min_end:
+                continue
+            hits.append({**hit["payload"], "start": hit["start"], "end": hit["end"]})
+        hits.sort(key=lambda h: (h["start"], -h["end"]))
+        return hits
+
+    async def match_risk_rules(self, text: str, db: Optional[AsyncSession] = None, min_end: int = 0) -> dict | None:
         """
         匹配文本风险规则 (数据库关键词)
-        返回命中规则的详细信息，未命中返回 None
+        返回风险等级最高的命中规则详细信息 (附带全部命中 hits)，未命中返回 None
         """
         if not text:
             return None
-            
-        # [修正] 使用 AsyncSessionLocal() 创建会话
-        async with AsyncSessionLocal() as db:
-            try:
-                # 查询所有启用的规则
-                stmt = select(RiskRule).where(RiskRule.is_active == True)
-                result = await db.execute(stmt)
-                rules = result.scalars().all()
-                
-                for rule in rules:
-                    if rule.keyword in text:
-                        logger.warning(f"⚡ Risk Rule Hit: '{rule.keyword}' (ID: {rule.rule_id})")
-                        return {
-                            "rule_id": rule.rule_id,
-                            "keyword": rule.keyword,
-                            "risk_level": rule.risk_level,
-                            "action": rule.action,
-                            "description": rule.description
-                        }
-                return None
-            except Exception as e:
-                logger.error(f"Risk rule match failed: {e}")
+
+        try:
+            hits = await self.find_risk_rules(text, db, min_end)
+            if not hits:
                 return None
 
+            top = max(hits, key=lambda h: h["risk_level"] or 0)
+            logger.warning(f"⚡ Risk Rule Hit: '{top['keyword']}' (ID: {top['rule_id']}, total hits: {len(hits)})")
+            return {**top, "hits": hits}
+        except Exception as e:
+            logger.error(f"Risk rule match failed: {e}")
+            return None
+
+    def on_rule_created(self, rule: RiskRule):
+        """管理端新增规则后调用: 增量插入本地自动机并广播版本变更"""
+        if self._automaton is not None and rule.is_active:
+            self._automaton.add(rule.keyword, _rule_payload(rule))
+        self._bump_version()
+
+    def on_rule_deleted(self, rule: RiskRule):
+        """管理端删除规则后调用: 从本地自动机移除并广播版本变更"""
+        if self._automaton is not None:
+            # 只移除这条规则: 其他规则可能使用同一关键词
+            self._automaton.remove(rule.keyword, where=lambda payload: payload["rule_id"] == rule.rule_id)
+        self._bump_version()
+
 # 全局实例
-security_service = SecurityService()
\ No newline at end of file
+security_service = SecurityService()
@@ -0,0 +1,87 @@
+"""
+文本检测的分词前端
+
+原实现使用纯 Python 的 BertTokenizer，并且每条文本都 padding 到 max_length=256，
+一句十几个字的实时转写也要付出 256 长度的注意力计算。
+这里改用 Rust 实现的 BertTokenizerFast，一批文本只 padding 到批内最长序列，
+再向上取整到固定的长度桶 (默认 32/64/128/256)，
+这样 ORT 只会看到少数几种输入形状，微批处理器也能把同一个桶的请求合批。
+"""
+import os
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from app.core.config import settings
+
+
+def bucket_length(length: int, buckets: Sequence[int], max_length: int) -> int:
+    """不小于 length 的最小长度桶 (超出所有桶时取 max_length)"""
+    for bucket in sorted(buckets):
+        if bucket >= length:
+            return min(bucket, max_length)
+    return max_length
+
+
+def load_tokenizer(vocab_path: str):
+    """
+    加载 BERT 分词器，优先使用 fast 版本
+    vocab_path 可以是 vocab.txt 文件，也可以是 from_pretrained 目录
+    """
+    from transformers import BertTokenizer, BertTokenizerFast
+
+    try:
+        if os.path.isfile(vocab_path):
+            return BertTokenizerFast(vocab_file=vocab_path)
+        return BertTokenizerFast.from_pretrained(vocab_path)
+    except Exception:
+        # tokenizers 不可用时退回纯 Python 实现 (输出一致，仅速度较慢)
+        if os.path.isfile(vocab_path):
+            return BertTokenizer(vocab_file=vocab_path)
+        return BertTokenizer.from_pretrained(vocab_path)
+
+
+class TextEncoder:
+    """文本 -> BERT ONNX 输入 (input_ids / attention_mask)，动态 padding + 长度分桶"""
+
+    def __init__(
+        self,
+        tokenizer,
+        max_length: int = 256,
+        buckets: Optional[Sequence[int]] = None,
+    ):
+        self.tokenizer = tokenizer
+        self.max_length = max_length
+        self.buckets = sorted(buckets) if buckets else [max_length]
+        self.pad_token_id = tokenizer.pad_token_id or 0
+
+    def encode(self, texts: List[str], timings: Optional[Dict[str, float]] = None) -> Dict[str, np.ndarray]:
+        """批量分词，返回形状为 (len(texts), bucket) 的 int64 张量"""
+        start = time.perf_counter()
+        inputs = self.tokenizer(
+            texts,
+            return_tensors="np",
+            padding="longest",
+            truncation=True,
+            max_length=self.max_length,
+        )
+        input_ids = inputs["input_ids"].astype(np.int64)
+        attention_mask = inputs["attention_mask"].astype(np.int64)
+
+        length = bucket_length(input_ids.shape[1], self.buckets, self.max_length)
+        pad = length - input_ids.shape[1]
+        if pad > 0:
+            input_ids = np.pad(input_ids, ((0, 0), (0, pad)), constant_values=self.pad_token_id)
+            attention_mask = np.pad(attention_mask, ((0, 0), (0, pad)), constant_values=0)
+
+        if timings is not None:
+            timings["tokenize"] = (time.perf_counter() - start) * 1000
+        return {"input_ids": input_ids, "attention_mask": attention_mask}
+
+
+def build_text_encoder(vocab_path: str) -> TextEncoder:
+    return TextEncoder(
+        load_tokenizer(vocab_path),
+        max_length=settings.TEXT_MAX_LENGTH,
+        buckets=settings.TEXT_LENGTH_BUCKETS,
+    )
@@ -0,0 +1,117 @@
+"""
+实时转写的滚动上下文窗口
+
+原实现对每个 WebSocket text 消息单独调度一次 detect_text_task，BERT 只看到孤立的片段。
+这里按通话累积转写文本，只保留最近 window_tokens 个 token 作为上下文，
+新增 token 达到 min_new_tokens 或遇到句子边界 (且新增至少 min_boundary_tokens 个) 时才送 BERT。
+规则匹配很便宜，不等窗口: 每个片段都返回 RuleScan，
+    text        新片段，前面带 overlap_chars 个旧字符 (捕获跨片段的关键词)
+    start       新片段在 text 中的起始位置，结束位置 <= start 的命中已在上一个片段报告过
+
+token 数按 BERT 中文分词的粒度近似 (API 进程不加载分词器): 每个汉字/标点一个，连续字母数字算一个。
+"""
+import re
+from typing import Dict, NamedTuple, Optional
+
+_TOKEN_RE = re.compile(r"[A-Za-z0-9]+|\S")
+SENTENCE_ENDINGS = "。！？!?；;…."
+
+
+def count_tokens(text: str) -> int:
+    return len(_TOKEN_RE.findall(text))
+
+
+class RuleScan(NamedTuple):
+    """一个片段的规则匹配文本"""
+    text: str           # 重叠部分 + 新片段
+    start: int          # 新片段在 text 中的起始位置
+
+
+class TextWindow(NamedTuple):
+    """一次送 BERT 的文本"""
+    text: str           # 上下文窗口
+    new_tokens: int     # 本次新增的 token 数
+    reason: str         # "tokens" / "boundary" / "flush"
+
+
+class TranscriptUpdate(NamedTuple):
+    """append 的结果: 规则匹配每个片段都做，窗口满足送检条件时才有"""
+    scan: Optional[RuleScan]
+    window: Optional[TextWindow]
+
+
+class TranscriptWindow:
+    """单个通话的转写累积器 (单个连接使用，非线程安全)"""
+
+    def __init__(
+        self,
+        window_tokens: int = 126,
+        min_new_tokens: int = 16,
+        min_boundary_tokens: int = 4,
+        overlap_chars: int = 16,
+    ):
+        self.window_tokens = window_tokens
+        self.min_new_tokens = min_new_tokens
+        self.min_boundary_tokens = min_boundary_tokens
+        self.overlap_chars = overlap_chars
+
+        self.text = ""          # 滚动窗口内的文本
+        self.pending = ""       # 上次送检后新增的文本
+        self.pending_tokens = 0
+        self._scanned_tail = ""  # 已做规则匹配的文本末尾 overlap_chars 个字符
+
+        # 通话累计统计
+        self.fragments = 0
+        self.windows = 0
+
+    def append(self, fragment: str) -> TranscriptUpdate:
+        """追加一个转写片段，返回该片段的规则匹配文本，满足送检条件时附带窗口"""
+        fragment = fragment.strip()
+        if not fragment:
+            return TranscriptUpdate(None, None)
+
+        self.fragments += 1
+        if self.text and self.text[-1].isascii() and self.text[-1].isalnum() and fragment[0].isascii() and fragment[0].isalnum():
+            fragment = " " + fragment
+        self.text += fragment
+        self.pending += fragment
+        self.pending_tokens += count_tokens(fragment)
+        self._trim()
+        scan = self._scan(fragment)
+
+        if self.pending_tokens >= self.min_new_tokens:
+            return TranscriptUpdate(scan, self._emit("tokens"))
+        if fragment[-1] in SENTENCE_ENDINGS and self.pending_tokens >= self.min_boundary_tokens:
+            return TranscriptUpdate(scan, self._emit("boundary"))
+        return TranscriptUpdate(scan, None)
+
+    def flush(self) -> Optional[TextWindow]:
+        """通话结束时把剩余的未检文本送 BERT (规则已在 append 时匹配过)"""
+        if not self.pending_tokens:
+            return None
+        return self._emit("flush")
+
+    def _trim(self):
+        tokens = list(_TOKEN_RE.finditer(self.text))
+        if len(tokens) > self.window_tokens:
+            self.text = self.text[tokens[-self.window_tokens].start():]
+
+    def _scan(self, fragment: str) -> RuleScan:
+        overlap = self._scanned_tail
+        scan = RuleScan(text=overlap + fragment, start=len(overlap))
+        self._scanned_tail = scan.text[-self.overlap_chars:] if self.overlap_chars else ""
+        return scan
+
+    def _emit(self, reason: str) -> TextWindow:
+        window = TextWindow(text=self.text, new_tokens=self.pending_tokens, reason=reason)
+        self.pending = ""
+        self.pending_tokens = 0
+        self.windows += 1
+        return window
+
+    def stats(self) -> Dict:
+        return {
+            "fragments": self.fragments,
+            "windows": self.windows,
+            "pending_tokens": self.pending_tokens,
+        }
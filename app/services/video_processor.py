@@ -4,49 +4,115 @@
 import base64
 import cv2
 import numpy as np
-import mediapipe as mp
 from collections import deque
 from typing import Dict, List, Optional, Union, Tuple
 import asyncio
+import threading
+import uuid
 from app.core.logger import get_logger
 from app.core.config import settings
+from app.services.frame_executor import frame_executor, FramePoolSaturated
+from app.services.face_detector_pool import face_detector_pool
 
 # 初始化模块级 logger
 logger = get_logger(__name__)
 
 
+# 跟踪模板的最长边像素数 (人脸框先缩放到这个尺寸再做模板匹配，越小越快、精度越低)
+TRACK_TEMPLATE_SIZE = 48
+
+
+# 每个线程一份 JPG 解码缓冲区 (T, H, W, 3) uint8
+_workspace = threading.local()
+
+
+def _decode_workspace(seq_len: int, height: int, width: int) -> np.ndarray:
+    shape = (seq_len, height, width, 3)
+    buf = getattr(_workspace, "faces", None)
+    if buf is None or buf.shape != shape:
+        buf = np.empty(shape, dtype=np.uint8)
+        _workspace.faces = buf
+    return buf
+
+
+class FaceTrack:
+    """单个通话的人脸跟踪状态"""
+    __slots__ = ("box", "template", "frames_since_detect")
+
+    def __init__(self, box: Tuple[int, int, int, int], template: Optional[Tuple[np.ndarray, float]]):
+        self.box = box
+        self.template = template
+        self.frames_since_detect = 0
+
+
+class BufferedFace:
+    """缓冲区中的一帧人脸: 入队时已 resize 到模型输入尺寸，JPG 编码结果在首次发送时缓存"""
+    __slots__ = ("frame_id", "face", "jpeg")
+
+    def __init__(self, frame_id: str, face: np.ndarray):
+        self.frame_id = frame_id  # 本连接内唯一的帧编号 (Worker 端按它缓存逐帧特征)
+        self.face = face
+        self.jpeg: Optional[bytes] = None
+
+    def encode(self) -> bytes:
+        if self.jpeg is None:
+            _, buffer = cv2.imencode('.jpg', self.face)
+            self.jpeg = buffer.tobytes()
+        return self.jpeg
+
+
 class VideoProcessor:
     """
     视频帧提取和处理 (Scheme A: MediaPipe + Temporal Buffer)
     """
     
-    def __init__(self, sequence_length: int = 10):
+    def __init__(self, sequence_length: int = 10, stride: Optional[int] = None):
         """
         初始化视频处理器
         Args:
             sequence_length: LSTM 时序长度，默认 10 帧作为一个检测单元
+            stride: 滑动窗口步长 (缓冲区满后每新增 stride 帧输出一个窗口)，默认取 VIDEO_WINDOW_STRIDE
         """
         self.sequence_length = sequence_length
-        # 存储每个用户的视频帧缓冲 (存储的是 cropped face uint8 numpy array)
+        stride = settings.VIDEO_WINDOW_STRIDE if stride is None else stride
+        self.stride = max(1, min(stride, sequence_length))
+        # 存储每个用户的视频帧缓冲 (BufferedFace: resize 后的人脸 uint8 + 缓存的 JPG)
+        # 窗口之间共享的帧不会重复 resize / 编码
         self.frame_buffers: Dict[int, deque] = {}
-        
-        # 初始化 MediaPipe Face Mesh
-        self.mp_face_mesh = mp.solutions.face_mesh
-        self.face_mesh = self.mp_face_mesh.FaceMesh(
-            static_image_mode=False,
-            max_num_faces=1,
-            refine_landmarks=True,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
+        # 每个用户自上次输出窗口以来新增的帧数
+        self.frames_since_emit: Dict[int, int] = {}
+        # 每个用户已入队的人脸帧总数，与 stream_id 组成帧编号 "{stream_id}-{n}"
+        # (同一通话断线重连会换新的 stream_id，不会误用旧连接缓存的特征)
+        self.frames_seen: Dict[int, int] = {}
+        self.stream_id = uuid.uuid4().hex[:12]
+        # 每个用户的人脸跟踪状态 (逐通话保存，检测器本身无状态)
+        self.face_tracks: Dict[int, FaceTrack] = {}
+        # MediaPipe 检测器从进程级共享池借用 (face_detector_pool)，这里不再单独创建
     
-    async def process_frame(self, frame_data: str, user_id: int) -> Dict:
+    async def process_frame(self, frame_data: Union[str, bytes, memoryview], user_id: int) -> Dict:
         """
-        处理单个视频帧: 解码 -> 人脸裁剪 -> 存入缓冲 -> (满) -> 返回Base64列表
+        处理单个视频帧: 解码 -> 人脸裁剪 -> 存入缓冲 -> (满) -> 返回JPG列表
+        frame_data: JSON 协议为 Base64 字符串，二进制协议为原始 JPEG 字节
+        CPU 密集部分在共享线程池中执行，不阻塞事件循环；池子饱和时丢帧
         """
         try:
-            # 1. 解码 Base64 -> Image
-            frame_bytes = base64.b64decode(frame_data)
+            result = await frame_executor.run(self._process_frame_sync, frame_data, user_id)
+        except FramePoolSaturated:
+            return {
+                "status": "dropped",
+                "message": "Frame pool saturated",
+                "queue_depth": frame_executor.pending
+            }
+
+        if result["status"] == "ready":
+            result["timestamp"] = asyncio.get_event_loop().time()
+        return result
+
+    def _process_frame_sync(self, frame_data: Union[str, bytes, memoryview], user_id: int) -> Dict:
+        """process_frame 的同步实现 (在线程池中执行)"""
+        try:
+            # 1. 解码 (Base64 ->) JPEG -> Image
+            frame_bytes = base64.b64decode(frame_data) if isinstance(frame_data, str) else frame_data
             nparr = np.frombuffer(frame_bytes, np.uint8)
             img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
             
@@ -56,7 +122,7 @@ class VideoProcessor:
             
             # 2. 仅提取人脸 (不缩放，不归一化，保持原始 uint8 格式以节省内存)
             # 这一步是为了只保留核心数据，去除无关背景
-            face_img = self._extract_face_image(img)
+            face_img = self._extract_face_image(img, user_id)
             
             if face_img is None:
                 return {
@@ -65,36 +131,52 @@ class VideoProcessor:
                     "face_detected": False
                 }
 
-            # 3. 维护缓冲区
+            # 3. 维护缓冲区 (入队时 resize 一次，重叠窗口直接复用)
             if user_id not in self.frame_buffers:
                 self.frame_buffers[user_id] = deque(maxlen=self.sequence_length)
-            
-            self.frame_buffers[user_id].append(face_img)
+                self.frames_since_emit[user_id] = 0
 
-            # 4. 判断是否满足推理条件
-            current_len = len(self.frame_buffers[user_id])
-            
-            if current_len == self.sequence_length:
-                # [优化关键] 缓冲区满，将 10 张人脸图片编码为 JPG Base64 列表
+            buffer = self.frame_buffers[user_id]
+            if face_img.shape[1::-1] != tuple(settings.VIDEO_INPUT_SIZE):
+                face_img = cv2.resize(face_img, settings.VIDEO_INPUT_SIZE)
+            seen = self.frames_seen.get(user_id, 0)
+            self.frames_seen[user_id] = seen + 1
+            buffer.append(BufferedFace(f"{self.stream_id}-{seen}", face_img))
+            self.frames_since_emit[user_id] += 1
+
+            # 4. 判断是否满足推理条件: 缓冲区满，且距上个窗口已新增 stride 帧
+            current_len = len(buffer)
+
+            if current_len == self.sequence_length and self.frames_since_emit[user_id] >= self.stride:
+                self.frames_since_emit[user_id] = 0
+                frame_ids = [item.frame_id for item in buffer]
+
+                if settings.VIDEO_FACE_TRANSPORT == "raw":
+                    # 原始张量模式: 窗口内人脸直接拷进一块连续的 (T, H, W, 3) uint8 缓冲区，
+                    # 不经过 JPG 编解码 (无压缩损失，Worker 端可零拷贝构造 Tensor)
+                    face_tensor = np.stack([item.face for item in buffer])
+
+                    return {
+                        "status": "ready",
+                        "face_tensor": face_tensor, # BGR uint8 (T, H, W, 3)
+                        "frame_ids": frame_ids,
+                        "face_detected": True,
+                        "frame_shape": img.shape
+                    }
+
+                # [优化关键] 缓冲区满，将窗口内人脸编码为 JPG 字节列表
                 # 这样传给 Celery/Redis 的数据量极小 (从 6MB -> 200KB)
-                face_batch_base64 = []
-                for face in self.frame_buffers[user_id]:
-                    # Resize 到配置大小再传输，进一步减少带宽
-                    # 虽然 Celery 也会检查 Resize，但在这里先做可以保证传输的一致性
-                    face_resized = cv2.resize(face, settings.VIDEO_INPUT_SIZE)
-                    
-                    # 编码为 JPG
-                    _, buffer = cv2.imencode('.jpg', face_resized)
-                    face_batch_base64.append(base64.b64encode(buffer).decode('utf-8'))
-                
+                # 每帧只编码一次，与上个窗口重叠的帧直接复用缓存的 JPG
+                face_batch = [item.encode() for item in buffer]
+
                 return {
                     "status": "ready",
-                    "celery_payload": face_batch_base64, # [修改] 传递压缩后的数据列表，而不是 Tensor
-                    "timestamp": asyncio.get_event_loop().time(),
+                    "face_batch": face_batch, # JPG 字节列表 (由调用方决定走 Blob 引用还是 Base64)
+                    "frame_ids": frame_ids,
                     "face_detected": True,
                     "frame_shape": img.shape
                 }
-            
+
             # 缓冲区未满，继续积攒
             return {
                 "status": "buffering", 
@@ -110,26 +192,32 @@ class VideoProcessor:
                 "message": str(e)
             }
 
-    def _extract_face_image(self, img: np.ndarray) -> Optional[np.ndarray]:
+    def _extract_face_image(self, img: np.ndarray, user_id: Optional[int] = None) -> Optional[np.ndarray]:
         """
         辅助方法: 仅使用 MediaPipe 裁剪人脸，返回 uint8 图像
+
+        为降低 API 节点的逐帧开销，每 VIDEO_FACE_DETECT_INTERVAL 帧才做一次完整的 FaceMesh 检测，
+        中间帧用模板匹配跟踪上一次检测到的人脸框 (框大小不变，裁剪方式与检测帧一致)；
+        跟踪得分低于 VIDEO_FACE_TRACK_MIN_SCORE 时立即重新检测。
         """
         h, w, _ = img.shape
-        # MediaPipe 需要 RGB 输入
-        rgb_img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        
-        results = self.face_mesh.process(rgb_img)
-        
-        if not results.multi_face_landmarks:
-            return None
+        box = None
 
-        # 获取关键点
-        landmarks = results.multi_face_landmarks[0].landmark
-        x_coords = [lm.x for lm in landmarks]
-        y_coords = [lm.y for lm in landmarks]
-        
-        x1, x2 = int(min(x_coords) * w), int(max(x_coords) * w)
-        y1, y2 = int(min(y_coords) * h), int(max(y_coords) * h)
+        track = self.face_tracks.get(user_id)
+        if track is not None and track.frames_since_detect + 1 < settings.VIDEO_FACE_DETECT_INTERVAL:
+            box = self._track_face_box(img, track)
+            if box is not None:
+                track.box = box
+                track.frames_since_detect += 1
+
+        if box is None:
+            box = self._redetect_face_box(img, track.box if track else None)
+            if box is None:
+                self.face_tracks.pop(user_id, None)
+                return None
+            self.face_tracks[user_id] = FaceTrack(box, self._make_track_template(img, box))
+
+        x1, y1, x2, y2 = box
         
         # Padding
         pad_w = int((x2 - x1) * 0.2)
@@ -148,49 +236,162 @@ class VideoProcessor:
             
         return face_img
 
+    def _redetect_face_box(
+        self, img: np.ndarray, last_box: Optional[Tuple[int, int, int, int]]
+    ) -> Optional[Tuple[int, int, int, int]]:
+        """
+        完整检测: 共享检测器不保留帧间状态，因此先在上一次人脸框附近的区域内检测
+        (人脸占比大，更容易检出)，失败再做整帧检测
+        """
+        h, w, _ = img.shape
+        if last_box is not None:
+            x1, y1, x2, y2 = last_box
+            margin_w = int((x2 - x1) * 0.5)
+            margin_h = int((y2 - y1) * 0.5)
+            rx1, ry1 = max(0, x1 - margin_w), max(0, y1 - margin_h)
+            rx2, ry2 = min(w, x2 + margin_w), min(h, y2 + margin_h)
+            roi_box = self._detect_face_box(img[ry1:ry2, rx1:rx2])
+            if roi_box is not None:
+                return roi_box[0] + rx1, roi_box[1] + ry1, roi_box[2] + rx1, roi_box[3] + ry1
+
+        return self._detect_face_box(img)
+
+    @staticmethod
+    def _make_track_template(img: np.ndarray, box: Tuple[int, int, int, int]) -> Optional[Tuple[np.ndarray, float]]:
+        """截取人脸框的灰度缩略图作为跟踪模板，返回 (模板, 缩放倍数)"""
+        x1, y1, x2, y2 = box
+        face = img[y1:y2, x1:x2]
+        if face.shape[0] < 8 or face.shape[1] < 8:
+            return None
+        scale = max(1.0, max(face.shape[:2]) / TRACK_TEMPLATE_SIZE)
+        small = cv2.resize(face, None, fx=1 / scale, fy=1 / scale, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), scale
+
     @staticmethod
-    def preprocess_batch(face_list_base64: List[str]) -> np.ndarray:
+    def _track_face_box(img: np.ndarray, track: "FaceTrack") -> Optional[Tuple[int, int, int, int]]:
+        """在上一帧人脸框周围搜索模板，返回平移后的人脸框；得分过低返回 None"""
+        if track.template is None:
+            return None
+        template, scale = track.template
+        h, w, _ = img.shape
+        x1, y1, x2, y2 = track.box
+        bw, bh = x2 - x1, y2 - y1
+        margin_w, margin_h = int(bw * 0.5), int(bh * 0.5)
+        rx1, ry1 = max(0, x1 - margin_w), max(0, y1 - margin_h)
+        rx2, ry2 = min(w, x2 + margin_w), min(h, y2 + margin_h)
+
+        window = cv2.resize(img[ry1:ry2, rx1:rx2], None, fx=1 / scale, fy=1 / scale, interpolation=cv2.INTER_AREA)
+        window = cv2.cvtColor(window, cv2.COLOR_BGR2GRAY)
+        th, tw = template.shape
+        if window.shape[0] < th or window.shape[1] < tw:
+            return None
+
+        scores = cv2.matchTemplate(window, template, cv2.TM_CCOEFF_NORMED)
+        _, max_score, _, (dx, dy) = cv2.minMaxLoc(scores)
+        if max_score < settings.VIDEO_FACE_TRACK_MIN_SCORE:
+            return None
+
+        nx1 = min(max(0, rx1 + int(round(dx * scale))), w - bw)
+        ny1 = min(max(0, ry1 + int(round(dy * scale))), h - bh)
+        return nx1, ny1, nx1 + bw, ny1 + bh
+
+    @staticmethod
+    def _detect_face_box(img: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
+        """借用共享检测器做一次人脸检测，返回关键点外接框 (x1, y1, x2, y2)"""
+        h, w, _ = img.shape
+        if h == 0 or w == 0:
+            return None
+        # MediaPipe 需要 RGB 输入
+        rgb_img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        
+        with face_detector_pool.acquire() as face_mesh:
+            results = face_mesh.process(rgb_img)
+        
+        if not results.multi_face_landmarks:
+            return None
+
+        # 获取关键点
+        landmarks = results.multi_face_landmarks[0].landmark
+        x_coords = [lm.x for lm in landmarks]
+        y_coords = [lm.y for lm in landmarks]
+        
+        x1, x2 = int(min(x_coords) * w), int(max(x_coords) * w)
+        y1, y2 = int(min(y_coords) * h), int(max(y_coords) * h)
+        return x1, y1, x2, y2
+
+    @staticmethod
+    def preprocess_batch(
+        face_list_base64: List[Union[str, bytes, memoryview]],
+        out: Optional[np.ndarray] = None
+    ) -> np.ndarray:
         """
-        [Celery端专用] 将 Base64 图片列表转换为模型需要的 Tensor
+        [Celery端专用] 将 Base64 (或已取回的 JPG 字节) 图片列表转换为模型需要的 Tensor
         
-        步骤: Decode -> Resize -> Normalize -> Transpose -> Stack
+        步骤: Decode (写入预分配的 T×H×W×3 uint8 缓冲区) -> 整批向量化归一化 (normalize_faces)
         这样做的好处是将计算密集型操作放在 Worker 节点，减少 API 节点负载和 Redis 传输延迟。
+
+        Args:
+            out: 可选的 (1, T, 3, H, W) float32 输出缓冲区，调用方可跨批次复用以避免重复分配
         """
-        processed_faces = []
-        
-        # 获取配置中的均值和方差
-        mean = np.array(settings.VIDEO_NORM_MEAN, dtype=np.float32)
-        std = np.array(settings.VIDEO_NORM_STD, dtype=np.float32)
-        
-        for b64_str in face_list_base64:
+        width, height = settings.VIDEO_INPUT_SIZE
+        seq_len = len(face_list_base64)
+
+        # 解码缓冲区只在本函数内使用，按线程复用
+        faces = _decode_workspace(seq_len, height, width)
+        for i, item in enumerate(face_list_base64):
             # 1. Decode
-            img_bytes = base64.b64decode(b64_str)
-            nparr = np.frombuffer(img_bytes, np.uint8)
-            face_img = cv2.imdecode(nparr, cv2.IMREAD_COLOR) # BGR
-            
-            # 2. Resize (再次确保尺寸正确)
-            face_resized = cv2.resize(face_img, settings.VIDEO_INPUT_SIZE)
-            
-            # 3. Normalize (标准化)
-            # BGR -> RGB (模型通常是 RGB 训练的)
-            face_rgb = cv2.cvtColor(face_resized, cv2.COLOR_BGR2RGB)
-            
-            # 归一化到 0-1
-            face_norm = face_rgb.astype(np.float32) / 255.0
-            
-            # 减均值除方差
-            face_norm = (face_norm - mean) / std
-            
-            # 4. Transpose (HWC -> CHW)
-            face_chw = np.transpose(face_norm, (2, 0, 1))
-            processed_faces.append(face_chw)
-            
-        # 5. Stack -> (Batch=10, 3, 224, 224)
-        seq_array = np.array(processed_faces)
-        
-        # 6. Add Batch Dim -> (1, 10, 3, 224, 224)
-        # 这就是可以直接送入 ONNX 的 Tensor
-        return np.expand_dims(seq_array, axis=0).astype(np.float32)
+            img_bytes = base64.b64decode(item) if isinstance(item, str) else item
+            face_img = cv2.imdecode(np.frombuffer(img_bytes, np.uint8), cv2.IMREAD_COLOR) # BGR
+            if face_img is None:
+                raise ValueError(f"Invalid face image at index {i}")
+
+            # 2. Resize (再次确保尺寸正确，尺寸已符合时直接拷贝)
+            if face_img.shape[:2] == (height, width):
+                faces[i] = face_img
+            else:
+                cv2.resize(face_img, settings.VIDEO_INPUT_SIZE, dst=faces[i])
+
+        # 3. Normalize + Transpose -> (1, T, 3, H, W)，这就是可以直接送入 ONNX 的 Tensor
+        if out is None:
+            out = np.empty((1, seq_len, 3, height, width), dtype=np.float32)
+        VideoProcessor.normalize_faces(faces, out=out[0])
+        return out
+
+    @staticmethod
+    def normalize_faces(faces_bgr: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        (T, H, W, 3) BGR uint8 -> (T, 3, H, W) 归一化 float32，全程向量化
+
+        BGR->RGB 与 HWC->CHW 都是视图操作 (不复制)，
+        (x / 255 - mean) / std 合并为 x * scale + bias 一次写入输出缓冲区
+        """
+        mean = np.asarray(settings.VIDEO_NORM_MEAN, dtype=np.float32)
+        std = np.asarray(settings.VIDEO_NORM_STD, dtype=np.float32)
+        scale = (1.0 / (255.0 * std)).reshape(3, 1, 1)
+        bias = (-mean / std).reshape(3, 1, 1)
+
+        t, h, w, _ = faces_bgr.shape
+        if out is None:
+            out = np.empty((t, 3, h, w), dtype=np.float32)
+        chw_rgb = faces_bgr[..., ::-1].transpose(0, 3, 1, 2)
+        np.multiply(chw_rgb, scale, out=out)
+        out += bias
+        return out
+
+    @staticmethod
+    def preprocess_raw(buffer: Union[bytes, memoryview], shape: List[int]) -> np.ndarray:
+        """
+        [Celery端专用] 原始人脸张量 (T, H, W, 3) BGR uint8 缓冲区 -> (1, T, 3, H, W) float32
+        直接在 Blob 数据上建立视图，不做任何解码/resize
+        """
+        width, height = settings.VIDEO_INPUT_SIZE
+        if len(shape) != 4 or tuple(shape[1:]) != (height, width, 3):
+            raise ValueError(f"Unexpected face tensor shape: {shape}")
+
+        faces = np.frombuffer(buffer, dtype=np.uint8).reshape(shape)
+        out = np.empty((1, shape[0], 3, height, width), dtype=np.float32)
+        VideoProcessor.normalize_faces(faces, out=out[0])
+        return out
 
     # --- 兼容性方法 ---
     
@@ -231,9 +432,10 @@ class VideoProcessor:
     
     def get_buffered_frames(self, user_id: int) -> Optional[List[np.ndarray]]:
         if user_id in self.frame_buffers:
-            return list(self.frame_buffers[user_id])
+            return [item.face for item in self.frame_buffers[user_id]]
         return None
         
     def clear_buffer(self, user_id: int):
         if user_id in self.frame_buffers:
-            del self.frame_buffers[user_id]
\ No newline at end of file
+            del self.frame_buffers[user_id]
+        self.frames_since_emit.pop(user_id, None)
\ No newline at end of file
@@ -0,0 +1,119 @@
+"""
+语音活动检测 (VAD)
+
+在音频进入 Celery 之前判断是否包含语音，静音和背景噪声直接跳过推理。
+逐 30ms 帧计算两个特征:
+    能量 (dB)      高于 max(绝对阈值, 自适应噪声底 + margin)
+    谱平坦度       语音有明显的共振峰/谐波结构 (平坦度低)，白噪声/嘶声接近 1
+两者同时满足的帧记为语音帧，一块音频的语音帧占比作为该块的语音得分。
+每个通话一个实例: 噪声底随通话自适应，同时累计语音占比统计。
+"""
+from collections import deque
+from typing import Dict, NamedTuple, Optional
+
+import numpy as np
+import scipy.fft
+import scipy.signal
+
+
+class VadResult(NamedTuple):
+    """单块音频的 VAD 结果"""
+    speech_ratio: float  # 语音帧占比
+    is_speech: bool      # speech_ratio 是否达到 min_speech_ratio
+    energy_db: float     # 整块平均能量
+
+
+class VoiceActivityDetector:
+    """能量 + 谱平坦度 VAD (单个通话使用，非线程安全)"""
+
+    def __init__(
+        self,
+        sr: int = 16000,
+        frame_ms: int = 30,
+        energy_threshold_db: float = -50.0,
+        margin_db: float = 6.0,
+        max_flatness: float = 0.3,
+        min_speech_ratio: float = 0.2,
+    ):
+        """
+        Args:
+            energy_threshold_db: 语音帧能量的绝对下限 (相对满幅)
+            margin_db: 语音帧需高出噪声底的分贝数
+            max_flatness: 语音帧谱平坦度上限
+            min_speech_ratio: 一块 (或一个窗口) 内语音帧占比达到该值才送检
+        """
+        self.sr = sr
+        self.frame_len = int(sr * frame_ms / 1000)
+        self.energy_threshold_db = energy_threshold_db
+        self.margin_db = margin_db
+        self.max_flatness = max_flatness
+        self.min_speech_ratio = min_speech_ratio
+        self._window = scipy.signal.get_window("hann", self.frame_len).astype(np.float32)
+
+        self.noise_floor_db: Optional[float] = None
+        # 最近若干块的 (样本数, 语音样本数)，用于计算窗口内语音占比
+        self._recent: deque = deque(maxlen=256)
+
+        # 通话累计统计
+        self.chunks = 0
+        self.speech_chunks = 0
+        self.samples = 0
+        self.speech_samples = 0
+
+    def score(self, y: np.ndarray) -> VadResult:
+        """对一块波形打分，并更新噪声底与统计"""
+        n_frames = len(y) // self.frame_len
+        if n_frames == 0:
+            return VadResult(0.0, False, -100.0)
+
+        frames = y[:n_frames * self.frame_len].reshape(n_frames, self.frame_len)
+        energy_db = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+        power = np.abs(scipy.fft.rfft(frames * self._window, axis=1)) ** 2 + 1e-12
+        flatness = np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+
+        threshold = self.energy_threshold_db
+        if self.noise_floor_db is not None:
+            threshold = max(threshold, self.noise_floor_db + self.margin_db)
+        speech = (energy_db > threshold) & (flatness < self.max_flatness)
+        self._update_noise_floor(float(np.percentile(energy_db, 10)))
+
+        speech_ratio = float(speech.mean())
+        is_speech = speech_ratio >= self.min_speech_ratio
+        speech_samples = int(speech.sum()) * self.frame_len
+
+        self.chunks += 1
+        self.speech_chunks += int(is_speech)
+        self.samples += len(y)
+        self.speech_samples += speech_samples
+        self._recent.append((len(y), speech_samples))
+
+        return VadResult(speech_ratio, is_speech, float(10 * np.log10(np.mean(y ** 2) + 1e-10)))
+
+    def _update_noise_floor(self, chunk_floor_db: float):
+        # 快降慢升: 安静片段立即拉低噪声底，持续说话时缓慢上调
+        if self.noise_floor_db is None or chunk_floor_db < self.noise_floor_db:
+            self.noise_floor_db = chunk_floor_db
+        else:
+            self.noise_floor_db += 0.1 * (chunk_floor_db - self.noise_floor_db)
+
+    def window_speech_ratio(self, window_samples: int) -> float:
+        """最近 window_samples 个样本 (按整块计) 的语音占比"""
+        total = speech = 0
+        for n, s in reversed(self._recent):
+            total += n
+            speech += s
+            if total >= window_samples:
+                break
+        return speech / total if total else 0.0
+
+    def stats(self) -> Dict:
+        """通话累计的语音占比统计"""
+        return {
+            "chunks": self.chunks,
+            "speech_chunks": self.speech_chunks,
+            "silent_chunks": self.chunks - self.speech_chunks,
+            "audio_seconds": round(self.samples / self.sr, 2),
+            "speech_seconds": round(self.speech_samples / self.sr, 2),
+            "speech_ratio": round(self.speech_samples / self.samples, 3) if self.samples else 0.0,
+            "noise_floor_db": None if self.noise_floor_db is None else round(self.noise_floor_db, 1),
+        }
@@ -1,10 +1,15 @@
 """
 Celery应用配置
 """
+import os
 from celery import Celery
 # [修正] 必须导入 crontab 才能使用定时任务调度
 from celery.schedules import crontab  
+from celery.signals import celeryd_init, worker_init, worker_process_init, worker_process_shutdown
 from app.core.config import settings
+from app.services.model_service import model_service
+from app.services.ort_session import set_worker_processes
+from app.tasks.worker_loop import start_worker_loop, stop_worker_loop
 
 # 初始化Celery应用
 celery_app = Celery(
@@ -23,8 +28,60 @@ celery_app.conf.update(
     # 任务过期时间 (防止任务堆积)
     task_time_limit=1800,  # 30分钟
     worker_max_tasks_per_child=200,  # 防止内存泄漏
+    # 子进程在 worker_process_init 中加载并预热模型，默认 4s 的启动超时不够
+    worker_proc_alive_timeout=settings.WORKER_WARMUP_TIMEOUT,
 )
 
+# Worker 主进程启动: 切换为 worker 角色，允许按模态惰性加载模型
+# (API 进程同样会 import 任务模块，但保持 api 角色，不加载任何模型)
+@celeryd_init.connect
+def init_worker_role(options=None, **kwargs):
+    model_service.set_role("worker")
+    # ORT 自动线程数按 Worker 进程数平分 CPU (solo 池只有一个进程；prefork 默认并发数为 CPU 核数)
+    options = options or {}
+    pool = str(options.get("pool_cls") or options.get("pool") or "prefork")
+    set_worker_processes(1 if "solo" in pool else (options.get("concurrency") or os.cpu_count()))
+
+
+def warm_up_models():
+    """加载并预热模型 (阻塞): 返回前当前进程不会开始执行任务"""
+    if settings.MODEL_REGISTRY_ENABLED:
+        # 先按注册表加载当前版本，避免先加载默认版本再切换
+        model_service.apply_registry()
+    if settings.WORKER_WARMUP_ENABLED:
+        model_service.warmup(settings.WORKER_WARMUP_MODALITIES)
+
+
+def preload_shared_models():
+    """prefork 主进程: fork 前准备子进程共享的模型产物 (不创建 ORT 会话)"""
+    if settings.WORKER_PRELOAD_SHARED:
+        model_service.preload_shared(settings.WORKER_WARMUP_MODALITIES)
+
+
+# solo/threads 池没有子进程: 在消费者启动前于主进程预热
+# prefork 池: 主进程只做 fork 安全的预加载，子进程 (含回收重建的) 继承后各自创建会话
+@worker_init.connect
+def init_worker(sender=None, **kwargs):
+    if "prefork" not in str(getattr(sender, "pool_cls", "prefork")).lower():
+        warm_up_models()
+    else:
+        preload_shared_models()
+
+
+# Worker 进程生命周期: 子进程启动时创建常驻事件循环 + 连接池并预热模型，退出时释放
+# 子进程在初始化函数返回后才向主进程报告就绪，预热期间不会被分配任务
+# (solo/threads 模式不会触发 worker_process_init，首次调用 run_async 时惰性启动)
+@worker_process_init.connect
+def init_worker_process(**kwargs):
+    start_worker_loop()
+    warm_up_models()
+
+
+@worker_process_shutdown.connect
+def shutdown_worker_process(**kwargs):
+    stop_worker_loop()
+
+
 # 自动发现任务模块
 celery_app.autodiscover_tasks([
     "app.tasks.detection_tasks",
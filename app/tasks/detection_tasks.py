@@ -6,26 +6,29 @@ AI检测异步任务 (Celery Worker) - 修复版
 """
 import redis
 import json
-import asyncio
 import base64
+import binascii
 import io
 import time
 import numpy as np
-from typing import Dict, List, Union
+from typing import Dict, List, Optional, Union
 from datetime import datetime  # [新增]
 
 from sqlalchemy import select # [新增]
 from app.models.call_record import CallRecord # [新增]
 
 from app.tasks.celery_app import celery_app
+from app.tasks.worker_loop import run_async
 from app.services.model_service import model_service
 from app.services.video_processor import VideoProcessor
+from app.services.audio_features import unpack_voice_features
 from app.services.security_service import security_service
 from app.services.notification_service import notification_service
 from app.db.database import AsyncSessionLocal
 from app.models.ai_detection_log import AIDetectionLog
 
 from app.core.storage import upload_to_minio
+from app.core.blob_store import is_blob_ref, get_blob, get_blobs, BlobNotFoundError
 from app.core.config import settings
 from app.core.logger import get_logger, bind_context
 
@@ -39,11 +42,17 @@ async def save_raw_data(data: bytes, user_id: int, call_id: int, data_type: str,
     try:
         timestamp = int(time.time() * 1000)
         filename = f"dataset/{data_type}/{user_id}/{call_id}_{timestamp}.{ext}"
-        content_type = "audio/wav" if data_type == "audio" else "application/octet-stream"
+        content_type = "audio/wav" if ext == "wav" else "application/octet-stream"
         await upload_to_minio(data, filename, content_type=content_type)
     except Exception as e:
         logger.warning(f"Failed to collect training data: {e}")
 
+async def load_task_media(data: str):
+    """任务参数 -> 媒体字节: Blob 引用从存储取回，否则按内联 Base64 解码"""
+    if is_blob_ref(data):
+        return await get_blob(data)
+    return base64.b64decode(data)
+
 async def ensure_call_record_exists(db, call_id: int, user_id: int):
     """
     [新增] 确保 CallRecord 存在，防止外键报错
@@ -142,10 +151,20 @@ def apply_video_debounce(user_id: int, call_id: int, raw_is_fake: bool) -> dict:
 
 
 @celery_app.task(name="detect_audio", bind=True)
-def detect_audio_task(self, audio_base64: str, user_id: int, call_id: int) -> Dict:
-    """音频检测任务"""
+def detect_audio_task(
+    self, audio_data: Union[str, dict], user_id: int, call_id: int, audio_format: str = "wav"
+) -> Dict:
+    """
+    音频检测任务
+    audio_data: 音频的 Blob 引用 / 内联 Base64，
+                或流式检测已提取的窗口特征 {"format": "features", "log_mel_shape": [...], "mfcc_stats_len": N, "data": 引用}
+    audio_format: "wav" 或 "pcm_s16le@<rate>" (裸 PCM)
+    """
     bind_context(user_id=user_id, call_id=call_id)
-    logger.info(f"Task started: Detect audio (Len: {len(audio_base64)})")
+    if isinstance(audio_data, dict):
+        logger.info("Task started: Detect audio (window features)")
+    else:
+        logger.info(f"Task started: Detect audio (Len: {len(audio_data)})")
 
     async def _process():
         async with AsyncSessionLocal() as db:
@@ -153,28 +172,44 @@ def detect_audio_task(self, audio_base64: str, user_id: int, call_id: int) -> Di
                 # [关键修复] 确保 CallRecord 存在
                 await ensure_call_record_exists(db, call_id, user_id)
 
+                features = None
                 try:
-                    audio_bytes = base64.b64decode(audio_base64)
-                except Exception as e:
+                    if isinstance(audio_data, dict):
+                        # 流式检测: API 端已增量提取好的窗口特征
+                        features = unpack_voice_features(await load_task_media(audio_data["data"]), audio_data)
+                    else:
+                        audio_bytes = await load_task_media(audio_data)
+                except BlobNotFoundError:
+                    return {"status": "error", "message": "Audio expired"}
+                except binascii.Error:
                     return {"status": "error", "message": "Invalid base64"}
+                except Exception as e:
+                    logger.error(f"Invalid audio payload: {e}")
+                    return {"status": "error", "message": f"Invalid audio payload: {e}"}
 
-                if settings.COLLECT_TRAINING_DATA:
-                    await save_raw_data(audio_bytes, user_id, call_id, "audio", "wav")
+                if settings.COLLECT_TRAINING_DATA and features is None:
+                    # 裸 PCM 在扩展名中保留格式与采样率，例如 .pcm_s16le.16000.raw
+                    ext = "wav" if audio_format == "wav" else f"{audio_format.replace('@', '.')}.raw"
+                    await save_raw_data(audio_bytes, user_id, call_id, "audio", ext)
 
                 self.update_state(state='PROCESSING', meta={'progress': 50})
                 
                 # 模型调用
-                result = await model_service.predict_voice(audio_bytes)
+                if features is not None:
+                    result = await model_service.predict_voice_features(features, call_id=call_id)
+                else:
+                    result = await model_service.predict_voice(audio_bytes, audio_format, call_id=call_id)
                 is_fake = result.get('is_fake', False)
                 confidence = result.get('confidence', 0.0)
                 risk_level = result.get('risk_level', 'low')
+                logger.info(f"Voice check -> conf: {confidence:.3f}, timings(ms): {result.get('timings')}")
 
                 # 1. 记录 AI 技术日志 (现在不会报 FK 错误了)
                 ai_log = AIDetectionLog(
                     call_id=call_id,
                     voice_confidence=confidence,
                     overall_score=confidence * 100,
-                    model_version="v1.0"
+                    model_version=result.get("model_version")
                 )
                 db.add(ai_log)
                 await db.commit()
@@ -215,17 +250,19 @@ def detect_audio_task(self, audio_base64: str, user_id: int, call_id: int) -> Di
                 logger.error(f"Audio task failed: {e}", exc_info=True)
                 return {"status": "error", "message": str(e)}
 
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        return loop.run_until_complete(_process())
-    finally:
-        loop.close()
+    return run_async(_process())
 
 
 @celery_app.task(name="detect_video", bind=True)
-def detect_video_task(self, frame_data: list, user_id: int, call_id: int) -> Dict:
-    """视频检测任务"""
+def detect_video_task(
+    self, frame_data: Union[list, dict], user_id: int, call_id: int, frame_ids: Optional[List[str]] = None
+) -> Dict:
+    """
+    视频检测任务
+    frame_data: 人脸 JPG 的 Blob 引用列表 / Base64 列表，
+                或原始张量 {"format": "raw", "shape": [T, H, W, 3], "data": Blob 引用或 Base64}
+    frame_ids: 逐帧编号 (滑动窗口重叠帧的编号相同)，用于流式推理复用已计算的逐帧特征
+    """
     bind_context(user_id=user_id, call_id=call_id)
     logger.info("Task started: Detect video batch")
 
@@ -236,7 +273,16 @@ def detect_video_task(self, frame_data: list, user_id: int, call_id: int) -> Dic
                 await ensure_call_record_exists(db, call_id, user_id)
 
                 try:
-                    video_tensor = VideoProcessor.preprocess_batch(frame_data)
+                    if isinstance(frame_data, dict):
+                        # 原始人脸张量 (T, H, W, 3) uint8，直接构造 Tensor
+                        buffer = await load_task_media(frame_data["data"])
+                        video_tensor = VideoProcessor.preprocess_raw(buffer, frame_data["shape"])
+                    else:
+                        if frame_data and all(is_blob_ref(x) for x in frame_data):
+                            frame_data = await get_blobs(frame_data)
+                        video_tensor = VideoProcessor.preprocess_batch(frame_data)
+                except BlobNotFoundError:
+                    return {"status": "error", "message": "Video frames expired"}
                 except Exception as e:
                     return {"status": "error", "message": "Preprocessing failed"}
 
@@ -251,7 +297,7 @@ def detect_video_task(self, frame_data: list, user_id: int, call_id: int) -> Dic
                 self.update_state(state='PROCESSING', meta={'progress': 50})
                 
                 # 模型推理
-                raw_result = await model_service.predict_video(video_tensor)
+                raw_result = await model_service.predict_video(video_tensor, call_id=call_id, frame_ids=frame_ids)
                 raw_is_fake = raw_result.get('is_deepfake', False)
                 raw_conf = raw_result.get('confidence', 0.0)
 
@@ -267,7 +313,7 @@ def detect_video_task(self, frame_data: list, user_id: int, call_id: int) -> Dic
                     call_id=call_id,
                     video_confidence=raw_conf,
                     overall_score=raw_conf * 100,
-                    model_version=raw_result.get("model_version", "v1.0")
+                    model_version=raw_result.get("model_version")
                 )
                 db.add(ai_log)
                 await db.commit()
@@ -308,19 +354,60 @@ def detect_video_task(self, frame_data: list, user_id: int, call_id: int) -> Dic
                 logger.error(f"Video task failed: {e}", exc_info=True)
                 return {"status": "error", "message": str(e)}
 
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        return loop.run_until_complete(_process())
-    finally:
-        loop.close()
+    return run_async(_process())
+
+
+async def notify_rule_hit(db, user_id: int, call_id: int, rule_hit: Dict):
+    """规则命中: 按规则风险等级告警"""
+    logger.warning(f"⚠️ RISK RULE MATCHED: {rule_hit['keyword']}")
+    risk_level_code = rule_hit.get('risk_level', 1)
+
+    await notification_service.handle_detection_result(
+        db=db,
+        user_id=user_id,
+        call_id=call_id,
+        detection_type="文本(规则)",
+        is_risk=True,
+        confidence=1.0,
+        risk_level="high" if risk_level_code >= 4 else "medium",
+        details=f"触发敏感词: {rule_hit['keyword']}"
+    )
+
+
+@celery_app.task(name="match_text_rules")
+def match_text_rules_task(scan_text: str, user_id: int, call_id: int, scan_start: int = 0) -> Dict:
+    """
+    文本规则匹配任务 (每个转写片段一次，不等 BERT 窗口)
+    scan_text/scan_start 见 TranscriptWindow.RuleScan: 结束位置 <= scan_start 的命中已在上一个片段报告过
+    """
+    bind_context(user_id=user_id, call_id=call_id)
+
+    async def _process():
+        async with AsyncSessionLocal() as db:
+            try:
+                rule_hit = await security_service.match_risk_rules(scan_text, db, scan_start)
+                if not rule_hit:
+                    return {"status": "success", "result": None, "call_id": call_id}
+
+                await ensure_call_record_exists(db, call_id, user_id)
+                await notify_rule_hit(db, user_id, call_id, rule_hit)
+                return {"status": "success", "result": "rule_hit", "call_id": call_id}
+
+            except Exception as e:
+                logger.error(f"Text rule matching task failed: {e}", exc_info=True)
+                return {"status": "error", "message": str(e), "call_id": call_id}
+
+    return run_async(_process())
 
 
 @celery_app.task(name="detect_text", bind=True)
-def detect_text_task(self, text: str, user_id: int, call_id: int) -> Dict:
-    """文本检测任务"""
+def detect_text_task(self, text: str, user_id: int, call_id: int, match_rules: bool = True) -> Dict:
+    """
+    文本检测任务
+    match_rules=False 时只做 BERT 推理 (转写窗口，规则已由 match_text_rules_task 逐片段匹配)
+    """
     bind_context(user_id=user_id, call_id=call_id)
-    logger.info(f"Task started: Detect text (Len: {len(text)})")
+    logger.info(f"Task started: Detect text (Len: {len(text)}, rules: {match_rules})")
 
     async def _process():
         async with AsyncSessionLocal() as db:
@@ -332,31 +419,20 @@ def detect_text_task(self, text: str, user_id: int, call_id: int) -> Dict:
                 
                 # 1. 规则引擎优先匹配
                 rule_hit = None
-                try:
-                    rule_hit = await security_service.match_risk_rules(text, db) 
-                except Exception as e:
-                    logger.error(f"Risk rule matching failed: {e}")
+                if match_rules:
+                    try:
+                        rule_hit = await security_service.match_risk_rules(text, db)
+                    except Exception as e:
+                        logger.error(f"Risk rule matching failed: {e}")
 
                 if rule_hit:
-                    logger.warning(f"⚠️ RISK RULE MATCHED: {rule_hit['keyword']}")
-                    risk_level_code = rule_hit.get('risk_level', 1)
-                    
-                    await notification_service.handle_detection_result(
-                        db=db,
-                        user_id=user_id,
-                        call_id=call_id,
-                        detection_type="文本(规则)",
-                        is_risk=True,
-                        confidence=1.0,
-                        risk_level="high" if risk_level_code >= 4 else "medium",
-                        details=f"触发敏感词: {rule_hit['keyword']}"
-                    )
+                    await notify_rule_hit(db, user_id, call_id, rule_hit)
                     
                     # 下发指令逻辑 (略)...
                     return {"status": "success", "result": "rule_hit"}
 
                 # 2. AI 模型推理
-                result = await model_service.predict_text(text)
+                result = await model_service.predict_text(text, call_id=call_id)
                 self.update_state(state='PROCESSING', meta={'progress': 80})
                 
                 is_fraud = (result.get('label') == 'fraud')
@@ -384,12 +460,7 @@ def detect_text_task(self, text: str, user_id: int, call_id: int) -> Dict:
                 logger.error(f"Text detection task failed: {e}", exc_info=True)
                 return {"status": "error", "message": str(e), "call_id": call_id}
 
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        return loop.run_until_complete(_process())
-    finally:
-        loop.close()
+    return run_async(_process())
 
 @celery_app.task(name="get_task_status")
 def get_task_status(task_id: str) -> Dict:
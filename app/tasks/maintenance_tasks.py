@@ -3,12 +3,12 @@
 负责清理旧日志、过期记录等
 """
 from app.tasks.celery_app import celery_app
+from app.tasks.worker_loop import run_async
 from app.db.database import AsyncSessionLocal
 from app.models.ai_detection_log import AIDetectionLog
 from app.models.message_log import MessageLog
 from sqlalchemy import delete
 from datetime import datetime, timedelta
-import asyncio
 from app.core.logger import get_logger
 
 logger = get_logger(__name__)
@@ -48,10 +48,5 @@ def clean_old_logs_task(days_to_keep: int = 30):
                 await db.rollback()
                 return {"status": "error", "message": str(e)}
 
-    # 在 Celery 同步环境中运行异步 DB 操作
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        return loop.run_until_complete(_process())
-    finally:
-        loop.close()
\ No newline at end of file
+    # 在 Worker 常驻事件循环中运行异步 DB 操作
+    return run_async(_process())
\ No newline at end of file
@@ -0,0 +1,79 @@
+"""
+Celery Worker 常驻事件循环
+每个 Worker 进程只创建一个 asyncio loop (运行在后台线程)，所有任务的协程都提交到这个 loop 上执行。
+这样数据库连接池里的连接始终绑定在同一个 loop 上，可以跨任务复用，
+不必再为每个音频切片/视频批次/文本片段新建 loop 和 MySQL 连接。
+"""
+import asyncio
+import contextvars
+import os
+import threading
+from typing import Any, Coroutine, Optional
+
+from app.db.database import engine
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_thread: Optional[threading.Thread] = None
+_pid: Optional[int] = None
+_lock = threading.Lock()
+
+
+def start_worker_loop() -> asyncio.AbstractEventLoop:
+    """启动 (或返回已启动的) 本进程常驻事件循环"""
+    global _loop, _thread, _pid
+
+    with _lock:
+        # fork 出来的子进程不会继承父进程的线程，需要按 pid 重新创建
+        if _loop is not None and _pid == os.getpid() and _thread.is_alive():
+            return _loop
+
+        if _pid != os.getpid():
+            # 丢弃父进程遗留的连接 (不关闭，避免影响父进程的 socket)
+            engine.sync_engine.dispose(close=False)
+
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, name="worker-event-loop", daemon=True)
+        thread.start()
+
+        _loop, _thread, _pid = loop, thread, os.getpid()
+        logger.info(f"Worker event loop started (PID: {_pid})")
+        return loop
+
+
+def stop_worker_loop():
+    """关闭连接池并停止事件循环 (Worker 进程退出时调用)"""
+    global _loop, _thread, _pid
+
+    with _lock:
+        if _loop is None or _pid != os.getpid():
+            return
+        loop, thread = _loop, _thread
+        _loop, _thread, _pid = None, None, None
+
+    try:
+        asyncio.run_coroutine_threadsafe(engine.dispose(), loop).result(timeout=10)
+    except Exception as e:
+        logger.warning(f"Failed to dispose DB engine: {e}")
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(timeout=10)
+    loop.close()
+    logger.info("Worker event loop stopped")
+
+
+async def _run_with_context(coro: Coroutine, ctx: contextvars.Context) -> Any:
+    # 把调用方线程中绑定的日志上下文 (user_id/call_id) 带到 loop 线程
+    for var, value in ctx.items():
+        var.set(value)
+    return await coro
+
+
+def run_async(coro: Coroutine) -> Any:
+    """在常驻事件循环中执行协程，并同步等待结果 (供 Celery 同步任务调用)"""
+    loop = start_worker_loop()
+    future = asyncio.run_coroutine_threadsafe(
+        _run_with_context(coro, contextvars.copy_context()), loop
+    )
+    return future.result()
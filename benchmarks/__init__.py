@@ -0,0 +1,3 @@
+"""
+性能基准脚本 (不属于测试集，手动运行)
+"""
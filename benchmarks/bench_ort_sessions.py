@@ -0,0 +1,102 @@
+"""
+ONNX Runtime 会话参数扫描: 线程数 x 图优化级别 x 执行模式 x IO Binding x 共享权重 (mmap、关闭预打包)
+
+用法 (在项目根目录):
+    python -m benchmarks.bench_ort_sessions [--modality voice video text] [--threads 1 2 4] [--repeat 30]
+    python -m benchmarks.bench_ort_sessions --modality text --model models/text_fraud_model_int8.onnx
+
+对每个存在的模型按实际线上输入形状运行 (声音 3s log-mel、视频 10 帧人脸序列、文本 32/128 token)，
+输出每种组合的平均/P95 延迟，最快的组合可以直接写进 .env (VOICE_ORT_INTRA_OP_THREADS / ORT_GRAPH_OPTIMIZATION / ...)。
+注意: 扫描在单进程内进行，线上 prefork 多个子进程同时推理时，线程数应再除以并发数 (自动模式已按此计算)。
+"""
+import argparse
+import itertools
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.ort_session import create_session, ort_config
+
+MODEL_PATHS = {
+    "voice": lambda: settings.VOICE_MODEL_PATH,
+    "video": lambda: settings.VIDEO_MODEL_PATH,
+    "text": lambda: settings.TEXT_MODEL_PATH,
+}
+
+
+def realistic_feeds(modality: str, session) -> dict:
+    """按线上实际看到的形状构造输入 {描述: feed}"""
+    inputs = session.get_inputs()
+    rng = np.random.default_rng(0)
+    if modality == "voice":
+        frames = 1 + int(settings.VOICE_SAMPLE_RATE * settings.VOICE_WINDOW_SECONDS) // settings.VOICE_HOP_LENGTH
+        x = rng.standard_normal((1, 1, settings.VOICE_MEL_BINS, frames)).astype(np.float32)
+        return {f"log-mel 1x1x{settings.VOICE_MEL_BINS}x{frames}": {inputs[0].name: x}}
+    if modality == "video":
+        w, h = settings.VIDEO_INPUT_SIZE
+        x = rng.standard_normal((1, 10, 3, h, w)).astype(np.float32)
+        return {f"faces 1x10x3x{h}x{w}": {inputs[0].name: x}}
+    feeds = {}
+    for length in (32, 128):
+        ids = rng.integers(100, 5000, size=(1, length), dtype=np.int64)
+        feeds[f"tokens 1x{length}"] = {"input_ids": ids, "attention_mask": np.ones_like(ids)}
+    return feeds
+
+
+def measure(session, feed: dict, repeat: int):
+    for _ in range(3):
+        session.run(None, feed)
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        session.run(None, feed)
+        samples.append((time.perf_counter() - start) * 1000)
+    return float(np.mean(samples)), float(np.percentile(samples, 95))
+
+
+def sweep(modality: str, model_path: str, threads, repeat: int):
+    print(f"\n[{modality}] {model_path}")
+    cache_dir = tempfile.mkdtemp(prefix="ort_opt_")
+    results = []
+    combos = itertools.product(threads, ("basic", "all"), ("sequential", "parallel"), (False, True), (False, True))
+    for n, level, mode, io_binding, shared in combos:
+        config = ort_config(
+            modality, intra_op_threads=n, graph_optimization=level, execution_mode=mode,
+            io_binding=io_binding, optimized_model_dir=cache_dir, shared_weights=shared,
+        )
+        start = time.perf_counter()
+        session = create_session(model_path, config=config)
+        load_ms = (time.perf_counter() - start) * 1000
+        for shape, feed in realistic_feeds(modality, session).items():
+            mean, p95 = measure(session, feed, repeat)
+            results.append((shape, n, level, mode, io_binding, shared, load_ms, mean, p95))
+
+    print(f"  {'input':<28} {'threads':>7} {'opt':>6} {'mode':>10} {'iobind':>6} {'shared':>6} {'load ms':>8} {'mean ms':>8} {'p95 ms':>8}")
+    for row in sorted(results, key=lambda r: (r[0], r[7])):
+        shape, n, level, mode, io_binding, shared, load_ms, mean, p95 = row
+        print(f"  {shape:<28} {n:>7} {level:>6} {mode:>10} {str(io_binding):>6} {str(shared):>6} {load_ms:8.1f} {mean:8.2f} {p95:8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modality", nargs="+", default=list(MODEL_PATHS), choices=list(MODEL_PATHS))
+    parser.add_argument("--model", help="覆盖模型路径 (只能与单个 --modality 一起使用)")
+    parser.add_argument("--threads", nargs="+", type=int, default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+    if args.model and len(args.modality) != 1:
+        parser.error("--model requires exactly one --modality")
+
+    for modality in args.modality:
+        path = args.model or MODEL_PATHS[modality]()
+        if not os.path.exists(path):
+            print(f"[{modality}] model not found ({path}), skipped")
+            continue
+        sweep(modality, path, args.threads, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+声音特征微基准: 原双流 librosa 调用 vs 共享特征前端 (AudioFrontEnd)
+
+用法 (在项目根目录):
+    python -m benchmarks.bench_voice_features [--wav tests/assets/real_me.wav] [--seconds 3] [--repeat 50]
+"""
+import argparse
+import time
+
+import librosa
+import numpy as np
+
+from app.services.audio_features import AudioFrontEnd
+
+
+def legacy_features(y):
+    """原 predict_voice 实现: melspectrogram + 独立的 librosa.feature.mfcc"""
+    mel = librosa.feature.melspectrogram(y=y, sr=16000, n_mels=64, n_fft=1024, hop_length=512)
+    log_mel = librosa.power_to_db(mel, ref=np.max)
+    mfcc = librosa.feature.mfcc(y=y, sr=16000, n_mfcc=20)
+    return log_mel, np.concatenate([mfcc.mean(axis=1), mfcc.std(axis=1)])
+
+
+def timeit(fn, repeat: int) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--wav", default="tests/assets/real_me.wav")
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    front_end = AudioFrontEnd()
+    shared = AudioFrontEnd(mfcc_n_fft=1024)
+    y = front_end.decode(open(args.wav, "rb").read())[:int(16000 * args.seconds)]
+
+    rows = [
+        ("legacy (melspectrogram + mfcc)", timeit(lambda: legacy_features(y), args.repeat)),
+        ("front-end (trained params)", timeit(lambda: front_end.extract(y), args.repeat)),
+        ("front-end (shared STFT)", timeit(lambda: shared.extract(y), args.repeat)),
+    ]
+
+    # 单次调用的分阶段耗时 (滤波器组已在上面缓存)
+    timings = {}
+    front_end.extract(y, timings=timings)
+
+    print(f"audio: {len(y) / 16000:.1f}s, repeat={args.repeat}")
+    for name, ms in rows:
+        print(f"  {name:<34} {ms:8.2f} ms")
+    print("  stages:", {k: round(v, 2) for k, v in timings.items()})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+"""
+模型准备脚本 (离线手动运行)
+"""
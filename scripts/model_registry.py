@@ -0,0 +1,107 @@
+"""
+管理模型注册表 (MODEL_REGISTRY_PATH)，Worker 在 MODEL_REGISTRY_POLL_SECONDS 内自动加载并切换，无需重启
+
+    show                                   查看各模态的当前/候选版本
+    add <模态> <版本> KEY=PATH ...          登记版本 (KEY 为路径配置项，例如 VOICE_MODEL_PATH)，校验文件存在
+    candidate <模态> <版本> --share 0.1     把一部分流量 (按通话) 分给候选版本；--share 0 取消候选
+    promote <模态> [<版本>]                 把候选版本 (或指定版本) 切为当前版本
+    rollback <模态>                         切回上一个当前版本
+
+用法 (在项目根目录):
+    python -m scripts.model_registry add voice v1.1 VOICE_MODEL_PATH=./models/voice/v1.1/voice_detection.onnx
+    python -m scripts.model_registry candidate voice v1.1 --share 0.1
+    python -m scripts.model_registry promote voice
+"""
+import argparse
+import json
+import sys
+
+from app.services.model_registry import (
+    VERSION_PATH_KEYS, default_version, load_manifest, save_manifest, version_paths
+)
+
+
+def _known(spec: dict, modality: str, version: str) -> bool:
+    return version == default_version(modality) or version in (spec.get("versions") or {})
+
+
+def add(manifest: dict, args):
+    paths = dict(item.split("=", 1) for item in args.paths)
+    spec = manifest.setdefault(args.modality, {})
+    spec.setdefault("versions", {})[args.version] = version_paths(args.modality, paths)
+
+
+def candidate(manifest: dict, args):
+    spec = manifest.setdefault(args.modality, {})
+    if args.share <= 0:
+        spec.pop("candidate", None)
+        spec.pop("candidate_share", None)
+        return
+    if not _known(spec, args.modality, args.version):
+        raise ValueError(f"Version {args.version} is not registered, run add first")
+    if not 0 < args.share <= 1:
+        raise ValueError("--share must be in (0, 1]")
+    spec["candidate"], spec["candidate_share"] = args.version, args.share
+
+
+def promote(manifest: dict, args):
+    spec = manifest.setdefault(args.modality, {})
+    version = args.version or spec.get("candidate")
+    if not version or not _known(spec, args.modality, version):
+        raise ValueError("Nothing to promote: pass a registered version or set a candidate first")
+    spec["previous"] = spec.get("active") or default_version(args.modality)
+    spec["active"] = version
+    spec.pop("candidate", None)
+    spec.pop("candidate_share", None)
+
+
+def rollback(manifest: dict, args):
+    spec = manifest.setdefault(args.modality, {})
+    if not spec.get("previous"):
+        raise ValueError(f"No previous version recorded for {args.modality}")
+    spec["active"], spec["previous"] = spec["previous"], spec.get("active") or default_version(args.modality)
+    spec.pop("candidate", None)
+    spec.pop("candidate_share", None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--registry", help="注册表路径 (默认 MODEL_REGISTRY_PATH)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("show")
+    p = commands.add_parser("add")
+    p.add_argument("modality", choices=list(VERSION_PATH_KEYS))
+    p.add_argument("version")
+    p.add_argument("paths", nargs="+", metavar="KEY=PATH")
+    p = commands.add_parser("candidate")
+    p.add_argument("modality", choices=list(VERSION_PATH_KEYS))
+    p.add_argument("version")
+    p.add_argument("--share", type=float, required=True)
+    p = commands.add_parser("promote")
+    p.add_argument("modality", choices=list(VERSION_PATH_KEYS))
+    p.add_argument("version", nargs="?")
+    p = commands.add_parser("rollback")
+    p.add_argument("modality", choices=list(VERSION_PATH_KEYS))
+    args = parser.parse_args()
+
+    manifest = load_manifest(args.registry)
+    if args.command != "show":
+        try:
+            {"add": add, "candidate": candidate, "promote": promote, "rollback": rollback}[args.command](manifest, args)
+        except ValueError as e:
+            print(f"✗ {e}")
+            sys.exit(1)
+        save_manifest(manifest, args.registry)
+
+    for modality in VERSION_PATH_KEYS:
+        spec = manifest.get(modality) or {}
+        line = f"{modality:<6} active={spec.get('active') or default_version(modality)}"
+        if spec.get("candidate"):
+            line += f" candidate={spec['candidate']} ({spec.get('candidate_share', 0):.0%})"
+        print(line)
+    if args.command == "show" and manifest:
+        print(json.dumps(manifest, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""
+生成 INT8 量化模型，并与 FP32 模型在 tests/assets 上做一致性校验
+
+    声音 ResNet / 视频 ResNet+LSTM: 静态量化 (QDQ，逐通道权重)，用夹具音视频做校准
+    视频流式骨干 + 时序头:          同上，两个模型成对量化，时序头用 FP32 骨干输出的帧特征校准，按组合后的结果校验
+    文本 BERT:                     动态量化 (MatMul 权重 INT8，激活运行时量化)，不需要校准数据
+
+夹具样本交替分成两半，一半用于校准，另一半用于校验 (样本太少时两者共用)。
+校验指标: 按各模态阈值判定的结果一致率 >= --min-agreement，且诈骗/伪造概率的平均绝对差 <= --max-prob-diff；
+不通过时删除生成的量化模型 (流式骨干与时序头一起删除) 并返回非零退出码。
+通过后设置 {模态}_MODEL_VARIANT=int8 即可让 ModelService 加载量化模型 (x.onnx -> x.int8.onnx)。
+
+用法 (在项目根目录):
+    python -m scripts.quantize_models [--modality voice video text] [--method static|dynamic] [--min-agreement 0.95]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.ort_session import variant_path
+
+ASSETS = Path("tests/assets")
+
+# 文本没有音视频那样的夹具文件，使用与 tests/test_text_flow.py 同类的通话转写样本
+TEXT_SAMPLES = [
+    "你好我是京东客服，你的金条利率过高需要注销，请下载腾讯会议屏幕共享，否则会影响征信。",
+    "妈，今晚我不回家吃饭了，公司要加班，你们先吃吧，不用等我。",
+    "恭喜您中奖了！点击链接领取您的iPhone 15 Pro Max，名额有限，速点！",
+    "您好，这里是公安局，你的银行卡涉嫌洗钱，需要把资金转到安全账户配合调查。",
+    "明天上午十点开会，记得带上上周的报表。",
+    "请把收到的验证码告诉我，我们帮您核实账户安全。",
+    "周末一起去爬山吗？天气预报说是晴天。",
+    "兼职刷单，日结三百，先垫付后返利，稳赚不赔。",
+]
+
+MODALITIES = {
+    # 模态: (模型路径, 默认量化方法, 正类 (诈骗/伪造) 在 logits 中的下标, 阈值)
+    "voice": (lambda: settings.VOICE_MODEL_PATH, "static", 1, lambda: settings.VOICE_DETECTION_THRESHOLD),
+    "video": (lambda: settings.VIDEO_MODEL_PATH, "static", 0, lambda: settings.VIDEO_DETECTION_THRESHOLD),
+    "text": (lambda: settings.TEXT_MODEL_PATH, "dynamic", 1, lambda: settings.TEXT_DETECTION_THRESHOLD),
+}
+
+
+def voice_feeds(input_name: str, max_samples: int) -> List[Dict[str, np.ndarray]]:
+    """夹具 wav 按 3s 切片 -> log-mel (1, 1, 64, T)，与线上特征前端一致"""
+    from app.services.audio_features import audio_front_end
+
+    window = int(settings.VOICE_SAMPLE_RATE * settings.VOICE_WINDOW_SECONDS)
+    feeds = []
+    for wav in sorted(ASSETS.glob("*.wav")):
+        y = audio_front_end.decode(wav.read_bytes())
+        for start in range(0, len(y) - window + 1, window):
+            features = audio_front_end.extract(y[start:start + window], log_mel=True, mfcc=False)
+            feeds.append({input_name: features.log_mel[np.newaxis, np.newaxis].astype(np.float32)})
+    return feeds[:max_samples]
+
+
+def video_feeds(input_name: str, max_samples: int, frame_step: int = 5, seq_len: int = 10) -> List[Dict[str, np.ndarray]]:
+    """夹具 mp4 抽帧 -> MediaPipe 裁剪人脸 -> 10 帧序列 (1, 10, 3, H, W)，与线上预处理一致"""
+    import cv2
+    from app.services.video_processor import VideoProcessor
+
+    processor = VideoProcessor(sequence_length=seq_len)
+    size = tuple(settings.VIDEO_INPUT_SIZE)
+    feeds = []
+    for video in sorted(ASSETS.rglob("*.mp4")):
+        cap = cv2.VideoCapture(str(video))
+        faces, index = [], 0
+        while len(feeds) < max_samples:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            index += 1
+            if index % frame_step:
+                continue
+            face = processor._extract_face_image(frame, user_id=0)
+            if face is None:
+                continue
+            faces.append(cv2.resize(face, size))
+            if len(faces) == seq_len:
+                feeds.append({input_name: VideoProcessor.normalize_faces(np.stack(faces))[np.newaxis]})
+                faces = []
+        cap.release()
+        processor.face_tracks.pop(0, None)  # 换视频后重新检测人脸
+    return feeds[:max_samples]
+
+
+def text_feeds(max_samples: int) -> List[Dict[str, np.ndarray]]:
+    from app.services.text_features import build_text_encoder
+
+    encoder = build_text_encoder(settings.TEXT_VOCAB_PATH)
+    return [encoder.encode([text]) for text in TEXT_SAMPLES[:max_samples]]
+
+
+def fixture_feeds(modality: str, session, max_samples: int) -> List[Dict[str, np.ndarray]]:
+    input_name = session.get_inputs()[0].name
+    if modality == "voice":
+        return voice_feeds(input_name, max_samples)
+    if modality == "video":
+        return video_feeds(input_name, max_samples)
+    return text_feeds(max_samples)
+
+
+class FeedReader:
+    """静态量化的校准数据读取器 (onnxruntime.quantization.CalibrationDataReader 接口)"""
+
+    def __init__(self, feeds: List[Dict[str, np.ndarray]]):
+        self._iter = iter(feeds)
+
+    def get_next(self):
+        return next(self._iter, None)
+
+    def rewind(self):
+        pass
+
+
+def quantize(model_path: str, output_path: str, method: str, calibration: List[Dict[str, np.ndarray]]):
+    from onnxruntime.quantization import (
+        CalibrationMethod, QuantFormat, QuantType, quantize_dynamic, quantize_static
+    )
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    if method == "dynamic":
+        quantize_dynamic(model_path, output_path, weight_type=QuantType.QInt8)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # 预处理: 符号形状推断 + 图优化，量化器需要完整的形状信息
+        prepared = os.path.join(tmp, "prepared.onnx")
+        quant_pre_process(model_path, prepared)
+        quantize_static(
+            prepared, output_path, FeedReader(calibration),
+            quant_format=QuantFormat.QDQ,
+            per_channel=True,
+            activation_type=QuantType.QInt8,
+            weight_type=QuantType.QInt8,
+            calibrate_method=CalibrationMethod.MinMax,
+        )
+
+
+def positive_probs(session, feeds: List[Dict[str, np.ndarray]], positive_index: int) -> np.ndarray:
+    probs = []
+    for feed in feeds:
+        logits = session.run(None, feed)[0]
+        e = np.exp(logits - logits.max(axis=1, keepdims=True))
+        probs.append(float((e / e.sum(axis=1, keepdims=True))[0, positive_index]))
+    return np.array(probs)
+
+
+class StreamingPipeline:
+    """流式骨干 + 时序头组合成与整段视频模型相同的 run 接口: (1, T, 3, H, W) -> logits"""
+
+    def __init__(self, backbone, temporal):
+        self.backbone, self.temporal = backbone, temporal
+        self.backbone_input = backbone.get_inputs()[0].name
+        self.temporal_input = temporal.get_inputs()[0].name
+
+    def embed(self, feed: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        frames = next(iter(feed.values()))
+        embeddings = self.backbone.run(None, {self.backbone_input: frames})[0]
+        return {self.temporal_input: embeddings.reshape(1, -1, embeddings.shape[-1])}
+
+    def run(self, output_names, feed: Dict[str, np.ndarray]):
+        return self.temporal.run(output_names, self.embed(feed))
+
+
+def mean_latency_ms(session, feeds: List[Dict[str, np.ndarray]], repeat: int = 3) -> float:
+    session.run(None, feeds[0])
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for feed in feeds:
+            session.run(None, feed)
+    return (time.perf_counter() - start) / (repeat * len(feeds)) * 1000
+
+
+def process(modality: str, args) -> bool:
+    if modality == "video":
+        # 流式骨干与时序头同样按 VIDEO_MODEL_VARIANT 加载，与整段模型分别量化和校验
+        streaming = process_video_streaming(args)
+        return process_model("video", args) and streaming
+    return process_model(modality, args)
+
+
+def process_model(modality: str, args) -> bool:
+    from app.services.ort_session import create_session, ort_config
+
+    path_fn, default_method, positive_index, threshold_fn = MODALITIES[modality]
+    model_path = path_fn()
+    if not os.path.exists(model_path):
+        print(f"[{modality}] model not found ({model_path}), skipped")
+        return True
+    output_path = variant_path(model_path, "int8")
+    method = args.method or default_method
+    # 校验时不使用磁盘优化缓存，避免写入 ORT_OPTIMIZED_MODEL_DIR
+    config = ort_config(modality, optimized_model_dir=None, io_binding=False)
+
+    fp32 = create_session(model_path, config=config)
+    feeds = fixture_feeds(modality, fp32, args.max_samples)
+    if not feeds:
+        print(f"[{modality}] no fixture samples found under {ASSETS}, skipped")
+        return False
+    calibration, evaluation = (feeds[0::2], feeds[1::2]) if len(feeds) >= 4 else (feeds, feeds)
+
+    print(f"[{modality}] {method} quantization: {model_path} -> {output_path} ({len(calibration)} calibration / {len(evaluation)} eval samples)")
+    quantize(model_path, output_path, method, calibration)
+    int8 = create_session(output_path, config=config)
+
+    return gate(modality, fp32, int8, evaluation, positive_index, threshold_fn(), {model_path: output_path}, args)
+
+
+def process_video_streaming(args) -> bool:
+    """流式推理的骨干与时序头 (VIDEO_BACKBONE/TEMPORAL_MODEL_PATH) 成对量化，按组合后的视频结果校验"""
+    from app.services.ort_session import create_session, ort_config
+
+    paths = {
+        path: variant_path(path, "int8")
+        for path in (settings.VIDEO_BACKBONE_MODEL_PATH, settings.VIDEO_TEMPORAL_MODEL_PATH)
+    }
+    backbone_path, temporal_path = paths
+    if not all(os.path.exists(path) for path in paths):
+        print("[video-streaming] backbone/temporal models not found, skipped")
+        return True
+    method = args.method or "static"
+    config = ort_config("video", optimized_model_dir=None, io_binding=False)
+
+    fp32 = StreamingPipeline(create_session(backbone_path, config=config), create_session(temporal_path, config=config))
+    feeds = video_feeds(fp32.backbone_input, args.max_samples)
+    if not feeds:
+        print(f"[video-streaming] no fixture samples found under {ASSETS}, skipped")
+        return False
+    calibration, evaluation = (feeds[0::2], feeds[1::2]) if len(feeds) >= 4 else (feeds, feeds)
+    print(f"[video-streaming] {method} quantization: {backbone_path} + {temporal_path} ({len(calibration)} calibration / {len(evaluation)} eval samples)")
+    quantize(backbone_path, paths[backbone_path], method, calibration)
+    quantize(temporal_path, paths[temporal_path], method, [fp32.embed(feed) for feed in calibration])
+    int8 = StreamingPipeline(
+        create_session(paths[backbone_path], config=config), create_session(paths[temporal_path], config=config)
+    )
+
+    _, _, positive_index, threshold_fn = MODALITIES["video"]
+    return gate("video-streaming", fp32, int8, evaluation, positive_index, threshold_fn(), paths, args)
+
+
+def gate(name: str, fp32, int8, evaluation, positive_index: int, threshold: float, paths: Dict[str, str], args) -> bool:
+    """比较 FP32 与 INT8 的判定一致率和概率差，不通过时删除全部量化输出 (paths: FP32 路径 -> INT8 路径)"""
+    p32 = positive_probs(fp32, evaluation, positive_index)
+    p8 = positive_probs(int8, evaluation, positive_index)
+    agreement = float(np.mean((p32 > threshold) == (p8 > threshold)))
+    prob_diff = float(np.mean(np.abs(p32 - p8)))
+
+    size32 = sum(os.path.getsize(path) for path in paths)
+    size8 = sum(os.path.getsize(path) for path in paths.values())
+    lat32, lat8 = mean_latency_ms(fp32, evaluation), mean_latency_ms(int8, evaluation)
+    print(f"  size    {size32 / 2**20:8.1f} MB -> {size8 / 2**20:8.1f} MB ({size32 / size8:.1f}x)")
+    print(f"  latency {lat32:8.2f} ms -> {lat8:8.2f} ms ({lat32 / lat8:.1f}x)")
+    print(f"  agreement {agreement:.3f} (min {args.min_agreement}), mean |dp| {prob_diff:.4f} (max {args.max_prob_diff})")
+
+    if agreement < args.min_agreement or prob_diff > args.max_prob_diff:
+        for output_path in paths.values():
+            os.remove(output_path)
+        print(f"  ✗ accuracy gate failed, removed {', '.join(paths.values())}")
+        return False
+    modality = name.split("-")[0]
+    print(f"  ✓ accuracy gate passed, set {modality.upper()}_MODEL_VARIANT=int8 to use it")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modality", nargs="+", default=list(MODALITIES), choices=list(MODALITIES))
+    parser.add_argument("--method", choices=["static", "dynamic"], help="覆盖默认量化方法")
+    parser.add_argument("--min-agreement", type=float, default=0.95)
+    parser.add_argument("--max-prob-diff", type=float, default=0.05)
+    parser.add_argument("--max-samples", type=int, default=64)
+    args = parser.parse_args()
+
+    results = [process(modality, args) for modality in args.modality]
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+把视频模型 (ResNet + LSTM) 的 ONNX 图拆成两段，供流式推理使用:
+
+    骨干 (backbone):  input (B, T, 3, H, W) -> 逐帧特征 (B, T, D)
+    时序头 (temporal): 逐帧特征 (B, T, D) -> logits (B, 2)
+
+--embedding-tensor 指定两段之间的张量名，即 CNN 输出 reshape 回 (B, T, D) 后送入 LSTM 的那个张量；
+不指定时列出图中所有候选张量名 (需要导出时保留了形状信息)。
+骨干中的 reshape 必须依赖输入的动态 T 维，才能只对新帧 (B, k, ...) 运行。
+
+用法 (在项目根目录):
+    python -m scripts.split_video_model --embedding-tensor <name> [--model models/video_detection.onnx]
+"""
+import argparse
+import sys
+
+import numpy as np
+
+from app.core.config import settings
+
+
+def list_candidates(model_path: str):
+    import onnx
+
+    model = onnx.shape_inference.infer_shapes(onnx.load(model_path))
+    for info in model.graph.value_info:
+        dims = [d.dim_param or d.dim_value for d in info.type.tensor_type.shape.dim]
+        if len(dims) == 3:
+            print(f"  {info.name:<48} {dims}")
+
+
+def split(model_path: str, embedding_tensor: str, backbone_path: str, temporal_path: str):
+    import onnx
+    from onnx.utils import extract_model
+
+    model = onnx.load(model_path)
+    input_names = [i.name for i in model.graph.input]
+    output_names = [o.name for o in model.graph.output]
+
+    extract_model(model_path, backbone_path, input_names, [embedding_tensor])
+    extract_model(model_path, temporal_path, [embedding_tensor], output_names)
+    print(f"backbone -> {backbone_path}")
+    print(f"temporal -> {temporal_path}")
+
+
+def verify(model_path: str, backbone_path: str, temporal_path: str, seq_len: int = 10):
+    """整段模型与 (骨干逐帧 + 时序头) 的输出应一致"""
+    import onnxruntime as ort
+
+    width, height = settings.VIDEO_INPUT_SIZE
+    x = np.random.default_rng(0).standard_normal((1, seq_len, 3, height, width)).astype(np.float32)
+
+    full = ort.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+    backbone = ort.InferenceSession(backbone_path, providers=["CPUExecutionProvider"])
+    temporal = ort.InferenceSession(temporal_path, providers=["CPUExecutionProvider"])
+
+    expected = full.run(None, {full.get_inputs()[0].name: x})[0]
+    # 分两次过骨干，模拟流式推理中 "旧帧 + 新帧" 的拼接
+    half = seq_len // 2
+    embeddings = np.concatenate([
+        backbone.run(None, {backbone.get_inputs()[0].name: x[:, :half]})[0],
+        backbone.run(None, {backbone.get_inputs()[0].name: x[:, half:]})[0],
+    ], axis=1)
+    actual = temporal.run(None, {temporal.get_inputs()[0].name: embeddings})[0]
+
+    np.testing.assert_allclose(actual, expected, rtol=1e-4, atol=1e-4)
+    print(f"verified: embeddings {embeddings.shape}, max |diff| = {np.abs(actual - expected).max():.2e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=settings.VIDEO_MODEL_PATH)
+    parser.add_argument("--embedding-tensor")
+    parser.add_argument("--backbone-out", default=settings.VIDEO_BACKBONE_MODEL_PATH)
+    parser.add_argument("--temporal-out", default=settings.VIDEO_TEMPORAL_MODEL_PATH)
+    args = parser.parse_args()
+
+    if not args.embedding_tensor:
+        print("3-D tensors in graph (pass one as --embedding-tensor):")
+        list_candidates(args.model)
+        sys.exit(1)
+
+    split(args.model, args.embedding_tensor, args.backbone_out, args.temporal_out)
+    verify(args.model, args.backbone_out, args.temporal_out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+声音特征前端单元测试: 与原 librosa 调用结果一致
+"""
+import io
+from pathlib import Path
+
+import librosa
+import numpy as np
+import pytest
+import soundfile as sf
+
+from app.services.audio_features import (
+    AudioFrontEnd, StreamingVoiceFeatures, normalize_audio_format, pack_voice_features,
+    parse_audio_format, unpack_voice_features
+)
+
+ASSET = Path(__file__).parent / "assets" / "real_me.wav"
+
+
+@pytest.fixture(scope="module")
+def waveform():
+    front_end = AudioFrontEnd()
+    return front_end.decode(ASSET.read_bytes())[:16000 * 3]
+
+
+def test_matches_legacy_librosa_features(waveform):
+    features = AudioFrontEnd().extract(waveform)
+
+    mel = librosa.feature.melspectrogram(y=waveform, sr=16000, n_mels=64, n_fft=1024, hop_length=512)
+    np.testing.assert_allclose(features.log_mel, librosa.power_to_db(mel, ref=np.max), atol=1e-3)
+
+    mfcc = librosa.feature.mfcc(y=waveform, sr=16000, n_mfcc=20)
+    expected = np.concatenate([mfcc.mean(axis=1), mfcc.std(axis=1)])
+    np.testing.assert_allclose(features.mfcc_stats, expected, rtol=1e-4, atol=1e-3)
+
+
+def test_stft_is_shared_when_n_fft_matches(waveform):
+    timings = {}
+    calls = []
+    front_end = AudioFrontEnd(mfcc_n_fft=1024)
+    original = librosa.stft
+
+    def counting_stft(*args, **kwargs):
+        calls.append(kwargs.get("n_fft"))
+        return original(*args, **kwargs)
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(librosa, "stft", counting_stft)
+        features = front_end.extract(waveform, timings=timings)
+
+    assert calls == [1024]
+    assert features.log_mel is not None and features.mfcc_stats.shape == (40,)
+    assert set(timings) == {"stft", "mel", "mfcc"}
+
+
+def test_pcm_fast_path_matches_wav_decode():
+    front_end = AudioFrontEnd()
+    pcm = (np.random.default_rng(0).standard_normal(16000) * 3000).astype("<i2")
+    wav = io.BytesIO()
+    sf.write(wav, pcm, 16000, format="WAV", subtype="PCM_16")
+
+    timings = {}
+    y_pcm = front_end.decode(pcm.tobytes(), timings, "pcm_s16le@16000")
+
+    np.testing.assert_array_equal(y_pcm, front_end.decode(wav.getvalue()))
+    assert "resample" not in timings
+
+
+def test_pcm_is_resampled_only_when_rate_differs():
+    front_end = AudioFrontEnd()
+    tone = (np.sin(2 * np.pi * 440 * np.arange(48000) / 48000) * 16000).astype("<i2")
+    timings = {}
+
+    y = front_end.decode(memoryview(tone.tobytes()), timings, "pcm_s16le@48000")
+
+    assert y.dtype == np.float32
+    assert abs(len(y) - 16000) <= 1
+    assert "resample" in timings
+
+
+def test_parse_audio_format():
+    assert parse_audio_format(None) == ("wav", None)
+    assert parse_audio_format("PCM_S16LE") == ("pcm_s16le", 16000)
+    assert normalize_audio_format("pcm_s16le@8000") == "pcm_s16le@8000"
+    with pytest.raises(ValueError):
+        parse_audio_format("mp3")
+    with pytest.raises(ValueError):
+        parse_audio_format("pcm_s16le@abc")
+
+
+def test_streaming_window_matches_uncentered_stft():
+    front_end = AudioFrontEnd()
+    y = np.random.default_rng(1).standard_normal(16000 * 5).astype(np.float32) * 0.1
+    stream = StreamingVoiceFeatures(front_end, window_seconds=3.0, hop_seconds=1.0)
+
+    windows = []
+    for i in range(0, len(y), 4000):
+        features = stream.push(y[i:i + 4000])
+        if features is not None:
+            windows.append((i + 4000, features))
+
+    # 第一个窗口需要 3s + 一帧 (n_fft) 的样本，之后每 1s 一个
+    assert [end for end, _ in windows] == [52000, 68000]
+    end, features = windows[-1]
+    assert features.log_mel.shape == (64, stream.window_frames)
+
+    spec = np.abs(librosa.stft(y[:end], n_fft=1024, hop_length=512, center=False)) ** 2
+    expected = librosa.power_to_db(front_end.mel_basis @ spec[:, -stream.window_frames:], ref=np.max)
+    np.testing.assert_allclose(features.log_mel, expected, atol=1e-3)
+
+    spec = np.abs(librosa.stft(y[:end], n_fft=2048, hop_length=512, center=False)) ** 2
+    expected = front_end.mfcc_stats_from_mel(front_end.mfcc_mel_basis @ spec[:, -stream.window_frames:])
+    np.testing.assert_allclose(features.mfcc_stats, expected, rtol=1e-4, atol=1e-3)
+
+
+def test_voice_features_round_trip():
+    front_end = AudioFrontEnd()
+    features = front_end.extract(np.random.default_rng(2).standard_normal(16000).astype(np.float32))
+
+    packed, meta = pack_voice_features(features)
+    restored = unpack_voice_features(memoryview(packed), meta)
+
+    np.testing.assert_array_equal(restored.log_mel, features.log_mel.astype(np.float32))
+    np.testing.assert_array_equal(restored.mfcc_stats, features.mfcc_stats.astype(np.float32))
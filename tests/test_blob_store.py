@@ -0,0 +1,39 @@
+"""
+媒体 Claim-Check Blob 存储单元测试 (shm 后端，不依赖 Redis)
+"""
+import pytest
+
+from app.core import blob_store
+from app.core.config import settings
+
+
+@pytest.fixture
+def shm_backend(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "MEDIA_BLOB_BACKEND", "shm")
+    monkeypatch.setattr(settings, "MEDIA_BLOB_SHM_DIR", str(tmp_path))
+    return tmp_path
+
+
+@pytest.mark.asyncio
+async def test_put_and_get_round_trip(shm_backend):
+    refs = await blob_store.put_blobs([b"\xff\xd8jpeg-1", b"\xff\xd8jpeg-2"])
+
+    assert all(blob_store.is_blob_ref(r) for r in refs)
+    data = await blob_store.get_blobs(refs)
+    assert [bytes(d) for d in data] == [b"\xff\xd8jpeg-1", b"\xff\xd8jpeg-2"]
+    # 读取后即删除
+    assert list(shm_backend.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_missing_blob_raises(shm_backend):
+    ref = await blob_store.put_blob(b"audio")
+    await blob_store.get_blob(ref)
+
+    with pytest.raises(blob_store.BlobNotFoundError):
+        await blob_store.get_blob(ref)
+
+
+def test_base64_payload_is_not_a_ref():
+    assert not blob_store.is_blob_ref("UklGRiQAAABXQVZFZm10IBAAAAAB/+/=")
+    assert not blob_store.is_blob_ref(None)
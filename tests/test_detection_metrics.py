@@ -0,0 +1,71 @@
+"""
+检测指标接口权限测试
+"""
+from datetime import datetime
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.pool import NullPool
+
+from app.core.security import create_access_token
+from app.db.database import Base, get_db
+from app.models.call_record import CallRecord
+from main import app
+
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
+engine = create_async_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    poolclass=NullPool
+)
+TestingSessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+async def override_get_db():
+    async with TestingSessionLocal() as session:
+        yield session
+
+
+@pytest_asyncio.fixture
+async def client():
+    """建表并插入一条属于用户 1 的通话记录"""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with TestingSessionLocal() as session:
+        session.add(CallRecord(call_id=1, user_id=1, start_time=datetime.now()))
+        await session.commit()
+
+    app.dependency_overrides[get_db] = override_get_db
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        yield ac
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+
+
+@pytest.mark.asyncio
+async def test_voice_metrics_requires_auth(client):
+    response = await client.get("/api/detection/metrics/voice/1")
+    assert response.status_code in (401, 403)
+
+
+@pytest.mark.asyncio
+async def test_video_pool_metrics_requires_auth(client):
+    response = await client.get("/api/detection/metrics/video")
+    assert response.status_code in (401, 403)
+
+    token = create_access_token(data={"sub": "1"})
+    response = await client.get("/api/detection/metrics/video", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_voice_metrics_of_other_users_call_is_hidden(client):
+    token = create_access_token(data={"sub": "2"})
+    response = await client.get(
+        "/api/detection/metrics/voice/1",
+        headers={"Authorization": f"Bearer {token}"}
+    )
+    assert response.status_code == 404
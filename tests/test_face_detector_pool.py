@@ -0,0 +1,38 @@
+"""
+共享人脸检测器池单元测试
+"""
+import queue
+import pytest
+
+from app.services.face_detector_pool import FaceDetectorPool
+
+
+class CountingPool(FaceDetectorPool):
+    """用普通对象代替 FaceMesh，避免测试加载 MediaPipe 图"""
+
+    def _create(self):
+        return object()
+
+
+def test_detectors_are_reused():
+    pool = CountingPool(max_size=2)
+
+    with pool.acquire() as first:
+        pass
+    with pool.acquire() as second:
+        pass
+
+    assert first is second
+    assert pool.size == 1
+
+
+def test_pool_never_exceeds_max_size():
+    pool = CountingPool(max_size=2)
+
+    with pool.acquire() as a, pool.acquire() as b:
+        assert a is not b
+        with pytest.raises(queue.Empty):
+            with pool.acquire(timeout=0.01):
+                pass
+
+    assert pool.size == 2
@@ -0,0 +1,53 @@
+"""
+视频帧执行池单元测试
+"""
+import asyncio
+import threading
+import pytest
+
+from app.services.frame_executor import FrameExecutor, FramePoolSaturated
+
+
+@pytest.mark.asyncio
+async def test_runs_off_the_event_loop_thread():
+    executor = FrameExecutor(max_workers=2, max_pending=4)
+
+    thread_name = await executor.run(lambda: threading.current_thread().name)
+
+    assert thread_name.startswith("video-frame")
+    assert executor.stats()["processed"] == 1
+    assert executor.stats()["queue_depth"] == 0
+
+
+@pytest.mark.asyncio
+async def test_drops_frames_when_saturated():
+    executor = FrameExecutor(max_workers=1, max_pending=2)
+    release = threading.Event()
+
+    busy = [asyncio.ensure_future(executor.run(release.wait)) for _ in range(2)]
+    await asyncio.sleep(0)
+    assert executor.stats()["queue_depth"] == 2
+
+    with pytest.raises(FramePoolSaturated):
+        await executor.run(lambda: None)
+    assert executor.stats()["dropped"] == 1
+
+    release.set()
+    await asyncio.gather(*busy)
+    assert executor.stats()["queue_depth"] == 0
+
+
+@pytest.mark.asyncio
+async def test_unbounded_executor_waits_instead_of_dropping():
+    executor = FrameExecutor(max_workers=1, max_pending=None, name="audio-chunk")
+    release = threading.Event()
+
+    busy = asyncio.ensure_future(executor.run(release.wait))
+    queued = asyncio.ensure_future(executor.run(lambda: threading.current_thread().name))
+    await asyncio.sleep(0)
+    assert executor.stats()["queue_depth"] == 2
+
+    release.set()
+    await busy
+    assert (await queued).startswith("audio-chunk")
+    assert executor.stats()["dropped"] == 0
@@ -0,0 +1,74 @@
+"""
+风险规则关键词自动机单元测试
+"""
+from app.services.keyword_matcher import KeywordAutomaton
+
+
+def _naive(keywords, text):
+    hits = []
+    for kw in keywords:
+        start = text.find(kw)
+        while start != -1:
+            hits.append((kw, start, start + len(kw)))
+            start = text.find(kw, start + 1)
+    return sorted(hits, key=lambda h: (h[2], h[1]))
+
+
+def test_finds_all_overlapping_hits_with_positions():
+    keywords = ["安全账户", "账户", "转账", "验证码", "he", "she", "his", "hers"]
+    automaton = KeywordAutomaton()
+    for kw in keywords:
+        automaton.add(kw, {"keyword": kw})
+
+    text = "请把钱转账到安全账户，并告诉我验证码 ushers"
+    hits = automaton.search(text)
+
+    got = sorted([(h["keyword"], h["start"], h["end"]) for h in hits], key=lambda h: (h[2], h[1]))
+    assert got == _naive(keywords, text)
+    for h in hits:
+        assert text[h["start"]:h["end"]] == h["keyword"]
+        assert h["payload"] == {"keyword": h["keyword"]}
+
+
+def test_incremental_add_and_remove():
+    automaton = KeywordAutomaton()
+    automaton.add("刷单", 1)
+    assert [h["keyword"] for h in automaton.search("兼职刷单返利")] == ["刷单"]
+
+    automaton.add("返利", 2)
+    assert [h["keyword"] for h in automaton.search("兼职刷单返利")] == ["刷单", "返利"]
+
+    assert automaton.remove("刷单") is True
+    assert automaton.remove("不存在") is False
+    assert [h["keyword"] for h in automaton.search("兼职刷单返利")] == ["返利"]
+    assert len(automaton) == 1
+
+
+def test_remove_only_matching_payload_for_shared_keyword(monkeypatch):
+    from app.services.security_service import SecurityService
+
+    class Rule:
+        def __init__(self, rule_id, risk_level):
+            self.rule_id, self.keyword, self.risk_level = rule_id, "验证码", risk_level
+            self.action, self.description, self.is_active = "alert", "", True
+
+    service = SecurityService()
+    service._automaton = KeywordAutomaton()
+    monkeypatch.setattr(service, "_bump_version", lambda: None)
+    low, high = Rule(1, 2), Rule(2, 5)
+    service.on_rule_created(low)
+    service.on_rule_created(high)
+
+    service.on_rule_deleted(high)
+    hits = service._automaton.search("请告诉我验证码")
+    assert [h["payload"]["rule_id"] for h in hits] == [1]
+    assert len(service._automaton) == 1
+    assert service._automaton.remove("验证码", where=lambda p: p["rule_id"] == 2) is False
+
+
+def test_empty_inputs():
+    automaton = KeywordAutomaton()
+    assert automaton.search("任意文本") == []
+    automaton.add("", None)
+    automaton.add("公安", None)
+    assert automaton.search("") == []
@@ -0,0 +1,39 @@
+"""
+WebSocket 二进制媒体帧协议单元测试
+"""
+import pytest
+
+from app.services.media_protocol import (
+    HEADER_SIZE, MediaCodec, MediaFrameError, MediaType,
+    decode_media_frame, encode_media_frame
+)
+
+
+def test_round_trip():
+    payload = b"\xff\xd8\xff\xe0fake-jpeg"
+    data = encode_media_frame(MediaType.VIDEO, MediaCodec.JPEG, 42, 1700000000123, payload)
+
+    frame = decode_media_frame(data)
+
+    assert len(data) == HEADER_SIZE + len(payload)
+    assert frame.media_type == MediaType.VIDEO
+    assert frame.msg_type == "video"
+    assert frame.codec == MediaCodec.JPEG
+    assert frame.seq == 42
+    assert frame.timestamp == 1700000000123
+    assert bytes(frame.payload) == payload
+
+
+@pytest.mark.parametrize("data", [
+    b"",
+    b"\x01\x01\x02",
+    # 版本号错误
+    b"\x09" + encode_media_frame(MediaType.AUDIO, MediaCodec.WAV, 1, 1, b"x")[1:],
+    # 未知媒体类型
+    b"\x01\x07" + encode_media_frame(MediaType.AUDIO, MediaCodec.WAV, 1, 1, b"x")[2:],
+    # 空负载
+    encode_media_frame(MediaType.AUDIO, MediaCodec.WAV, 1, 1, b""),
+])
+def test_invalid_frames_are_rejected(data):
+    with pytest.raises(MediaFrameError):
+        decode_media_frame(data)
@@ -0,0 +1,110 @@
+"""
+推理微批处理器单元测试
+"""
+import asyncio
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from app.services.model_service import MicroBatcher
+
+
+class CountingRunner:
+    """记录每次调用的 batch 大小，返回 [row_sum, -row_sum] 作为 logits"""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def __call__(self, feed):
+        x = feed["input"]
+        self.batch_sizes.append(x.shape[0])
+        s = x.reshape(x.shape[0], -1).sum(axis=1, keepdims=True)
+        return [np.concatenate([s, -s], axis=1)]
+
+
+class BlockingRunner(CountingRunner):
+    """第一次调用阻塞到 release，模拟推理进行中其他请求陆续排队"""
+
+    def __init__(self):
+        super().__init__()
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, feed):
+        if not self.batch_sizes:
+            self.started.set()
+            self.release.wait(5)
+        return super().__call__(feed)
+
+
+@pytest.mark.asyncio
+async def test_requests_are_merged_into_one_batch():
+    """推理期间排队的并发请求合并为一次推理，且结果按调用方拆分"""
+    runner = BlockingRunner()
+    batcher = MicroBatcher("test", runner, max_batch_size=8, max_wait_ms=50)
+
+    first = batcher.submit({"input": np.zeros((1, 4), dtype=np.float32)})
+    assert runner.started.wait(5)
+    feeds = [{"input": np.full((1, 4), i, dtype=np.float32)} for i in range(5)]
+    futures = [batcher.submit(f) for f in feeds]
+    runner.release.set()
+    first.result(5)
+    results = await asyncio.gather(*(asyncio.wrap_future(f) for f in futures))
+
+    assert runner.batch_sizes == [1, 5]
+    for i, logits in enumerate(results):
+        assert logits.shape == (1, 2)
+        assert logits[0, 0] == pytest.approx(4 * i)
+
+
+@pytest.mark.asyncio
+async def test_single_request_does_not_wait_for_window():
+    """没有其他请求排队时立即推理 (solo / prefork Worker 的常态)"""
+    runner = CountingRunner()
+    batcher = MicroBatcher("test", runner, max_batch_size=8, max_wait_ms=500)
+
+    start = time.monotonic()
+    await batcher.infer({"input": np.ones((1, 2), dtype=np.float32)})
+
+    assert time.monotonic() - start < 0.25
+    assert runner.batch_sizes == [1]
+
+
+@pytest.mark.asyncio
+async def test_mismatched_shapes_run_separately():
+    """形状不同的输入不会被强行拼接"""
+    runner = CountingRunner()
+    batcher = MicroBatcher("test", runner, max_batch_size=8, max_wait_ms=50)
+
+    a, b = await asyncio.gather(
+        batcher.infer({"input": np.ones((1, 3), dtype=np.float32)}),
+        batcher.infer({"input": np.ones((1, 5), dtype=np.float32)}),
+    )
+
+    assert a[0, 0] == pytest.approx(3)
+    assert b[0, 0] == pytest.approx(5)
+    assert runner.batch_sizes == [1, 1]
+
+
+@pytest.mark.asyncio
+async def test_disabled_batcher_runs_inline():
+    """max_batch_size <= 1 时逐条同步推理"""
+    runner = CountingRunner()
+    batcher = MicroBatcher("test", runner, max_batch_size=1, max_wait_ms=50)
+
+    result = await batcher.infer({"input": np.ones((1, 2), dtype=np.float32)})
+
+    assert result[0, 0] == pytest.approx(2)
+    assert batcher._thread is None
+
+
+@pytest.mark.asyncio
+async def test_errors_are_propagated_to_callers():
+    def failing(feed):
+        raise RuntimeError("boom")
+
+    batcher = MicroBatcher("test", failing, max_batch_size=4, max_wait_ms=5)
+    with pytest.raises(RuntimeError):
+        await batcher.infer({"input": np.ones((1, 2), dtype=np.float32)})
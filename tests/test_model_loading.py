@@ -0,0 +1,32 @@
+"""
+模型惰性加载单元测试
+"""
+import numpy as np
+import pytest
+
+from app.services.model_service import ModelService
+
+
+@pytest.mark.asyncio
+async def test_api_role_never_loads_models():
+    """api 角色的进程不加载任何模型"""
+    service = ModelService(role="api")
+
+    result = await service.predict_text("您好，这里是公安局")
+
+    assert "error" in result
+    assert not any(service.is_loaded(m) for m in ModelService.MODALITIES)
+    assert service.text_session is None
+
+
+@pytest.mark.asyncio
+async def test_worker_role_loads_only_requested_modality():
+    """worker 角色首次推理时只加载对应模态"""
+    service = ModelService(role="worker")
+
+    await service.predict_video(np.zeros((1, 10, 3, 224, 224), dtype=np.float32))
+
+    assert service.is_loaded("video")
+    assert not service.is_loaded("voice")
+    assert not service.is_loaded("text")
+
@@ -0,0 +1,109 @@
+"""
+模型注册表 (热更新 + 版本分流) 单元测试
+"""
+import time
+
+import numpy as np
+import pytest
+
+import app.services.model_service as model_module
+from app.services.audio_features import VoiceFeatures
+from app.services.model_registry import ModelRoute
+from app.services.model_service import ModelService
+from app.services.result_cache import ResultCache
+
+
+class Node:
+    def __init__(self, name):
+        self.name = name
+
+
+class ScoreSession:
+    """固定输出某个伪造概率的声音模型"""
+
+    def __init__(self, fake_prob):
+        self.logits = np.log(np.array([[1 - fake_prob, fake_prob]], dtype=np.float32))
+
+    def get_inputs(self):
+        return [Node("input")]
+
+    def run(self, output_names, feed):
+        batch = next(iter(feed.values())).shape[0]
+        return [np.repeat(self.logits, batch, axis=0)]
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+@pytest.fixture
+def service(monkeypatch, tmp_path):
+    """默认版本输出 0.1，注册表中的版本 v2 输出 0.9 (加载器替换为假会话)"""
+
+    def fake_load_voice(self):
+        self.voice_session = ScoreSession(0.9 if self.version == "v2" else 0.1)
+
+    monkeypatch.setattr(ModelService, "_load_voice", fake_load_voice)
+    monkeypatch.setattr(model_module, "result_cache", ResultCache(lru_size=16, ttl=60, use_redis=False, enabled=False))
+    monkeypatch.setattr(model_module.settings, "MODEL_REGISTRY_DRAIN_SECONDS", 0.0)
+    service = ModelService(role="worker")
+    service.warmup(["voice"])
+    return service
+
+
+@pytest.fixture
+def v2_spec(tmp_path):
+    path = tmp_path / "voice_v2.onnx"
+    path.write_bytes(b"onnx")
+    return {"v2": {"VOICE_MODEL_PATH": str(path)}}
+
+
+FEATURES = VoiceFeatures(np.zeros((64, 94), dtype=np.float32), None, {})
+
+
+def test_candidate_share_is_sticky_per_call():
+    root = ModelService(role="api")
+    a, b = ModelService(role="api", version="a"), ModelService(role="api", version="b")
+    root._routes["voice"] = ModelRoute(a, b, 0.25)
+
+    picks = [root._route("voice", call_id) for call_id in range(2000)]
+    assert 0.2 < sum(p is b for p in picks) / len(picks) < 0.3
+    assert all(root._route("voice", call_id) is picks[call_id] for call_id in range(100))
+    assert root._route("text", 1) is root
+
+
+@pytest.mark.asyncio
+async def test_candidate_then_promote_then_rollback(service, v2_spec):
+    # 候选版本分走全部流量，默认版本仍保留
+    service.apply_registry({"voice": {"candidate": "v2", "candidate_share": 1.0, "versions": v2_spec}})
+    candidate = service._routes["voice"].candidate
+    assert candidate.version == "v2" and "voice" in candidate.warmup_report
+    result = await service.predict_voice_features(FEATURES, call_id=7)
+    assert result["model_version"] == "v2"
+    assert result["confidence"] == pytest.approx(0.9, abs=1e-5)
+
+    # 切为当前版本: 复用已加载的实例，默认版本排空后释放
+    service.apply_registry({"voice": {"active": "v2", "versions": v2_spec}})
+    assert service._routes["voice"] == ModelRoute(candidate)
+    assert _wait_for(lambda: not service.is_loaded("voice"))
+    assert (await service.predict_voice_features(FEATURES))["model_version"] == "v2"
+
+    # 注册表清空: 默认版本重新加载预热后接管，v2 下线
+    service.apply_registry({})
+    assert service.is_loaded("voice")
+    result = await service.predict_voice_features(FEATURES, call_id=7)
+    assert result["model_version"] == "v1.0"
+    assert result["confidence"] == pytest.approx(0.1, abs=1e-5)
+    assert _wait_for(lambda: candidate.voice_batcher._closed)
+
+
+def test_invalid_version_keeps_current_route(service, tmp_path, v2_spec):
+    missing = {"v3": {"VOICE_MODEL_PATH": str(tmp_path / "missing.onnx")}}
+    service.apply_registry({"voice": {"active": "v3", "versions": missing}})
+    assert service._route("voice") is service
+
+    service.apply_registry({"voice": {"active": "v9", "versions": v2_spec}})
+    assert service._route("voice") is service
@@ -0,0 +1,103 @@
+"""
+Worker 启动预热单元测试
+"""
+import numpy as np
+
+from app.core.config import settings
+from app.services.model_service import MockOnnxSession, ModelService
+from app.services.text_features import TextEncoder
+
+
+class Node:
+    def __init__(self, name):
+        self.name = name
+
+
+class RecordingSession:
+    """记录每次调用的输入形状，输出 (B, T, 4) 的特征或 (B, 2) 的 logits"""
+
+    def __init__(self, input_name="input", embedding=False):
+        self.input_name = input_name
+        self.embedding = embedding
+        self.shapes = []
+
+    def get_inputs(self):
+        return [Node(self.input_name)]
+
+    def run(self, output_names, feed):
+        x = next(iter(feed.values()))
+        self.shapes.append(x.shape)
+        if self.embedding:
+            return [np.zeros(x.shape[:2] + (4,), dtype=np.float32)]
+        return [np.zeros((x.shape[0], 2), dtype=np.float32)]
+
+
+class FakeTokenizer:
+    pad_token_id = 0
+
+
+def test_warmup_runs_production_shapes():
+    service = ModelService(role="worker")
+    service._loaded.update(ModelService.MODALITIES)
+    service.voice_session = RecordingSession()
+    service.video_session = RecordingSession()
+    service.video_backbone_session = RecordingSession(embedding=True)
+    service.video_temporal_session = RecordingSession()
+    service.text_session = RecordingSession("input_ids")
+    service.text_encoder = TextEncoder(FakeTokenizer(), max_length=256, buckets=[32, 64, 128, 256])
+
+    report = service.warmup()
+
+    assert set(report) == {"voice", "video", "text"}
+
+    frames = 1 + int(settings.VOICE_SAMPLE_RATE * settings.VOICE_WINDOW_SECONDS) // settings.VOICE_HOP_LENGTH
+    assert service.voice_session.shapes == [
+        (1, 1, settings.VOICE_MEL_BINS, frames),
+        (settings.VOICE_BATCH_MAX_SIZE, 1, settings.VOICE_MEL_BINS, frames),
+    ]
+
+    w, h = settings.VIDEO_INPUT_SIZE
+    assert service.video_session.shapes == [(1, 10, 3, h, w)]
+    assert [s[1] for s in service.video_backbone_session.shapes] == [settings.VIDEO_WINDOW_STRIDE, 10, 10]
+    assert service.video_temporal_session.shapes == [(1, 10, 4)]
+
+    assert service.text_session.shapes == [(1, 32), (1, 64), (1, 128), (1, 256), (settings.TEXT_BATCH_MAX_SIZE, 32)]
+
+
+def test_warmup_skips_mock_sessions_and_api_role():
+    service = ModelService(role="worker")
+    service._loaded.add("video")
+    service.video_session = MockOnnxSession("video")
+
+    assert service.warmup(["video"]) == {"video": service.warmup_report["video"]}
+
+    api = ModelService(role="api")
+    assert api.warmup() == {}
+
+
+def test_worker_warms_every_served_modality_by_default(monkeypatch):
+    import importlib
+
+    # app.tasks 以同名属性导出 Celery 实例，这里取模块本身
+    celery_module = importlib.import_module("app.tasks.celery_app")
+
+    service = ModelService(role="worker")
+    loaded = []
+    monkeypatch.setattr(service, "ensure_loaded", lambda modality: loaded.append(modality) or False)
+    monkeypatch.setattr(celery_module, "model_service", service)
+    monkeypatch.setattr(settings, "MODEL_REGISTRY_ENABLED", False)
+
+    celery_module.warm_up_models()
+    assert loaded == ["voice", "video", "text"]
+
+    # 只服务部分模态的 Worker
+    loaded.clear()
+    monkeypatch.setattr(settings, "WORKER_WARMUP_MODALITIES", ["text"])
+    celery_module.warm_up_models()
+    assert loaded == ["text"]
+
+    # 显式关闭: 全部按需加载
+    loaded.clear()
+    monkeypatch.setattr(settings, "WORKER_WARMUP_ENABLED", False)
+    celery_module.warm_up_models()
+    assert loaded == []
@@ -0,0 +1,188 @@
+"""
+ONNX Runtime 会话工厂单元测试
+
+测试模型直接按 protobuf 编码生成 (Y = Softmax(X * X)，X 为 [N, 2] float)，不依赖 onnx 包
+"""
+import gc
+
+import numpy as np
+import pytest
+
+from app.services import ort_session
+from app.services.ort_session import IOBoundSession, create_session, ort_config, resolve_model_path, variant_path
+
+
+def _varint(n: int) -> bytes:
+    out = bytearray()
+    while True:
+        b = n & 0x7F
+        n >>= 7
+        out.append(b | (0x80 if n else 0))
+        if not n:
+            return bytes(out)
+
+
+def _field(no: int, value) -> bytes:
+    if isinstance(value, int):
+        return _varint(no << 3) + _varint(value)
+    if isinstance(value, str):
+        value = value.encode()
+    return _varint(no << 3 | 2) + _varint(len(value)) + value
+
+
+def _tensor_info(name: str, width: int = 2) -> bytes:
+    shape = _field(1, _field(2, "N")) + _field(1, _field(1, width))
+    tensor_type = _field(1, 1) + _field(2, shape)  # elem_type=FLOAT
+    return _field(1, name) + _field(2, _field(1, tensor_type))
+
+
+def _tiny_model() -> bytes:
+    mul = _field(1, "X") + _field(1, "X") + _field(2, "Z") + _field(4, "Mul")
+    softmax = _field(1, "Z") + _field(2, "Y") + _field(4, "Softmax")
+    graph = _field(1, mul) + _field(1, softmax) + _field(2, "g") + _field(11, _tensor_info("X")) + _field(12, _tensor_info("Y"))
+    return _field(1, 8) + _field(7, graph) + _field(8, _field(2, 13))
+
+
+def _matmul_model(weight: np.ndarray) -> bytes:
+    """Y = X @ W，W 作为初始化器 (足够大，共享权重模式下会写入外部数据文件)"""
+    k, m = weight.shape
+    w = _field(1, k) + _field(1, m) + _field(2, 1) + _field(8, "W") + _field(9, weight.astype(np.float32).tobytes())
+    matmul = _field(1, "X") + _field(1, "W") + _field(2, "Y") + _field(4, "MatMul")
+    graph = (_field(1, matmul) + _field(2, "g") + _field(5, w)
+             + _field(11, _tensor_info("X", k)) + _field(12, _tensor_info("Y", m)))
+    return _field(1, 8) + _field(7, graph) + _field(8, _field(2, 13))
+
+
+def _expected(x):
+    z = x * x
+    e = np.exp(z - z.max(axis=1, keepdims=True))
+    return e / e.sum(axis=1, keepdims=True)
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    path = tmp_path / "tiny.onnx"
+    path.write_bytes(_tiny_model())
+    return str(path)
+
+
+def test_session_options_follow_config(model_path):
+    config = ort_config("voice", intra_op_threads=2, optimized_model_dir=None, io_binding=False)
+    opts = ort_session.build_session_options(config)
+
+    assert opts.intra_op_num_threads == 2
+    session = create_session(model_path, config=config)
+    x = np.array([[1.0, 2.0]], dtype=np.float32)
+    np.testing.assert_allclose(session.run(None, {"X": x})[0], _expected(x), rtol=1e-5)
+
+
+def test_auto_threads_split_cores_between_workers(monkeypatch):
+    monkeypatch.setattr(ort_session.os, "cpu_count", lambda: 8)
+    monkeypatch.setattr(ort_session, "_worker_processes", 4)
+    assert ort_config().intra_op_threads == 2
+
+
+def test_optimized_model_is_cached_on_disk(model_path, tmp_path):
+    config = ort_config(optimized_model_dir=str(tmp_path / "opt"), io_binding=False, shared_weights=False)
+    cached = ort_session.optimized_model_path(model_path, config)
+
+    create_session(model_path, config=config)
+    assert [str(p) for p in (tmp_path / "opt").iterdir()] == [cached]
+
+    # 第二次直接加载缓存的优化模型
+    session = create_session(model_path, config=config)
+    x = np.array([[0.5, -1.0]], dtype=np.float32)
+    np.testing.assert_allclose(session.run(None, {"X": x})[0], _expected(x), rtol=1e-5)
+
+
+def test_optimized_cache_key_includes_simd_features(model_path, tmp_path, monkeypatch):
+    config = ort_config(optimized_model_dir=str(tmp_path / "opt"), io_binding=False, shared_weights=False)
+
+    monkeypatch.setattr(ort_session, "cpu_features", lambda: "avx avx2 fma")
+    avx2 = ort_session.optimized_model_path(model_path, config)
+    monkeypatch.setattr(ort_session, "cpu_features", lambda: "avx avx2 avx512f fma")
+    assert ort_session.optimized_model_path(model_path, config) != avx2
+
+
+def test_io_binding_reuses_output_buffers(model_path):
+    session = create_session(model_path, config=ort_config(optimized_model_dir=None, io_binding=True))
+    assert isinstance(session, IOBoundSession)
+
+    a = np.array([[1.0, 0.0], [0.0, 1.0]], dtype=np.float32)
+    b = np.array([[2.0, 1.0], [1.0, 3.0]], dtype=np.float32)
+    first = session.run(None, {"X": a})[0]
+    second = session.run(None, {"X": b})[0]
+    third = session.run(["Y"], {"X": np.ones((3, 2), dtype=np.float32)})[0]
+
+    assert len(session._buffers) == 2
+    np.testing.assert_allclose(first, _expected(a), rtol=1e-5)
+    np.testing.assert_allclose(second, _expected(b), rtol=1e-5)
+    assert third.shape == (3, 2)
+    assert session.get_inputs()[0].name == "X"
+
+
+def test_model_variant_resolution(model_path, monkeypatch):
+    int8_path = variant_path(model_path, "int8")
+    assert int8_path.endswith("tiny.int8.onnx")
+    assert variant_path(model_path, "fp32") == model_path
+    with pytest.raises(ValueError):
+        variant_path(model_path, "fp16")
+
+    monkeypatch.setattr(ort_session.settings, "VOICE_MODEL_VARIANT", "int8")
+    # 量化模型不存在时回退 FP32
+    assert resolve_model_path(model_path, "voice") == model_path
+    open(int8_path, "wb").write(_tiny_model())
+    assert resolve_model_path(model_path, "voice") == int8_path
+    assert resolve_model_path(model_path, "text") == model_path
+
+
+def test_shared_weights_are_mmapped_from_external_data(tmp_path):
+    weight = np.random.default_rng(0).standard_normal((256, 256)).astype(np.float32)
+    path = tmp_path / "matmul.onnx"
+    path.write_bytes(_matmul_model(weight))
+    config = ort_config(optimized_model_dir=str(tmp_path / "opt"), io_binding=False, shared_weights=True)
+
+    cached = ort_session.prepare_optimized_model(str(path), config)
+    data_files = list((tmp_path / "opt").glob("*.data"))
+    assert len(data_files) == 1 and data_files[0].stat().st_size >= weight.nbytes
+    assert list((tmp_path / "opt").glob("*.tmp")) == []
+    # 已存在时直接复用，不再生成新的外部数据文件
+    assert ort_session.prepare_optimized_model(str(path), config) == cached
+    assert len(list((tmp_path / "opt").glob("*.data"))) == 1
+
+    session = create_session(str(path), config=config)
+    x = np.random.default_rng(1).standard_normal((2, 256)).astype(np.float32)
+    np.testing.assert_allclose(session.run(None, {"X": x})[0], x @ weight, rtol=1e-4, atol=1e-4)
+    # 权重直接映射自外部数据文件 (prefork 子进程共享页缓存)
+    with open("/proc/self/maps") as f:
+        assert str(data_files[0]) in f.read()
+
+
+def test_preload_shared_prepares_models_without_sessions(model_path, tmp_path, monkeypatch):
+    from app.services.model_service import ModelService
+
+    monkeypatch.setattr(ort_session.settings, "ORT_OPTIMIZED_MODEL_DIR", str(tmp_path / "opt"))
+    monkeypatch.setattr(ort_session.settings, "VOICE_MODEL_PATH", model_path)
+    service = ModelService(role="worker")
+    try:
+        report = service.preload_shared(["voice"])
+    finally:
+        gc.unfreeze()
+
+    assert report["voice"] and report["voice"][0].startswith(str(tmp_path / "opt"))
+    # 主进程不创建会话，也不标记为已加载: 会话由各子进程创建
+    assert service.voice_session is None
+    assert not service.is_loaded("voice")
+
+
+def test_failed_optimization_falls_back_to_plain_session(model_path, tmp_path, monkeypatch):
+    # 外部数据阈值非法: 生成优化模型时 ORT 抛出 (非 OSError) 异常
+    monkeypatch.setattr(ort_session, "SHARED_WEIGHTS_MIN_BYTES", "invalid")
+    config = ort_config(optimized_model_dir=str(tmp_path / "opt"), io_binding=False, shared_weights=True)
+
+    assert ort_session.prepare_optimized_model(model_path, config) is None
+    assert list((tmp_path / "opt").iterdir()) == []
+
+    session = create_session(model_path, config=config)
+    x = np.array([[1.0, 2.0]], dtype=np.float32)
+    np.testing.assert_allclose(session.run(None, {"X": x})[0], _expected(x), rtol=1e-5)
@@ -0,0 +1,125 @@
+"""
+推理结果缓存单元测试
+"""
+import numpy as np
+import pytest
+
+import app.services.model_service as model_module
+from app.services.model_service import ModelService
+from app.services.result_cache import ResultCache, content_hash
+
+
+class MemoryRedis:
+    """只实现 get / set 的内存 Redis"""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+
+
+def test_content_hash_distinguishes_dtype_shape_and_none():
+    a = np.zeros((2, 3), dtype=np.float32)
+    assert content_hash(a) == content_hash(a.copy())
+    assert content_hash(a) != content_hash(a.reshape(3, 2))
+    assert content_hash(a) != content_hash(a.astype(np.float64))
+    assert content_hash(None) != content_hash(b"")
+    assert content_hash("ab", "c") != content_hash("a", "bc")
+
+
+@pytest.mark.asyncio
+async def test_local_lru_and_redis_tiers():
+    redis = MemoryRedis()
+    cache = ResultCache(lru_size=2, ttl=60)
+    cache._redis = redis
+    keys = [ResultCache.make_key("text", "v1", f"t{i}") for i in range(3)]
+
+    assert await cache.get(keys[0]) is None
+    for i, key in enumerate(keys):
+        await cache.put(key, {"confidence": i})
+
+    # keys[0] 已被 LRU 淘汰，从 Redis 取回
+    assert await cache.get(keys[2]) == {"confidence": 2, "cached": "local"}
+    assert await cache.get(keys[0]) == {"confidence": 0, "cached": "redis"}
+    assert await cache.get(keys[0]) == {"confidence": 0, "cached": "local"}
+
+    await cache.put(ResultCache.make_key("text", "v1", "bad"), {"error": "boom"})
+    assert len(redis.data) == 3
+    assert cache.stats()["text"] == {"local": 2, "redis": 1, "miss": 1, "hit_rate": 0.75}
+
+
+@pytest.mark.asyncio
+async def test_expired_local_entries_are_dropped():
+    cache = ResultCache(lru_size=4, ttl=-1, use_redis=False)
+    key = ResultCache.make_key("voice", "v1", b"audio")
+    await cache.put(key, {"confidence": 0.1})
+    assert await cache.get(key) is None
+
+
+class CountingTextSession:
+    def __init__(self):
+        self.rows = 0
+
+    def run(self, output_names, feed):
+        self.rows += feed["input_ids"].shape[0]
+        return [np.tile(np.array([[0.0, 1.0]], dtype=np.float32), (feed["input_ids"].shape[0], 1))]
+
+
+class FakeEncoder:
+    def encode(self, texts, timings=None):
+        return {
+            "input_ids": np.ones((len(texts), 32), dtype=np.int64),
+            "attention_mask": np.ones((len(texts), 32), dtype=np.int64),
+        }
+
+
+@pytest.mark.asyncio
+async def test_repeated_text_skips_inference(monkeypatch):
+    monkeypatch.setattr(model_module, "result_cache", ResultCache(lru_size=16, ttl=60, use_redis=False))
+    service = ModelService(role="worker")
+    service._loaded.add("text")
+    service.text_session = CountingTextSession()
+    service.text_encoder = FakeEncoder()
+
+    first = await service.predict_texts(["喂，你好", "请问是王先生吗"])
+    second = await service.predict_texts([" 喂，你好\n", "转到安全账户"])
+
+    assert service.text_session.rows == 3
+    assert "cached" not in first[0]
+    assert second[0]["cached"] == "local"
+    assert second[0]["confidence"] == first[0]["confidence"]
+    assert model_module.result_cache.stats()["text"]["local"] == 1
+
+
+class FailingTextSession(CountingTextSession):
+    def run(self, output_names, feed):
+        self.rows += feed["input_ids"].shape[0]
+        raise RuntimeError("boom")
+
+
+@pytest.mark.asyncio
+async def test_failed_text_inference_is_not_cached(monkeypatch):
+    monkeypatch.setattr(model_module, "result_cache", ResultCache(lru_size=16, ttl=60, use_redis=False))
+    service = ModelService(role="worker")
+    service._loaded.add("text")
+    service.text_session = FailingTextSession()
+    service.text_encoder = FakeEncoder()
+
+    first = await service.predict_text("喂，你好")
+    second = await service.predict_text("喂，你好")
+
+    assert first["risk_level"] == second["risk_level"] == "error"
+    assert "cached" not in second
+    assert service.text_session.rows == 2
+
+
+@pytest.mark.asyncio
+async def test_model_version_changes_cache_key(monkeypatch):
+    service = ModelService(role="worker")
+    v1 = service.model_version("text")
+    monkeypatch.setattr(model_module.settings, "TEXT_DETECTION_THRESHOLD", 0.5)
+    assert service._fingerprint("text") != v1
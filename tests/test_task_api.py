@@ -0,0 +1,63 @@
+"""
+任务提交接口单元测试
+"""
+import base64
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient, ASGITransport
+
+import app.api.tasks as tasks_module
+from app.core.config import settings
+from app.core.security import create_access_token
+from main import app
+
+
+class RecordingTask:
+    def __init__(self):
+        self.calls = []
+
+    def delay(self, *args):
+        self.calls.append(args)
+        return type("AsyncResult", (), {"id": "task-1"})()
+
+
+@pytest_asyncio.fixture
+async def client(monkeypatch):
+    monkeypatch.setattr(settings, "MEDIA_CLAIM_CHECK_ENABLED", False)
+    async with AsyncClient(
+        transport=ASGITransport(app=app),
+        base_url="http://test",
+        headers={"Authorization": f"Bearer {create_access_token(data={'sub': '1'})}"},
+    ) as ac:
+        yield ac
+
+
+@pytest.fixture
+def audio_task(monkeypatch):
+    task = RecordingTask()
+    monkeypatch.setattr(tasks_module, "detect_audio_task", task)
+    return task
+
+
+@pytest.mark.asyncio
+async def test_audio_request_requires_exactly_one_source(client, audio_task):
+    audio = base64.b64encode(b"RIFF").decode()
+
+    assert (await client.post("/api/tasks/audio/detect", json={"call_id": 1})).status_code == 422
+    both = {"call_id": 1, "audio_data": audio, "audio_features": [[0.0]]}
+    assert (await client.post("/api/tasks/audio/detect", json=both)).status_code == 422
+    assert audio_task.calls == []
+
+
+@pytest.mark.asyncio
+async def test_audio_data_goes_through_task_media(client, audio_task):
+    audio = base64.b64encode(b"RIFF").decode()
+
+    response = await client.post("/api/tasks/audio/detect", json={"call_id": 1, "audio_data": audio})
+    assert response.status_code == 200
+    assert audio_task.calls == [(audio, 1, 1, "wav")]
+
+    response = await client.post("/api/tasks/audio/detect", json={"call_id": 1, "audio_data": "abc"})
+    assert response.status_code == 400
+    assert len(audio_task.calls) == 1
@@ -0,0 +1,80 @@
+"""
+文本分词前端 (fast tokenizer + 动态 padding 分桶) 单元测试
+"""
+import numpy as np
+import pytest
+from transformers import BertTokenizer, BertTokenizerFast
+
+import app.services.model_service as model_module
+from app.services.model_service import ModelService
+from app.services.result_cache import ResultCache
+from app.services.text_features import TextEncoder, bucket_length, load_tokenizer
+
+TEXTS = ["您好，这里是公安局", "请把验证码告诉我，我们需要核实您的银行账户是否涉嫌洗钱"]
+
+
+@pytest.fixture(scope="module")
+def vocab_file(tmp_path_factory):
+    chars = sorted(set("".join(TEXTS)))
+    path = tmp_path_factory.mktemp("vocab") / "vocab.txt"
+    path.write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", *chars]), encoding="utf-8")
+    return str(path)
+
+
+def test_bucket_length():
+    assert bucket_length(5, [32, 64, 128, 256], 256) == 32
+    assert bucket_length(33, [32, 64, 128, 256], 256) == 64
+    assert bucket_length(300, [32, 64, 128, 256], 256) == 256
+    assert bucket_length(40, [64, 32], 48) == 48
+
+
+def test_loads_fast_tokenizer(vocab_file):
+    assert isinstance(load_tokenizer(vocab_file), BertTokenizerFast)
+
+
+def test_dynamic_padding_matches_slow_tokenizer(vocab_file):
+    encoder = TextEncoder(load_tokenizer(vocab_file), max_length=256, buckets=[32, 64, 128, 256])
+    timings = {}
+
+    feed = encoder.encode(TEXTS, timings)
+
+    assert feed["input_ids"].shape == (2, 32)
+    assert feed["input_ids"].dtype == np.int64
+    assert "tokenize" in timings
+
+    slow = BertTokenizer(vocab_file=vocab_file)
+    for row, text in enumerate(TEXTS):
+        expected = slow(text)["input_ids"]
+        n = int(feed["attention_mask"][row].sum())
+        assert feed["input_ids"][row, :n].tolist() == expected
+        assert not feed["input_ids"][row, n:].any()
+
+
+class RecordingSession:
+    """记录输入形状，logits = [0, 非 padding token 数]"""
+
+    def __init__(self):
+        self.shapes = []
+
+    def run(self, output_names, feed):
+        self.shapes.append(feed["input_ids"].shape)
+        n = feed["attention_mask"].sum(axis=1, keepdims=True).astype(np.float32)
+        return [np.concatenate([np.zeros_like(n), n], axis=1)]
+
+
+@pytest.mark.asyncio
+async def test_predict_texts_runs_one_bucketed_batch(vocab_file, monkeypatch):
+    monkeypatch.setattr(model_module, "result_cache", ResultCache(lru_size=16, ttl=60, use_redis=False, enabled=False))
+    service = ModelService(role="worker")
+    service._loaded.add("text")
+    service.text_session = RecordingSession()
+    service.text_encoder = TextEncoder(load_tokenizer(vocab_file), max_length=256, buckets=[32, 64, 128, 256])
+
+    results = await service.predict_texts(TEXTS)
+
+    assert service.text_session.shapes == [(2, 32)]
+    assert [r["seq_len"] for r in results] == [32, 32]
+    assert all(r["label"] == "fraud" for r in results)
+
+    single = await service.predict_text(TEXTS[0])
+    assert single["confidence"] == results[0]["confidence"]
@@ -0,0 +1,77 @@
+"""
+实时转写滚动窗口单元测试
+"""
+from app.services.keyword_matcher import KeywordAutomaton
+from app.services.transcript_window import TranscriptWindow, count_tokens
+
+
+def test_buffers_until_enough_new_tokens():
+    transcript = TranscriptWindow(window_tokens=64, min_new_tokens=10, min_boundary_tokens=4)
+
+    assert transcript.append("您好").window is None
+    assert transcript.append("这里是").window is None
+    window = transcript.append("市公安局反诈中心").window
+
+    assert window is not None and window.reason == "tokens"
+    assert window.text == "您好这里是市公安局反诈中心"
+    assert window.new_tokens == 13
+    assert transcript.stats() == {"fragments": 3, "windows": 1, "pending_tokens": 0}
+
+
+def test_sentence_boundary_triggers_scoring():
+    transcript = TranscriptWindow(min_new_tokens=100, min_boundary_tokens=4)
+
+    assert transcript.append("嗯。").window is None
+    window = transcript.append("你的账户有风险。").window
+
+    assert window.reason == "boundary"
+    assert window.text == "嗯。你的账户有风险。"
+
+
+def test_context_window_is_rolling():
+    transcript = TranscriptWindow(window_tokens=8, min_new_tokens=4)
+    for fragment in ["一二三四", "五六七八", "九十百千"]:
+        window = transcript.append(fragment).window
+
+    assert window.text == "五六七八九十百千"
+    assert count_tokens("hello world 123，好") == 5
+
+
+def test_rule_scan_covers_every_fragment_with_overlap():
+    automaton = KeywordAutomaton()
+    automaton.add("安全账户")
+    automaton.add("验证码")
+    # 窗口阈值很高，BERT 一直不送检，规则仍然逐片段匹配
+    transcript = TranscriptWindow(min_new_tokens=100, overlap_chars=3)
+
+    reported = []
+    for fragment in ["请把钱转到安全", "账户里面去", "再把验证码", "告诉我"]:
+        update = transcript.append(fragment)
+        assert update.window is None
+        # 关键词跨片段时靠重叠部分命中，已报告的命中不会在下一次重复出现
+        hits = [h for h in automaton.search(update.scan.text) if h["end"] > update.scan.start]
+        reported += [h["keyword"] for h in hits]
+        assert update.scan.text[update.scan.start:] == fragment
+
+    assert reported == ["安全账户", "验证码"]
+    assert transcript.append("  ") == (None, None)
+
+
+def test_flush_returns_pending_text():
+    transcript = TranscriptWindow(min_new_tokens=100)
+    assert transcript.flush() is None
+
+    transcript.append("hello")
+    transcript.append("world")
+    window = transcript.flush()
+
+    assert window.reason == "flush"
+    assert window.text == "hello world"
+    assert transcript.flush() is None
+
+
+def test_default_window_fits_length_bucket():
+    from app.core.config import settings
+
+    # 加上 [CLS]/[SEP] 后不能溢出到下一个长度桶
+    assert settings.TEXT_WINDOW_TOKENS + 2 in settings.TEXT_LENGTH_BUCKETS
@@ -0,0 +1,52 @@
+"""
+视频预处理 (人脸序列 -> 模型输入 Tensor) 单元测试
+"""
+import base64
+import cv2
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.services.video_processor import VideoProcessor
+
+
+def _random_faces(t: int = 10) -> np.ndarray:
+    width, height = settings.VIDEO_INPUT_SIZE
+    rng = np.random.default_rng(1)
+    return rng.integers(0, 256, size=(t, height, width, 3), dtype=np.uint8)
+
+
+def _reference_normalize(faces_bgr: np.ndarray) -> np.ndarray:
+    """逐帧的参考实现 (与原 preprocess_batch 的归一化步骤一致)"""
+    mean = np.array(settings.VIDEO_NORM_MEAN, dtype=np.float32)
+    std = np.array(settings.VIDEO_NORM_STD, dtype=np.float32)
+    frames = []
+    for face in faces_bgr:
+        rgb = cv2.cvtColor(face, cv2.COLOR_BGR2RGB).astype(np.float32) / 255.0
+        frames.append(np.transpose((rgb - mean) / std, (2, 0, 1)))
+    return np.expand_dims(np.array(frames), axis=0).astype(np.float32)
+
+
+def test_raw_path_matches_reference_normalization():
+    faces = _random_faces()
+
+    tensor = VideoProcessor.preprocess_raw(faces.tobytes(), list(faces.shape))
+
+    assert tensor.shape == (1, 10, 3, faces.shape[1], faces.shape[2])
+    assert tensor.dtype == np.float32
+    np.testing.assert_allclose(tensor, _reference_normalize(faces), rtol=1e-5, atol=1e-5)
+
+
+def test_raw_path_rejects_wrong_shape():
+    faces = _random_faces()
+    with pytest.raises(ValueError):
+        VideoProcessor.preprocess_raw(faces.tobytes(), [10, 100, 100, 3])
+
+
+def test_jpeg_path_still_supported():
+    faces = _random_faces(t=3)
+    payload = [base64.b64encode(cv2.imencode(".png", f)[1]).decode() for f in faces]
+
+    tensor = VideoProcessor.preprocess_batch(payload)
+
+    np.testing.assert_allclose(tensor, _reference_normalize(faces), rtol=1e-5, atol=1e-5)
@@ -0,0 +1,145 @@
+"""
+流式视频推理 (逐帧特征缓存) 单元测试
+"""
+import numpy as np
+import pytest
+
+import app.services.model_service as model_module
+from app.services.model_service import ModelService
+from app.services.result_cache import ResultCache
+
+
+class Node:
+    name = "input"
+
+
+class FakeBackbone:
+    """每帧特征 = 该帧像素均值 (D=4)，记录经过骨干的帧数"""
+
+    def __init__(self):
+        self.frames = []
+
+    def get_inputs(self):
+        return [Node()]
+
+    def run(self, output_names, feed):
+        x = feed["input"]
+        self.frames.append(x.shape[1])
+        means = x.reshape(x.shape[0], x.shape[1], -1).mean(axis=2, keepdims=True)
+        return [np.repeat(means, 4, axis=2).astype(np.float32)]
+
+
+class FakeTemporal:
+    """logits = [序列特征和, -序列特征和]"""
+
+    def get_inputs(self):
+        return [Node()]
+
+    def run(self, output_names, feed):
+        s = feed["input"].reshape(feed["input"].shape[0], -1).sum(axis=1, keepdims=True)
+        return [np.concatenate([s, -s], axis=1)]
+
+
+class MemoryEmbeddingCache:
+    def __init__(self):
+        self.data = {}
+
+    async def get_many(self, call_id, frame_ids):
+        return [self.data.get((call_id, f)) for f in frame_ids]
+
+    async def put_many(self, call_id, frame_ids, embeddings, keep=None):
+        for f, emb in zip(frame_ids, embeddings):
+            self.data[(call_id, f)] = np.array(emb)
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(model_module, "frame_embedding_cache", MemoryEmbeddingCache())
+    monkeypatch.setattr(model_module, "result_cache", ResultCache(lru_size=16, ttl=60, use_redis=False, enabled=False))
+    svc = ModelService(role="worker")
+    svc._loaded.add("video")
+    svc.video_session = model_module.MockOnnxSession("video")
+    svc.video_backbone_session = FakeBackbone()
+    svc.video_temporal_session = FakeTemporal()
+    return svc
+
+
+def _window(start: int, length: int = 4) -> np.ndarray:
+    frames = [np.full((3, 8, 8), i, dtype=np.float32) for i in range(start, start + length)]
+    return np.stack(frames)[np.newaxis]
+
+
+@pytest.mark.asyncio
+async def test_only_new_frames_pass_through_backbone(service):
+    first = await service.predict_video(_window(0), call_id=1, frame_ids=["s-0", "s-1", "s-2", "s-3"])
+    second = await service.predict_video(_window(2), call_id=1, frame_ids=["s-2", "s-3", "s-4", "s-5"])
+
+    assert first["streaming"] and second["streaming"]
+    assert service.video_backbone_session.frames == [4, 2]
+    assert second["backbone_frames"] == 2
+    # 时序头看到的是完整的 4 帧特征序列 (2+3+4+5) * D
+    assert second["raw_logits"][0][0] == pytest.approx(14 * 4)
+
+
+@pytest.mark.asyncio
+async def test_without_frame_ids_runs_full_model(service):
+    result = await service.predict_video(_window(0))
+
+    assert result["streaming"] is False
+    assert service.video_backbone_session.frames == []
+
+
+class HashRedis:
+    """只实现 Hash 命令 + pipeline 的内存 Redis"""
+
+    def __init__(self):
+        self.hashes = {}
+
+    def pipeline(self, transaction=False):
+        redis = self
+
+        class Pipeline:
+            def __init__(self):
+                self.calls = []
+
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            def __getattr__(self, name):
+                return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+            async def execute(self):
+                return [await getattr(redis, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+        return Pipeline()
+
+    async def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update({k.encode(): v for k, v in mapping.items()})
+
+    async def expire(self, key, ttl):
+        return True
+
+    async def hkeys(self, key):
+        return list(self.hashes.get(key, {}))
+
+    async def hdel(self, key, *fields):
+        for field in fields:
+            self.hashes[key].pop(field, None)
+
+
+@pytest.mark.asyncio
+async def test_embedding_hash_keeps_only_current_window():
+    from app.services.embedding_cache import FrameEmbeddingCache
+
+    cache = FrameEmbeddingCache(ttl=60)
+    cache._redis = HashRedis()
+    emb = np.ones((4, 2), dtype=np.float32)
+    for start in range(0, 20, 2):
+        window = [f"s-{i}" for i in range(start, start + 4)]
+        await cache.put_many(1, window[-2:], emb[:2], keep=window)
+
+    # 最后一个窗口 s-18..s-21: 更早的帧都已删除
+    assert sorted(cache._redis.hashes["video:emb:1"]) == [b"s-18", b"s-19", b"s-20", b"s-21"]
@@ -0,0 +1,38 @@
+"""
+视频人脸框模板跟踪单元测试
+"""
+import numpy as np
+
+from app.services.video_processor import FaceTrack, VideoProcessor
+
+
+def _frame_with_patch(x: int, y: int) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    patch = rng.integers(0, 255, size=(80, 60, 3), dtype=np.uint8)
+    frame = np.full((360, 480, 3), 30, dtype=np.uint8)
+    frame[y:y + 80, x:x + 60] = patch
+    return frame
+
+
+def test_template_follows_moving_face_box():
+    first = _frame_with_patch(200, 100)
+    box = (200, 100, 260, 180)
+    track = FaceTrack(box, VideoProcessor._make_track_template(first, box))
+
+    moved = _frame_with_patch(212, 94)
+    new_box = VideoProcessor._track_face_box(moved, track)
+
+    assert new_box is not None
+    # 框大小不变，只平移
+    assert new_box[2] - new_box[0] == 60 and new_box[3] - new_box[1] == 80
+    assert abs(new_box[0] - 212) <= 2 and abs(new_box[1] - 94) <= 2
+
+
+def test_low_score_requests_redetection():
+    first = _frame_with_patch(200, 100)
+    box = (200, 100, 260, 180)
+    track = FaceTrack(box, VideoProcessor._make_track_template(first, box))
+
+    empty = np.full((360, 480, 3), 30, dtype=np.uint8)
+
+    assert VideoProcessor._track_face_box(empty, track) is None
@@ -0,0 +1,60 @@
+"""
+视频滑动窗口单元测试
+"""
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.services.video_processor import VideoProcessor
+
+
+def _jpeg_frame(value: int) -> bytes:
+    img = np.full((120, 160, 3), value, dtype=np.uint8)
+    return cv2.imencode(".jpg", img)[1].tobytes()
+
+
+def _processor(stride: int) -> VideoProcessor:
+    processor = VideoProcessor(sequence_length=4, stride=stride)
+    # 跳过人脸检测，整帧即人脸
+    processor._extract_face_image = lambda img, user_id=None: img
+    return processor
+
+
+def test_emits_overlapping_windows_every_stride_frames(monkeypatch):
+    monkeypatch.setattr(settings, "VIDEO_FACE_TRANSPORT", "jpeg")
+    processor = _processor(stride=2)
+
+    statuses = [processor._process_frame_sync(_jpeg_frame(i * 20), user_id=1)["status"] for i in range(8)]
+
+    assert statuses == ["buffering"] * 3 + ["ready", "buffering", "ready", "buffering", "ready"]
+
+
+def test_overlapping_frames_are_not_reencoded(monkeypatch):
+    monkeypatch.setattr(settings, "VIDEO_FACE_TRANSPORT", "jpeg")
+    processor = _processor(stride=2)
+
+    windows = []
+    for i in range(6):
+        result = processor._process_frame_sync(_jpeg_frame(i * 20), user_id=1)
+        if result["status"] == "ready":
+            windows.append(result["face_batch"])
+
+    assert len(windows) == 2
+    # 后一个窗口的前两帧就是前一个窗口的后两帧 (同一对象，未重新编码)
+    assert windows[1][0] is windows[0][2]
+    assert windows[1][1] is windows[0][3]
+
+
+def test_stride_equal_to_length_keeps_disjoint_segments(monkeypatch):
+    monkeypatch.setattr(settings, "VIDEO_FACE_TRANSPORT", "raw")
+    processor = _processor(stride=4)
+
+    tensors = []
+    for i in range(8):
+        result = processor._process_frame_sync(_jpeg_frame(i * 20), user_id=1)
+        if result["status"] == "ready":
+            tensors.append(result["face_tensor"])
+
+    width, height = settings.VIDEO_INPUT_SIZE
+    assert [t.shape for t in tensors] == [(4, height, width, 3)] * 2
+    assert abs(int(tensors[1][0].mean()) - 80) <= 2
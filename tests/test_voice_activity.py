@@ -0,0 +1,36 @@
+"""
+语音活动检测 (VAD) 单元测试
+"""
+from pathlib import Path
+
+import numpy as np
+
+from app.services.audio_features import AudioFrontEnd
+from app.services.voice_activity import VoiceActivityDetector
+
+ASSET = Path(__file__).parent / "assets" / "fake_me.wav"
+
+
+def test_silence_and_white_noise_are_not_speech():
+    vad = VoiceActivityDetector()
+    rng = np.random.default_rng(0)
+
+    assert not vad.score(np.zeros(16000, dtype=np.float32)).is_speech
+    # 噪声能量足够高，但谱平坦
+    assert not vad.score((rng.standard_normal(16000) * 0.05).astype(np.float32)).is_speech
+
+
+def test_recorded_speech_is_detected_and_counted():
+    y = AudioFrontEnd().decode(ASSET.read_bytes())
+    vad = VoiceActivityDetector()
+
+    # 该素材前 9 秒为静音，随后是语音
+    silent = [vad.score(y[i:i + 16000]).is_speech for i in range(0, 16000 * 8, 16000)]
+    speech = [vad.score(y[i:i + 16000]).is_speech for i in range(16000 * 10, 16000 * 16, 16000)]
+
+    assert not any(silent)
+    assert all(speech)
+    stats = vad.stats()
+    assert stats["chunks"] == 14 and stats["speech_chunks"] == 6
+    assert 0 < stats["speech_ratio"] < 6 / 14
+    assert vad.window_speech_ratio(16000 * 3) > 0.5